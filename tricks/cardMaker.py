@@ -0,0 +1,360 @@
+from PIL import Image, ImageDraw
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+
+# layout of the scanned deck: a column of extras, then 2 to 10 and the
+# ace before the court cards, one suit per row
+ROW_NAMES = ['h', 'c', 'd', 's']
+COL_NAMES = ['extra'] + [str(num) for num in range(2, 11)] + ['14', '11', '12', '13']
+CARD_WIDTH = 132
+CARD_HEIGHT = 180
+
+def grid_boxes(image_width:int, image_height:int, width:int, height:int,
+               rows:int, cols:int) -> list[tuple[int, int, int, int]]:
+    """returns the (row, col, left, top) of every cell in an evenly spaced grid"""
+    vert_margin = (image_height - (rows * height)) // max(rows - 1, 1)
+    horiz_margin = (image_width - (cols * width)) // max(cols - 1, 1)
+    return [(row, col, col * (width + horiz_margin), row * (height + vert_margin))
+            for row in range(rows) for col in range(cols)]
+
+def save_images(images:list[tuple[str, object]], workers:int=None):
+    """saves (path, pixel array) pairs as PNGs across a thread pool
+
+    Pillow releases the GIL while encoding, so the saves run in parallel.
+    """
+    def save(item):
+        path, pixels = item
+        Image.fromarray(pixels).save(path, 'PNG')
+        return path
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(save, images))
+
+def load_pixels(image_path:str) -> np.ndarray:
+    """decodes an image once into a (height, width, channels) array"""
+    image = Image.open(os.path.expanduser(image_path))
+    if image.mode not in ('L', 'RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    return np.asarray(image)
+
+def batch_slice(image_path:str, width:int, height:int, 
+                row_names:list[str], col_names:list[str],
+                save_path:str, return_outputs:bool=False, workers:int=None):
+    """Slice an image into a grid of smaller images."""
+    save_path = os.path.expanduser(f'{save_path}slice_output/')
+    os.makedirs(save_path, exist_ok=True)
+
+    # decode once, then every slice is a view into the same buffer
+    pixels = load_pixels(image_path)
+    image_height, image_width = pixels.shape[:2]
+    slices = []
+    for row, col, left, top in grid_boxes(image_width, image_height, width, height,
+                                          len(row_names), len(col_names)):
+        path = f'{save_path}{col_names[col]}_of_{row_names[row]}.png'
+        slices.append((path, pixels[top:top + height, left:left + width]))
+    outputs = save_images(slices, workers)
+    for path in outputs:
+        print(f'Saved: {path}')
+    if return_outputs:
+        return outputs
+
+def remove_regions(image_path:str, region_left:int, region_top:int,
+                        region_right:int, region_bottom:int,
+                        starting_pts:list[tuple[int, int]], save_path:str=None):
+    """cuts a region out of an image at each starting point
+
+    The region's box is repeated with its top left corner at every (x, y) in
+    starting_pts and the pixels inside are dropped. What is left is shifted
+    up and left by the region's own top left corner and saved as a PNG.
+    """
+    if not save_path:
+        save_path = image_path
+
+    pixels = load_pixels(image_path)
+    if pixels.ndim == 3 and pixels.shape[2] == 4:
+        pixels = pixels[..., :3]
+    keep = np.ones(pixels.shape[:2], dtype=bool)
+    region_width = region_right - region_left
+    region_height = region_bottom - region_top
+    for x, y in starting_pts:
+        keep[max(y, 0):max(y + region_height, 0), max(x, 0):max(x + region_width, 0)] = False
+
+    # Copy the portions of the original image that are not part of the deleted regions
+    kept = np.where(keep.reshape(keep.shape + (1,) * (pixels.ndim - 2)), pixels, 0)
+    result = np.zeros_like(pixels)
+    image_height, image_width = pixels.shape[:2]
+    result[:image_height - region_top, :image_width - region_left] = \
+        kept[region_top:, region_left:]
+
+    # Save the resulting image to a file
+    Image.fromarray(result).save(os.path.expanduser(save_path), 'PNG')
+
+
+# formats card art is saved in, smallest last; any this build of Pillow
+# cannot write are skipped
+IMAGE_FORMATS = [('png', 'PNG', 'image/png', {'optimize': True}),
+                 ('webp', 'WEBP', 'image/webp', {'quality': 90, 'method': 6}),
+                 ('avif', 'AVIF', 'image/avif', {'quality': 70}),]
+
+def supported_formats() -> list[tuple[str, str, str, dict]]:
+    extensions = Image.registered_extensions()
+    return [image_format for image_format in IMAGE_FORMATS
+            if extensions.get(f'.{image_format[0]}') == image_format[1]
+            and image_format[1] in Image.SAVE]
+
+def content_name(stem:str, data:bytes, ext:str) -> str:
+    """names a file after a hash of its contents so it can be cached forever"""
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{ext}'
+
+def encode_image(image, image_format:str, **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+def sprite_css(names:list[str], images:list[tuple[str, str]],
+               width:int, height:int, columns:int) -> str:
+    """css drawing each card as a window onto the sprite sheet
+
+    A card is any element with the classes card and card-<image name>, e.g.
+    card card-10_of_h. Browsers that understand typed image-set() pick the
+    smallest format they support, the rest fall back to the png.
+    """
+    fallback = images[0][0]
+    image_set = ', '.join(f'url("{name}") type("{mime}")' for name, mime in reversed(images))
+    lines = ['.card{display:inline-block;vertical-align:middle;'
+             f'width:{width}px;height:{height}px;background-repeat:no-repeat;'
+             f'background-image:url("{fallback}");'
+             f'background-image:image-set({image_set})}}']
+    for idx, name in enumerate(names):
+        left = idx % columns * width
+        top = idx // columns * height
+        lines.append(f'.card-{name}{{background-position:{-left}px {-top}px}}')
+    return '\n'.join(lines) + '\n'
+
+def build_sprite_sheet(card_dir:str, output_dir:str, columns:int=13,
+                       stem:str='cards') -> dict:
+    """packs every card image in card_dir into one sprite sheet
+
+    Writes the sheet in each format Pillow supports plus the css that maps
+    card classes onto it, all named by content hash and with gzipped copies
+    of the text files, and a cards.json manifest naming the current files.
+    Files from earlier builds are removed.
+
+    Returns:
+        dict: the manifest
+    """
+    card_dir = os.path.expanduser(card_dir)
+    output_dir = os.path.expanduser(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = sorted(path for path in os.listdir(card_dir) if path.endswith('.png'))
+    names = [os.path.splitext(path)[0] for path in paths]
+    cards = [Image.open(os.path.join(card_dir, path)).convert('RGBA') for path in paths]
+    width = max(card.width for card in cards)
+    height = max(card.height for card in cards)
+    rows = -(-len(cards) // columns)
+    sheet = Image.new('RGBA', (columns * width, rows * height), (0, 0, 0, 0))
+    for idx, card in enumerate(cards):
+        sheet.paste(card, (idx % columns * width, idx // columns * height))
+
+    files = {}
+    images = []
+    for ext, image_format, mime, params in supported_formats():
+        data = encode_image(sheet, image_format, **params)
+        files[ext] = content_name(stem, data, ext)
+        images.append((files[ext], mime))
+        with open(os.path.join(output_dir, files[ext]), 'wb') as file:
+            file.write(data)
+
+    css = sprite_css(names, images, width, height, columns).encode()
+    files['css'] = content_name(stem, css, 'css')
+    with open(os.path.join(output_dir, files['css']), 'wb') as file:
+        file.write(css)
+    # precompressed for servers that serve foo.css.gz for foo.css
+    with open(os.path.join(output_dir, f'{files["css"]}.gz'), 'wb') as file:
+        file.write(gzip.compress(css, compresslevel=9, mtime=0))
+
+    manifest = {'files': files,
+                'width': width,
+                'height': height,
+                'cards': {name: [idx % columns * width, idx // columns * height]
+                          for idx, name in enumerate(names)},}
+    with open(os.path.join(output_dir, f'{stem}.json'), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    current = set(files.values()) | {f'{files["css"]}.gz', f'{stem}.json'}
+    for path in os.listdir(output_dir):
+        if path.startswith(f'{stem}.') and path not in current:
+            os.remove(os.path.join(output_dir, path))
+    return manifest
+
+# widths every card is resized to for srcset, at most the scanned width
+SRCSET_WIDTHS = [66, 99, 132]
+SRCSET_FORMATS = ['png', 'webp']
+BUILD_MANIFEST = 'build.json'
+
+def digest(*parts) -> str:
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode())
+    return sha.hexdigest()
+
+def file_digest(path:str) -> str:
+    with open(path, 'rb') as file:
+        return digest(file.read())
+
+def pixels_digest(pixels:np.ndarray) -> str:
+    return digest([pixels.shape, str(pixels.dtype)], np.ascontiguousarray(pixels).tobytes())
+
+def slice_sheet(sheet:str, card_dir:str, manifest:dict, workers:int=None) -> int:
+    """re-slices the cards of a scanned sheet whose pixels changed
+
+    Returns:
+        int: the number of card images written
+    """
+    pixels = load_pixels(sheet)
+    image_height, image_width = pixels.shape[:2]
+    slices = manifest.setdefault('slices', {})
+    changed = []
+    for row, col, left, top in grid_boxes(image_width, image_height, CARD_WIDTH, CARD_HEIGHT,
+                                          len(ROW_NAMES), len(COL_NAMES)):
+        if COL_NAMES[col] == 'extra':
+            continue
+        name = f'{COL_NAMES[col]}_of_{ROW_NAMES[row]}'
+        card = pixels[top:top + CARD_HEIGHT, left:left + CARD_WIDTH]
+        path = os.path.join(card_dir, f'{name}.png')
+        card_digest = pixels_digest(card)
+        if slices.get(name) != card_digest or not os.path.exists(path):
+            slices[name] = card_digest
+            changed.append((path, card))
+    save_images(changed, workers)
+    return len(changed)
+
+def encode_variant(master_path:str, width:int, ext:str, image_format:str,
+                   params:dict) -> bytes:
+    image = Image.open(master_path).convert('RGBA')
+    height = round(image.height * width / image.width)
+    if (width, height) != image.size:
+        image = image.resize((width, height), Image.LANCZOS)
+    return encode_image(image, image_format, **params)
+
+def build_card_assets(card_dir:str, sprite_dir:str, sheet:str=None,
+                      widths:list[int]=SRCSET_WIDTHS, formats:list[str]=SRCSET_FORMATS,
+                      force:bool=False, workers:int=None, log=print) -> dict:
+    """rebuilds whatever card art is out of date with its inputs
+
+    Slices the scanned sheet when one is given, resizes every card in
+    card_dir to each srcset width in each format under card_dir/srcset/, and
+    packs the sprite sheet. Each output is keyed by a hash of exactly the
+    inputs it is made from, recorded in card_dir/build.json, and only
+    outputs whose key changed are made again. When nothing changed no image
+    is even decoded.
+
+    Returns:
+        dict: how many slices and variants were written and whether the
+            sprite sheet was rebuilt
+    """
+    card_dir = os.path.expanduser(card_dir)
+    manifest_path = os.path.join(card_dir, BUILD_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    summary = {'sliced': 0, 'encoded': 0, 'sprites': False}
+
+    if sheet:
+        sheet = os.path.expanduser(sheet)
+        sheet_key = digest(file_digest(sheet), [ROW_NAMES, COL_NAMES, CARD_WIDTH, CARD_HEIGHT])
+        if manifest.get('sheet') != sheet_key:
+            summary['sliced'] = slice_sheet(sheet, card_dir, manifest, workers)
+            manifest['sheet'] = sheet_key
+            log(f'Sliced {summary["sliced"]} changed cards from {sheet}')
+
+    masters = {os.path.splitext(path)[0]: file_digest(os.path.join(card_dir, path))
+               for path in sorted(os.listdir(card_dir)) if path.endswith('.png')}
+    image_formats = [image_format for image_format in supported_formats()
+                     if image_format[0] in formats]
+    inputs_key = digest(masters, widths, image_formats)
+    outputs = list(manifest.get('variants', {}).values())
+    outputs = [os.path.join(card_dir, 'srcset', output['file']) for output in outputs]
+    if (manifest.get('inputs') == inputs_key and all(map(os.path.exists, outputs))
+            and os.path.exists(os.path.join(sprite_dir, 'cards.json'))):
+        log('Card assets are up to date')
+        return summary
+
+    variant_dir = os.path.join(card_dir, 'srcset')
+    os.makedirs(variant_dir, exist_ok=True)
+    old_variants = manifest.get('variants', {})
+    variants = {}
+    jobs = []
+    for name, master_digest in masters.items():
+        for width in widths:
+            for ext, image_format, mime, params in image_formats:
+                variant = f'{name}-{width}w.{ext}'
+                key = digest(master_digest, width, params)
+                old = old_variants.get(variant)
+                if (old and old['key'] == key
+                        and os.path.exists(os.path.join(variant_dir, old['file']))):
+                    variants[variant] = old
+                else:
+                    jobs.append((variant, name, width, ext, image_format, params, key))
+
+    def encode(job):
+        variant, name, width, ext, image_format, params, key = job
+        data = encode_variant(os.path.join(card_dir, f'{name}.png'),
+                              width, ext, image_format, params)
+        file_name = content_name(f'{name}-{width}w', data, ext)
+        with open(os.path.join(variant_dir, file_name), 'wb') as file:
+            file.write(data)
+        return variant, {'key': key, 'file': file_name}
+
+    with ThreadPoolExecutor(workers) as pool:
+        variants.update(pool.map(encode, jobs))
+    summary['encoded'] = len(jobs)
+    current = {variant['file'] for variant in variants.values()}
+    for path in os.listdir(variant_dir):
+        if path not in current:
+            os.remove(os.path.join(variant_dir, path))
+    log(f'Encoded {len(jobs)} card variants')
+
+    sprite_key = digest(masters)
+    if (manifest.get('sprites') != sprite_key
+            or not os.path.exists(os.path.join(sprite_dir, 'cards.json'))):
+        sprites = build_sprite_sheet(card_dir, sprite_dir)
+        manifest['sprites'] = sprite_key
+        summary['sprites'] = True
+        log(f'Packed sprite sheet {", ".join(sprites["files"].values())}')
+
+    manifest['inputs'] = inputs_key
+    manifest['variants'] = dict(sorted(variants.items()))
+    # ready to drop into <img srcset>, relative to card_dir
+    manifest['srcset'] = {
+        name: {ext: ', '.join(f'srcset/{variants[f"{name}-{width}w.{ext}"]["file"]} {width}w'
+                              for width in widths)
+               for ext, *_ in image_formats}
+        for name in masters}
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='builds the card art')
+    commands = parser.add_subparsers(dest='command', required=True)
+    slicer = commands.add_parser('slice', help='slice a scanned sheet into cards')
+    slicer.add_argument('image_path', nargs='?', default='~/Downloads/cards.jpeg')
+    slicer.add_argument('save_path', nargs='?', default='~/Desktop/')
+    sprites = commands.add_parser('sprites', help='pack the cards into a sprite sheet')
+    sprites.add_argument('card_dir', nargs='?', default='main/static/cards/')
+    sprites.add_argument('output_dir', nargs='?', default='main/static/sprites/')
+    args = parser.parse_args()
+
+    if args.command == 'slice':
+        outputs = batch_slice(args.image_path, CARD_WIDTH, CARD_HEIGHT,
+                    ROW_NAMES, COL_NAMES, args.save_path, True)
+    else:
+        manifest = build_sprite_sheet(args.card_dir, args.output_dir)
+        print(f'Saved: {", ".join(manifest["files"].values())}')
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+def clear_card_catalog(sender, **kwargs):
+    from .models import Card
+    Card.objects.clear_catalog()
 
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "main"
\ No newline at end of file
+    name = "main"
+
+    def ready(self):
+        post_migrate.connect(clear_card_catalog, sender=self)
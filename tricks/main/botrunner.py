@@ -0,0 +1,187 @@
+"""Plays the bot seats of live games, off the request path.
+
+A game with bot seats wakes the runner (``botwake.wake_bots``) after every
+change that commits, and whenever a player loads it or reconnects to its
+event stream while a bot is on turn. Wake-ups only live in memory, so the
+loads and reconnects are what restart a game's bots after a restart or a
+lost wake-up. The runner then plays that game on one of its worker
+threads until a person is on turn or the game ends. Each move goes through
+``moves.submit_move`` at the version it was decided on, exactly like a
+person's. If anyone moved in between, the swap fails and the bot looks
+again. A finished trick is cleared with ``Game.resolve_trick`` once its
+reveal is over, using a timer instead of a sleeping worker.
+
+Decisions come from a ``bots`` policy (``BOT_POLICY``) and run in their own
+pool. A decision that takes longer than ``BOT_MOVE_BUDGET`` seconds is
+abandoned for the cheapest legal move, so a slow policy can't stall a table.
+Threads can't be stopped, so an abandoned decision keeps its thread until it
+returns. Once every thread of the pool may be held that way, the pool is
+swapped for a fresh one and the old threads exit when they're done, so slow
+decisions never starve the ones after them. A run that fails is retried
+after a backoff, doubling from ``RETRY_DELAY`` up to ``MAX_RETRY_DELAY``.
+Each game is played by at most one worker at a time. A wake-up for a game
+that is already being played just makes that worker look once more.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from random import Random
+from django.conf import settings
+from django.db import connection
+from . import engine
+from .bots import BOTS
+from .moves import BET, CARD, Conflict, MoveError, submit_move
+from .pubsub import publish_game
+from .snapshot import GameSnapshot
+
+logger = logging.getLogger(__name__)
+
+# a safety stop for one run, well above the moves in any game
+MAX_BOT_MOVES = 1000
+# seconds before a failed run is retried, doubled for each failure in a row
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+
+def on_turn(snapshot:GameSnapshot) -> engine.PlayerState|None:
+    """returns the player the game is waiting on, if it waits on a move"""
+    state = snapshot.state
+    if state.betting_player is not None:
+        return state.betting_player
+    if state.card_play_ready and not snapshot.cur_round.trick_ended:
+        return state.playing_player
+    return None
+
+def bot_on_turn(snapshot:GameSnapshot) -> bool:
+    """checks whether the game is waiting on a bot's move"""
+    if snapshot.cur_round is None or snapshot.game.finished:
+        return False
+    player = on_turn(snapshot)
+    return player is not None and snapshot.by_id[player.id].is_bot
+
+def choose(bot, state:engine.GameState, player:engine.PlayerState) -> tuple[str, int]:
+    """returns the bot's move as (kind, value)"""
+    if state.betting_player is player:
+        return BET, bot.choose_bet(state, player)
+    return CARD, bot.choose_card(state, player)
+
+def fallback(state:engine.GameState, player:engine.PlayerState) -> tuple[str, int]:
+    """returns the cheapest legal move, for a bot out of time"""
+    if state.betting_player is player:
+        return BET, state.bet_range(player)[0]
+    return CARD, engine.cards_in(state.playable_cards(player))[0]
+
+class BotRunner:
+    """plays bot seats on a pool of worker threads
+
+    Args:
+        workers (int, optional): games played at once, BOT_WORKERS by default
+        budget (float, optional): seconds per decision, BOT_MOVE_BUDGET by default
+        policy (str, optional): a name in bots.BOTS, BOT_POLICY by default
+    """
+    def __init__(self, workers:int=None, budget:float=None, policy:str=None):
+        self.workers = workers or getattr(settings, 'BOT_WORKERS', 2)
+        self.budget = budget if budget is not None else getattr(settings, 'BOT_MOVE_BUDGET', 0.25)
+        self.bot = BOTS[policy or getattr(settings, 'BOT_POLICY', 'greedy')](Random())
+        self.games = ThreadPoolExecutor(self.workers, thread_name_prefix='bot-game')
+        self.decisions = self.decision_pool()
+        self._lock = threading.Lock()
+        self._running = set()
+        self._pending = set()
+        self._failures = {}
+        # decisions that ran out of time but may still hold a thread
+        self._abandoned = set()
+
+    def decision_pool(self):
+        return ThreadPoolExecutor(self.workers, thread_name_prefix='bot-decision')
+
+    def nudge(self, game_id:int):
+        """plays a game's due bot moves on a worker, once it's free"""
+        with self._lock:
+            if game_id in self._running:
+                self._pending.add(game_id)
+                return
+            self._running.add(game_id)
+        self.games.submit(self.run, game_id)
+
+    def later(self, delay:float, game_id:int):
+        timer = threading.Timer(delay, self.nudge, args=(game_id,))
+        timer.daemon = True
+        timer.start()
+
+    def run(self, game_id:int):
+        """plays a game until nothing is due and no wake-up came in meanwhile"""
+        try:
+            while True:
+                try:
+                    delay = self.play_bots(game_id)
+                    with self._lock:
+                        self._failures.pop(game_id, None)
+                except Exception:
+                    with self._lock:
+                        failures = self._failures[game_id] = self._failures.get(game_id, 0) + 1
+                    delay = min(RETRY_DELAY * 2 ** (failures - 1), MAX_RETRY_DELAY)
+                    logger.exception('bots stopped in game %s, retrying in %ss', game_id, delay)
+                with self._lock:
+                    if game_id in self._pending:
+                        self._pending.discard(game_id)
+                        continue
+                    self._running.discard(game_id)
+                if delay is not None:
+                    self.later(delay, game_id)
+                return
+        finally:
+            # worker threads are not request threads, nothing else closes it
+            connection.close()
+
+    def decide(self, state:engine.GameState, player:engine.PlayerState) -> tuple[str, int]:
+        """returns the bot's move, or the fallback if it takes too long"""
+        decision = self.decisions.submit(choose, self.bot, state, player)
+        try:
+            return decision.result(timeout=self.budget)
+        except TimeoutError:
+            logger.warning('bot %s ran out of time, playing the fallback', player.id)
+            self.abandon(decision)
+            return fallback(state, player)
+
+    def abandon(self, decision):
+        """keeps track of a timed out decision, replacing the pool when it's
+        held up by as many of them as it has threads"""
+        with self._lock:
+            self._abandoned = {future for future in self._abandoned if not future.done()}
+            self._abandoned.add(decision)
+            if len(self._abandoned) >= self.workers:
+                logger.warning('bot decisions are stuck, starting a new pool')
+                self.decisions.shutdown(wait=False)
+                self.decisions = self.decision_pool()
+                self._abandoned = set()
+
+    def play_bots(self, game_id:int) -> float|None:
+        """makes the bot moves that are due in a game, until a person is on turn
+
+        Returns:
+            float: seconds until the game can go on, if a trick is still on
+            show, None otherwise
+        """
+        for _ in range(MAX_BOT_MOVES):
+            snapshot = GameSnapshot.load(game_id, None)
+            game, cur_round = snapshot.game, snapshot.cur_round
+            if (game.finished or cur_round is None
+                    or not any(player.is_bot for player in snapshot.players)):
+                return None
+            remaining = cur_round.reveal_remaining()
+            if remaining:
+                return remaining.total_seconds()
+            if remaining is not None:
+                if game.resolve_trick(cur_round=cur_round):
+                    publish_game(game_id, 'finished' if game.finished else 'trick')
+                continue
+            if not bot_on_turn(snapshot):
+                return None
+            player = on_turn(snapshot)
+            kind, value = self.decide(snapshot.state, player)
+            try:
+                submit_move(game_id, player.id, kind, value, expected_version=game.version)
+            except (Conflict, MoveError):
+                # someone got there first, look at the game again
+                continue
+        return None
@@ -0,0 +1,59 @@
+"""Computer players that pick bets and cards from an engine ``GameState``.
+
+Bots only ever see the engine state, so the same policy drives headless
+simulations and, through a saved state, seats in a real game.
+"""
+from random import Random
+from . import engine
+
+class RandomBot:
+    """bets and plays uniformly at random within the rules"""
+    def __init__(self, rng:Random=None):
+        self.rng = rng or Random()
+
+    def choose_bet(self, state:engine.GameState, player:engine.PlayerState) -> int:
+        return self.rng.choice(state.bet_range(player))
+
+    def choose_card(self, state:engine.GameState, player:engine.PlayerState) -> int:
+        return self.rng.choice(engine.cards_in(state.playable_cards(player)))
+
+class GreedyBot(RandomBot):
+    """bets on its high cards and trumps, then plays to hit that bet
+
+    While short of its bet it takes the trick as cheaply as it can, and once
+    it has enough wins it throws its lowest card.
+    """
+    def strong_cards(self, state, player):
+        trump_suit = state.round.trump_suit
+        return sum(1 for card in engine.cards_in(player.hand)
+                   if engine.rank_of(card) >= 12
+                   or (engine.suit_of(card) == trump_suit and engine.rank_of(card) >= 9))
+
+    def choose_bet(self, state, player):
+        target = self.strong_cards(state, player)
+        return min(state.bet_range(player), key=lambda bet: (abs(bet - target), bet))
+
+    def winning_card(self, state):
+        """returns the card currently winning the trick, if any"""
+        table = [player.cur_card for player in state.playing_order
+                 if player.cur_card is not None]
+        if table:
+            return table[engine.trick_winner(table, state.round.trump_suit)]
+
+    def choose_card(self, state, player):
+        trump_suit = state.round.trump_suit
+        # trumps sort above everything else, then by rank
+        strength = lambda card: (engine.suit_of(card) == trump_suit, engine.rank_of(card))
+        playable = sorted(engine.cards_in(state.playable_cards(player)), key=strength)
+        if player.wins >= player.bet:
+            return playable[0]
+        winning = self.winning_card(state)
+        if winning is None:
+            return playable[-1]
+        for card in playable:
+            if engine.is_better(card, winning, trump_suit):
+                return card
+        return playable[0]
+
+BOTS = {'random': RandomBot,
+        'greedy': GreedyBot,}
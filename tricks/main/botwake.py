@@ -0,0 +1,28 @@
+"""Waking the bot runner, kept apart from it so the move pipeline can call it.
+
+``botrunner`` submits its moves through ``moves``, and ``moves`` wakes the
+runner after every move in a game with bots, so the runner itself is only
+imported, through the ``BOT_RUNNER`` setting, the first time it is needed.
+"""
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+_bot_runner = None
+_bot_runner_lock = threading.Lock()
+
+def get_bot_runner():
+    global _bot_runner
+    if _bot_runner is None:
+        # commits on two threads at once must not start two runners
+        with _bot_runner_lock:
+            if _bot_runner is None:
+                runner_path = getattr(settings, 'BOT_RUNNER', 'main.botrunner.BotRunner')
+                _bot_runner = import_string(runner_path)()
+    return _bot_runner
+
+def wake_bots(game_id):
+    """hands a game with bot seats to the bot runner once the transaction
+    commits, so the bots see the change that woke them"""
+    transaction.on_commit(lambda: get_bot_runner().nudge(game_id))
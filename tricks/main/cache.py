@@ -0,0 +1,89 @@
+"""A local memory cache bounded by bytes instead of entries.
+
+``LocMemCache`` already keeps its keys in least recently used order, but it
+only caps how many there are, and drops a third of them at once when full.
+Rendered fragments vary a lot in size, so ``ByteBudgetCache`` caps the total
+size of the pickled values at ``OPTIONS['MAX_BYTES']`` instead, and evicts
+least recently used entries one at a time until a new value fits.
+"""
+import sys
+from threading import Lock
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+MAX_BYTES = 32 * 2**20
+
+# sizes of the pickled values, keyed by cache name like LocMemCache's data
+_sizes = {}
+_usage_lock = Lock()
+
+class Usage:
+    """the sizes of the values in one named cache, and their total"""
+    def __init__(self):
+        self.sizes = {}
+        self.bytes = 0
+
+    def add(self, key, size):
+        self.discard(key)
+        self.sizes[key] = size
+        self.bytes += size
+
+    def discard(self, key):
+        self.bytes -= self.sizes.pop(key, 0)
+
+    def clear(self):
+        self.sizes.clear()
+        self.bytes = 0
+
+class ByteBudgetCache(LocMemCache):
+    """LocMemCache holding at most MAX_BYTES of pickled values"""
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        options = params.get('OPTIONS', {})
+        self.max_bytes = int(options.get('MAX_BYTES', MAX_BYTES))
+        if 'MAX_ENTRIES' not in options:
+            # the byte budget is the only limit unless asked otherwise
+            self._max_entries = sys.maxsize
+        with _usage_lock:
+            self.usage = _sizes.setdefault(name, Usage())
+
+    @property
+    def size(self) -> int:
+        """returns the bytes held"""
+        return self.usage.bytes
+
+    def _evict_lru(self):
+        # LocMemCache moves used keys to the front, so the last one is the LRU
+        key = next(reversed(self._cache))
+        self._delete(key)
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._delete(key)
+        if len(value) > self.max_bytes:
+            # it would push out everything else and still not fit
+            return
+        while self._cache and (self.usage.bytes + len(value) > self.max_bytes
+                               or len(self._cache) >= self._max_entries):
+            self._evict_lru()
+        super()._set(key, value, timeout)
+        self.usage.add(key, len(value))
+
+    def _cull(self):
+        self._evict_lru()
+
+    def _delete(self, key):
+        self.usage.discard(key)
+        return super()._delete(key)
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        with self._lock:
+            key = self.make_and_validate_key(key, version=version)
+            self.usage.add(key, len(self._cache[key]))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_info.clear()
+            self.usage.clear()
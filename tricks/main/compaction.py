@@ -0,0 +1,139 @@
+"""Compacting finished games into one archived row each.
+
+A finished game no longer needs its ``Round`` rows, the ``Game.rounds``
+through rows or its event log, but they sit in the same tables and indexes
+the live games are polled from. ``compact_finished_games`` replaces them with
+a single zlib compressed ``ArchivedGame`` holding the final scores, every
+round's bets, wins and tricks, and the raw log itself, so nothing is lost.
+Games are archived and deleted a bounded batch at a time, each batch in its
+own transaction, so the job never holds long locks or builds huge deletes.
+
+``game_history`` is the read path: it returns the same history for archived
+games and for finished games that haven't been compacted yet. Games that
+finished before the event log existed are left as they are.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .export import game_rows
+from .models import ArchivedGame, Card, Game, GameEvent, Round, StateSnapshot
+
+# finished games are left alone this long, while players look at the result
+ARCHIVE_AFTER = timedelta(hours=1)
+BATCH_SIZE = 50
+
+def build_history(game:Game) -> dict:
+    """returns a finished game's history from its players and event log"""
+    players = game.players.select_related('user').order_by('bet_pos')
+    seating = StateSnapshot.objects.filter(game=game.id, event=None).first()
+    events = [list(event) for event in GameEvent.objects.filter(game=game.id)
+              .order_by('id').values_list('kind', 'player', 'value')]
+    rounds = []
+    if seating is None:
+        # finished before the event log: the rows only know each round's trump
+        for cur_round in Round.objects.filter(game=game.id).order_by('-num'):
+            trump = cur_round.trump_id and Card.objects.lookup(cur_round.trump_id).index
+            rounds.append({'num': cur_round.num, 'trump': trump, 'bets': [], 'tricks': []})
+    else:
+        for row in game_rows(game.id, game.finished_at, seating.to_state(), events):
+            if not rounds or rounds[-1]['num'] != row['round']:
+                rounds.append({'num': row['round'], 'trump': row['trump'],
+                               'bets': [], 'tricks': []})
+            if row['kind'] == 'bet':
+                rounds[-1]['bets'].append([row['player'], row['bet']])
+            else:
+                rounds[-1]['tricks'].append({'players': row['players'],
+                                             'cards': row['cards'],
+                                             'winner': row['player']})
+    return {'game': game.id,
+            'num_of_rounds': game.num_of_rounds,
+            'finished': game.finished_at.isoformat() if game.finished_at else None,
+            'players': [{'id': player.id, 'name': player.user.username,
+                         'score': player.score} for player in players],
+            'rounds': rounds,
+            'log': {'seating': seating and seating.state, 'events': events},}
+
+def archive_games(games:list[Game]) -> int:
+    """archives a batch of finished games and deletes what the archive replaces
+
+    Returns:
+        int: the number of games archived
+    """
+    ids = [game.id for game in games]
+    with transaction.atomic():
+        archives = [ArchivedGame(game=game, data=ArchivedGame.pack(build_history(game)))
+                    for game in games]
+        # another run may have archived some of them since they were picked
+        ArchivedGame.objects.bulk_create(archives, ignore_conflicts=True)
+        StateSnapshot.objects.filter(game__in=ids).delete()
+        GameEvent.objects.filter(game__in=ids).delete()
+        Round.objects.filter(game__in=ids).delete()
+    return len(ids)
+
+def compactable(older_than:timedelta=ARCHIVE_AFTER):
+    """returns the finished games due for archiving, oldest first
+
+    Games that finished before the event log have no seating snapshot, and
+    their rows are all there is of their rounds, so they are never archived.
+    """
+    seating = StateSnapshot.objects.filter(game=OuterRef('pk'), event=None)
+    return (Game.objects.filter(Exists(seating), finished=True, archive__isnull=True,
+                                finished_at__lt=timezone.now() - older_than)
+            .order_by('id'))
+
+def compact_finished_games(batch_size:int=BATCH_SIZE, older_than:timedelta=ARCHIVE_AFTER,
+                           max_batches:int=None, pause:float=0) -> int:
+    """archives finished games a batch at a time until none are due
+
+    Args:
+        max_batches (int, optional): stop after this many batches
+        pause (float, optional): seconds to sleep between batches
+
+    Returns:
+        int: the number of games archived
+    """
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        games = list(compactable(older_than)[:batch_size])
+        if not games:
+            break
+        archived += archive_games(games)
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return archived
+
+def game_history(game:Game) -> dict:
+    """returns a finished game's history, archived or not"""
+    try:
+        return game.archive.history
+    except ArchivedGame.DoesNotExist:
+        return build_history(game)
+
+def history_context(history:dict) -> dict:
+    """returns the template context for a game's history page"""
+    names = {player['id']: player['name'] for player in history['players']}
+    catalog = Card.objects.catalog()
+    rounds = []
+    for cur_round in history['rounds']:
+        wins = Counter(trick['winner'] for trick in cur_round['tricks'])
+        rounds.append({
+            'num': cur_round['num'],
+            'trump': catalog[cur_round['trump']] if cur_round['trump'] is not None else None,
+            'bets': [{'name': names[player], 'bet': bet, 'wins': wins[player]}
+                     for player, bet in cur_round['bets']],
+            'tricks': [{'winner': names[trick['winner']],
+                        'cards': [(names[player], catalog[card]) for player, card
+                                  in zip(trick['players'], trick['cards'])]}
+                       for trick in cur_round['tricks']],
+        })
+    players = sorted(history['players'], key=lambda player: -player['score'])
+    top = players[0]['score'] if players else None
+    return {'game_id': history['game'],
+            'players': players,
+            'winners': [player for player in players if player['score'] == top],
+            'rounds': rounds,}
@@ -0,0 +1,295 @@
+"""Database-free rules engine for tricks.
+
+Cards are plain integers ``0..51`` in catalog order (``suit * 13 + rank - 2``
+with suits ordered hearts, diamonds, clubs, spades), and hands, decks and
+tables are bitmasks of those integers, matching the ``*_mask`` columns on the
+models. Rule checks here never touch the database; the Django models load a
+``GameState`` snapshot, run the rules on it and save the result back.
+"""
+from collections import deque
+from random import Random, shuffle
+
+SUITS = ('h', 'd', 'c', 's')
+RANKS = tuple(range(2, 15))
+DECK_SIZE = len(SUITS) * len(RANKS)
+
+def suit_of(card:int) -> int:
+    return card // 13
+
+def rank_of(card:int) -> int:
+    return card % 13 + 2
+
+def card_code(suit:int, rank:int) -> int:
+    return suit * 13 + rank - 2
+
+def cards_in(mask:int) -> list[int]:
+    """returns the cards set in a mask, lowest first"""
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(low.bit_length() - 1)
+        mask ^= low
+    return cards
+
+def mask_of(cards) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+SUIT_MASKS = tuple(mask_of(range(suit * 13, suit * 13 + 13)) for suit in range(len(SUITS)))
+
+def shuffled_deck(seed:int) -> list[int]:
+    """returns the ordering of the 52 cards that a deal with this seed uses"""
+    deck = list(range(DECK_SIZE))
+    Random(seed).shuffle(deck)
+    return deck
+
+def is_better(card:int, winning_card:int, trump_suit:int) -> bool:
+    """checks if card beats the card currently winning the trick"""
+    if suit_of(card) == suit_of(winning_card):
+        return card > winning_card
+    elif suit_of(card) == trump_suit:
+        return True
+    else:
+        return False
+
+def playable_cards(hand:int, trick:int|None, trump:int|None) -> int:
+    """returns the mask of cards in hand that may be played
+
+    Any card may lead. After that a player plays the trick suit or trump,
+    and only when holding neither may they play anything.
+    """
+    if trick is None:
+        return hand
+    playable = hand & SUIT_MASKS[suit_of(trick)]
+    if trump is not None:
+        playable |= hand & SUIT_MASKS[suit_of(trump)]
+    return playable or hand
+
+def bet_range(cards_dealt:int, round_num:int, bet_sum:int, last_bet:bool) -> list[int]:
+    """returns the bets a player may place
+
+    The last player to bet may not bring the total bets level with the
+    number of tricks in the round.
+    """
+    bets = list(range(cards_dealt + 1))
+    if last_bet:
+        cant_bet = round_num - bet_sum
+        if cant_bet in bets:
+            bets.remove(cant_bet)
+    return bets
+
+def trick_winner(cards:list[int], trump_suit:int) -> int:
+    """returns the index of the winning card in a trick given in play order"""
+    winner = 0
+    for idx in range(1, len(cards)):
+        if is_better(cards[idx], cards[winner], trump_suit):
+            winner = idx
+    return winner
+
+class PlayerState:
+    __slots__ = ('id', 'hand', 'bet', 'wins', 'score', 'bet_pos', 'play_pos', 'cur_card')
+
+    def __init__(self, id, hand=0, bet=None, wins=0, score=0,
+                 bet_pos=0, play_pos=0, cur_card=None):
+        self.id = id
+        self.hand = hand
+        self.bet = bet
+        self.wins = wins
+        self.score = score
+        self.bet_pos = bet_pos
+        self.play_pos = play_pos
+        self.cur_card = cur_card
+
+    def __repr__(self):
+        return f'PlayerState({self.id})'
+
+    def calc_score(self):
+        if self.bet == self.wins:
+            self.score += 10 + self.bet
+
+class RoundState:
+    __slots__ = ('id', 'num', 'dealer', 'deck', 'table', 'trump', 'trick', 'bet_sum')
+
+    def __init__(self, num, dealer, id=None, deck=0, table=0,
+                 trump=None, trick=None, bet_sum=0):
+        self.id = id
+        self.num = num
+        self.dealer = dealer
+        self.deck = deck
+        self.table = table
+        self.trump = trump
+        self.trick = trick
+        self.bet_sum = bet_sum
+
+    def __repr__(self):
+        return f'RoundState({self.num})'
+
+    @property
+    def trump_suit(self):
+        if self.trump is not None:
+            return suit_of(self.trump)
+
+    @property
+    def cards_dealt(self):
+        return self.num if self.deck else 0
+
+class GameState:
+    """snapshot of a game that owns all rule logic and transitions"""
+    __slots__ = ('num_of_rounds', 'players', 'round', 'finished')
+
+    def __init__(self, players:list[PlayerState], num_of_rounds:int=7,
+                 round:RoundState=None, finished:bool=False):
+        self.num_of_rounds = num_of_rounds
+        self.players = players
+        self.round = round
+        self.finished = finished
+
+    def __repr__(self):
+        return f'GameState({self.players}, {self.round})'
+
+    def to_dict(self) -> dict:
+        """returns the state as plain JSON types, see from_dict"""
+        cur_round = self.round
+        return {'num_of_rounds': self.num_of_rounds,
+                'finished': self.finished,
+                'players': [[getattr(player, slot) for slot in PlayerState.__slots__]
+                            for player in self.players],
+                'round': cur_round and [getattr(cur_round, slot)
+                                        for slot in RoundState.__slots__],}
+
+    @classmethod
+    def from_dict(cls, data:dict) -> 'GameState':
+        players = [PlayerState(*values) for values in data['players']]
+        cur_round = data['round']
+        if cur_round is not None:
+            cur_round = RoundState(**dict(zip(RoundState.__slots__, cur_round)))
+        return cls(players, data['num_of_rounds'], cur_round, data['finished'])
+
+    def player(self, player_id) -> PlayerState:
+        for player in self.players:
+            if player.id == player_id:
+                return player
+        raise KeyError(player_id)
+
+    @property
+    def betting_order(self) -> list[PlayerState]:
+        return sorted(self.players, key=lambda player: player.bet_pos)
+
+    @property
+    def playing_order(self) -> list[PlayerState]:
+        return sorted(self.players, key=lambda player: player.play_pos)
+
+    @property
+    def betting_player(self) -> PlayerState|None:
+        for player in self.betting_order:
+            if player.bet is None:
+                return player
+
+    @property
+    def playing_player(self) -> PlayerState|None:
+        for player in self.playing_order:
+            if player.cur_card is None:
+                return player
+
+    @property
+    def card_play_ready(self) -> bool:
+        return all(player.bet is not None for player in self.players)
+
+    def bet_range(self, player:PlayerState) -> list[int]:
+        cur_round = self.round
+        last_bet = player is self.betting_order[-1]
+        return bet_range(cur_round.cards_dealt, cur_round.num, cur_round.bet_sum, last_bet)
+
+    def playable_cards(self, player:PlayerState) -> int:
+        return playable_cards(player.hand, self.round.trick, self.round.trump)
+
+    def trick_winner(self) -> PlayerState:
+        players = self.playing_order
+        idx = trick_winner([player.cur_card for player in players], self.round.trump_suit)
+        return players[idx]
+
+    def trick_complete(self) -> bool:
+        return self.round.table.bit_count() == len(self.players)
+
+    def round_complete(self) -> bool:
+        if self.round.num == 1:
+            return True
+        return not any(player.hand for player in self.players)
+
+    def winners(self) -> list[PlayerState]:
+        top = max(player.score for player in self.players)
+        return [player for player in self.players if player.score == top]
+
+    def deal(self, deck:list[int]=None):
+        """deals the round from a shuffled ordering of the 52 cards"""
+        if deck is None:
+            deck = list(range(DECK_SIZE))
+            shuffle(deck)
+        else:
+            deck = list(deck)
+        for player in self.betting_order:
+            player.hand = mask_of(deck.pop() for _ in range(self.round.num))
+        self.round.trump = deck.pop()
+        self.round.deck = mask_of(deck)
+
+    def set_bet(self, player:PlayerState, bet:int):
+        player.bet = bet
+        self.round.bet_sum += bet
+
+    def play_card(self, player:PlayerState, card:int):
+        player.cur_card = card
+        player.hand &= ~(1 << card)
+        self.round.table |= 1 << card
+        if self.round.trick is None:
+            self.round.trick = card
+
+    def update_play_order(self, starting_player:PlayerState):
+        players = deque(self.playing_order)
+        players.rotate(-players.index(starting_player))
+        for play_pos, player in enumerate(players):
+            player.play_pos = play_pos
+
+    def end_trick(self) -> PlayerState:
+        winner = self.trick_winner()
+        winner.wins += 1
+        self.update_play_order(winner)
+        return winner
+
+    def start_new_trick(self):
+        for player in self.players:
+            player.cur_card = None
+        self.round.table = 0
+        self.round.trick = None
+
+    def rotate_dealer(self):
+        players = deque(self.betting_order)
+        players.rotate(-1)
+        for pos, player in enumerate(players):
+            player.bet_pos = pos
+            player.play_pos = pos
+
+    def reset_bets_and_wins(self):
+        for player in self.players:
+            player.bet = None
+            player.wins = 0
+
+    def end_round(self):
+        for player in self.players:
+            player.calc_score()
+        if self.round.num != 1:
+            self.reset_bets_and_wins()
+
+    def start_new_round(self, deck:list[int]=None) -> RoundState:
+        if self.round is not None:
+            self.rotate_dealer()
+            round_num = self.round.num - 1
+        else:
+            round_num = self.num_of_rounds
+        self.round = RoundState(round_num, self.betting_order[0].id)
+        self.deal(deck)
+        return self.round
+
+    def end_game(self):
+        self.finished = True
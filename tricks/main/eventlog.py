@@ -0,0 +1,121 @@
+"""Rebuilding game state from the append-only event log.
+
+Every transition of a game appends one ``GameEvent``: the seed of each deal,
+every bet and card, the winner of each trick and the clearing of the table.
+``fold`` replays events on an engine ``GameState`` with the same engine calls
+the move pipeline and the models make, so any point of a game can be rebuilt
+from the seating snapshot taken before its first deal.
+
+The log is what a game's state is read from while it is played: bets and
+cards are only appended to it (``moves.apply_move``), and ``GameSnapshot``
+and ``Game.load_state`` rebuild the state from the log. The ``Player`` and
+``Round`` rows catch up at each transition, when ``Game.resolve_trick``
+clears a trick and saves the state, and new rounds are dealt into them; in
+between they lag by the moves of the current trick. Games from before the
+log are still played from their rows.
+
+Replays start from the latest ``StateSnapshot`` rather than the first event.
+``Game.resolve_trick`` takes one with every trick it clears, so a rebuild
+folds the current trick's events, and at the start of a round the deal and
+the bets. ``rebuild`` also takes one when it had to fold ``SNAPSHOT_EVERY``
+events or more.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from . import engine
+from .models import GameEvent, StateSnapshot
+
+SNAPSHOT_EVERY = 64
+
+class CorruptLog(Exception):
+    """the events don't replay to a legal game"""
+
+def apply_event(state:engine.GameState, kind:str, player_id:int=None, value:int=None):
+    """replays one event on state, in place"""
+    if kind == GameEvent.DEAL:
+        state.start_new_round(engine.shuffled_deck(value))
+    elif kind == GameEvent.BET:
+        state.set_bet(state.player(player_id), value)
+    elif kind == GameEvent.CARD:
+        state.play_card(state.player(player_id), value)
+    elif kind == GameEvent.TRICK:
+        winner = state.end_trick()
+        if winner.id != player_id:
+            raise CorruptLog(f'Player {player_id} did not win the trick.')
+    elif kind == GameEvent.CLEAR:
+        # mirrors Game.resolve_trick; the next round's deal is its own event
+        if state.round.num == 1:
+            state.end_round()
+            state.end_game()
+        else:
+            state.start_new_trick()
+            if state.round_complete():
+                state.end_round()
+    else:
+        raise CorruptLog(f'Unknown event {kind}.')
+
+def fold(state:engine.GameState, events) -> engine.GameState:
+    """replays events, in order, on state
+
+    Args:
+        state (engine.GameState): state as of just before the first event
+        events (iterable): GameEvents, or (kind, player_id, value) tuples
+
+    Returns:
+        engine.GameState: state, after the events
+    """
+    for event in events:
+        if isinstance(event, GameEvent):
+            event = (event.kind, event.player_id, event.value)
+        apply_event(state, *event)
+    return state
+
+def latest_snapshot(game_id:int) -> StateSnapshot|None:
+    return (StateSnapshot.objects.filter(game=game_id)
+            .order_by(F('event_id').desc(nulls_last=True), '-id').first())
+
+def tail(game_id:int, snapshot:StateSnapshot):
+    """returns the game's events after the snapshot, oldest first"""
+    events = GameEvent.objects.filter(game=game_id)
+    if snapshot.event_id is not None:
+        events = events.filter(id__gt=snapshot.event_id)
+    return events.order_by('id').values_list('id', 'kind', 'player_id', 'value')
+
+def rebuild(game_id:int, snapshot_every:int=SNAPSHOT_EVERY) -> engine.GameState|None:
+    """returns the game's current state from its latest snapshot and the events after it
+
+    Takes a new snapshot if snapshot_every or more events had to be folded.
+
+    Returns:
+        engine.GameState: None if the game has not been dealt yet
+    """
+    snapshot = latest_snapshot(game_id)
+    if snapshot is None:
+        return None
+    state = snapshot.to_state()
+    events = list(tail(game_id, snapshot))
+    fold(state, (event[1:] for event in events))
+    if snapshot_every and len(events) >= snapshot_every:
+        try:
+            with transaction.atomic():
+                StateSnapshot.take(game_id, state, events[-1][0])
+        except IntegrityError:
+            # the game or its events went away while we were folding
+            pass
+    return state
+
+def history(game_id:int):
+    """replays a whole game from its seating
+
+    Yields:
+        tuple[GameEvent, engine.GameState]: each event, and the state right
+        after it; the state is the same object every time, updated in place
+    """
+    first = (StateSnapshot.objects.filter(game=game_id, event=None)
+             .order_by('id').first())
+    if first is None:
+        return
+    state = first.to_state()
+    for event in GameEvent.objects.filter(game=game_id).order_by('id').iterator():
+        apply_event(state, event.kind, event.player_id, event.value)
+        yield event, state
@@ -0,0 +1,169 @@
+"""Flat rows of finished games for analysis, read from the event log.
+
+``export_rows`` walks finished games in the order they finished, in keyset
+pages of ``(finished_at, id)``, and replays each page's events, so an export only ever holds one page in memory. It reads the
+append-only ``GameEvent`` and ``StateSnapshot`` tables, or the archives of
+compacted games, never the rows live games are played on. Every bet and every
+trick becomes one row:
+
+- bet: ``player`` bet ``bet``
+- trick: ``players`` played ``cards`` in that order, and ``player`` won it
+
+Both kinds carry the game, when it finished, the round's number (the cards
+dealt in it) and its trump card. Cards are engine indexes, see ``engine``.
+
+``JsonlWriter`` writes gzip JSON lines. ``ParquetWriter`` writes the same
+rows in row groups with pyarrow, and is only available when it is installed.
+"""
+import gzip
+import json
+from itertools import groupby
+from django.db.models import Q
+from . import engine
+from .eventlog import apply_event
+from .models import ArchivedGame, Game, GameEvent, StateSnapshot
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FIELDS = ('game', 'finished', 'round', 'trump', 'kind', 'trick',
+          'player', 'bet', 'players', 'cards')
+
+def finished_games(since=None, chunk_size:int=500):
+    """yields pages of (id, finished_at) for finished games, in finishing order
+
+    Args:
+        since (datetime, optional): only games finished after this
+    """
+    games = Game.objects.filter(finished=True).order_by('finished_at', 'id')
+    if since is not None:
+        games = games.filter(finished_at__gt=since)
+    page = list(games.values_list('id', 'finished_at')[:chunk_size])
+    while page:
+        yield page
+        last_id, last_finished = page[-1]
+        page = list(games.filter(Q(finished_at__gt=last_finished)
+                                 | Q(finished_at=last_finished, id__gt=last_id))
+                    .values_list('id', 'finished_at')[:chunk_size])
+
+def game_rows(game_id:int, finished, state:engine.GameState, events):
+    """replays one game's events from its seating, yielding its rows
+
+    Args:
+        state (engine.GameState): the seating snapshot
+        events (iterable): (kind, player_id, value) in log order
+    """
+    base = {'game': game_id, 'finished': finished.isoformat() if finished else None}
+    table = []
+    trick = 0
+    for kind, player_id, value in events:
+        if kind == GameEvent.DEAL:
+            trick = 0
+        elif kind == GameEvent.CARD:
+            table.append((player_id, value))
+        apply_event(state, kind, player_id, value)
+        if kind == GameEvent.BET:
+            yield dict(base, **round_fields(state), kind='bet', trick=None,
+                       player=player_id, bet=value, players=None, cards=None)
+        elif kind == GameEvent.TRICK:
+            yield dict(base, **round_fields(state), kind='trick', trick=trick,
+                       player=player_id, bet=None,
+                       players=[player for player, _ in table],
+                       cards=[card for _, card in table])
+            table = []
+            trick += 1
+
+def round_fields(state):
+    return {'round': state.round.num, 'trump': state.round.trump}
+
+def export_rows(since=None, chunk_size:int=500, stats:dict=None):
+    """yields the rows of every finished game, a page of games at a time
+
+    Archived games are read from their archive. Games finished before the
+    event log existed have no seating snapshot and are skipped.
+
+    If given, stats is filled in with the games exported and skipped and the
+    latest finish time seen, to pass as since next time.
+    """
+    stats = {} if stats is None else stats
+    stats.update(games=0, skipped=0, last_finished=None)
+    for page in finished_games(since, chunk_size):
+        ids = [game_id for game_id, _ in page]
+        seatings = {snapshot.game_id: snapshot.to_state() for snapshot in
+                    StateSnapshot.objects.filter(game__in=ids, event=None)}
+        events = (GameEvent.objects.filter(game__in=ids).order_by('game', 'id')
+                  .values_list('game', 'kind', 'player', 'value').iterator(chunk_size=2000))
+        events = {game_id: [event[1:] for event in group]
+                  for game_id, group in groupby(events, key=lambda event: event[0])}
+        # compacted games keep their log in the archive
+        missing = [game_id for game_id in ids if game_id not in seatings]
+        for archive in ArchivedGame.objects.filter(game__in=missing):
+            log = archive.history['log']
+            if log['seating']:
+                seatings[archive.game_id] = engine.GameState.from_dict(log['seating'])
+                events[archive.game_id] = log['events']
+        for game_id, finished in page:
+            if finished:
+                stats['last_finished'] = max(finished, stats['last_finished'] or finished)
+            if game_id not in seatings:
+                stats['skipped'] += 1
+                continue
+            stats['games'] += 1
+            yield from game_rows(game_id, finished, seatings[game_id],
+                                 events.get(game_id, ()))
+
+class JsonlWriter:
+    """writes rows as gzip compressed JSON lines"""
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, separators=(',', ':')))
+            self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """writes rows to a Parquet file in row groups of batch_size rows"""
+    def __init__(self, path, batch_size:int=50000):
+        if pyarrow is None:
+            raise ImportError('writing Parquet needs pyarrow installed')
+        self.schema = pyarrow.schema([
+            ('game', pyarrow.int64()),
+            ('finished', pyarrow.string()),
+            ('round', pyarrow.int8()),
+            ('trump', pyarrow.int8()),
+            ('kind', pyarrow.string()),
+            ('trick', pyarrow.int8()),
+            ('player', pyarrow.int64()),
+            ('bet', pyarrow.int8()),
+            ('players', pyarrow.list_(pyarrow.int64())),
+            ('cards', pyarrow.list_(pyarrow.int8())),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd')
+        self.batch_size = batch_size
+
+    def write(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+
+    def flush(self, batch):
+        columns = {field: [row[field] for row in batch] for field in FIELDS}
+        self.writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+WRITERS = {'jsonl': JsonlWriter,
+           'parquet': ParquetWriter,}
@@ -0,0 +1,52 @@
+"""Rendered game fragments, cached per game version and viewer.
+
+The sidebar and the table are rendered for one viewer from one version of a
+game, so ``(game, version, viewer, fragment)`` names the html exactly: any
+change to the game bumps its version and moves on to new keys, and the old
+ones just age out of the cache. A poll for a version that was already
+rendered for that viewer costs the version lookup and one cache hit, without
+loading the game or rendering a template.
+
+Fragments are kept in the ``FRAGMENT_CACHE`` cache, by default the
+``fragments`` alias, a ``cache.ByteBudgetCache``. The csrf token is left out
+of the cached html and filled in for each response, since it belongs to the
+browser, not the game. Nothing is cached while a trick is on show, because
+the table counts down to its reveal ending and the poll that follows is what
+clears the trick.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+FRAGMENT_TTL = 300
+CSRF_PLACEHOLDER = '__fragment_csrf_token__'
+
+def fragment_cache():
+    alias = getattr(settings, 'FRAGMENT_CACHE', 'fragments')
+    return caches[alias if alias in settings.CACHES else 'default']
+
+def fragment_key(game_id:int, version:int, viewer_id:int, fragment:str) -> str:
+    return f'fragment:{game_id}:{version}:{viewer_id}:{fragment}'
+
+def fragment_response(request, html:str, status:int) -> HttpResponse:
+    return HttpResponse(html.replace(CSRF_PLACEHOLDER, get_token(request)), status=status)
+
+def cached_fragment(request, game_id:int, version:int, fragment:str):
+    """returns the response for a fragment rendered before, or None"""
+    if version is None:
+        return None
+    cached = fragment_cache().get(fragment_key(game_id, version, request.user.id, fragment))
+    if cached is None:
+        return None
+    return fragment_response(request, *cached)
+
+def render_fragment(request, game, fragment:str, template:str, context:dict,
+                    status:int=200) -> HttpResponse:
+    """renders a fragment of a game for the requesting user, caching it"""
+    html = render_to_string(template, dict(context, csrf_token=CSRF_PLACEHOLDER), request)
+    if not context.get('trick_revealing'):
+        fragment_cache().set(fragment_key(game.id, game.version, request.user.id, fragment),
+                             (html, status), FRAGMENT_TTL)
+    return fragment_response(request, html, status)
@@ -0,0 +1,73 @@
+"""The lobby: games still waiting for players, newest first.
+
+A game is open until its first deal sets ``current_round``, and the partial
+index ``open_games`` covers exactly those rows in lobby order, so a page is an
+index range scan however many finished games the table holds. Pages are
+keyset paginated on ``(created, id)``: the cursor is the last game shown, and
+the next page starts strictly after it, so paging never skips or repeats a
+game and never counts or offsets past earlier rows.
+
+Seat counts for a page come from one grouped query over the page's ids, and
+the whole page is cached for ``LOBBY_TTL``. However many users refresh the
+lobby, each page is built at most once per TTL per process.
+"""
+from datetime import datetime, timedelta, timezone
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Game
+
+LOBBY_PAGE_SIZE = 20
+LOBBY_TTL = 2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_cursor(created:datetime, game_id:int) -> str:
+    """returns an opaque cursor for the game a page ended at"""
+    micros = (created - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{game_id}'
+
+def decode_cursor(cursor:str):
+    """returns the (created, id) a cursor points at
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    micros, game_id = cursor.split('.')
+    try:
+        return EPOCH + timedelta(microseconds=int(micros)), int(game_id)
+    except OverflowError:
+        raise ValueError(f'{cursor} is out of range')
+
+def open_games():
+    """returns the games that can still be joined, in lobby order"""
+    return (Game.objects.filter(current_round__isnull=True, finished=False,
+                                created__isnull=False)
+            .order_by('-created', '-id'))
+
+def load_page(cursor:str=None, limit:int=LOBBY_PAGE_SIZE) -> dict:
+    """returns one lobby page, without the cache
+
+    Returns:
+        dict: games as dicts with id, created, num_of_rounds and seats, and
+        next, the cursor of the following page or None on the last one
+    """
+    games = open_games()
+    if cursor:
+        created, game_id = decode_cursor(cursor)
+        games = games.filter(Q(created__lt=created) | Q(created=created, id__lt=game_id))
+    games = list(games.values('id', 'created', 'num_of_rounds')[:limit + 1])
+    has_more = len(games) > limit
+    games = games[:limit]
+    seats = dict(Game.players.through.objects
+                 .filter(game__in=[game['id'] for game in games])
+                 .values_list('game').annotate(seats=Count('player')))
+    for game in games:
+        game['seats'] = seats.get(game['id'], 0)
+    last = games[-1] if has_more else None
+    return {'games': games,
+            'next': last and encode_cursor(last['created'], last['id']),}
+
+def lobby_page(cursor:str=None, limit:int=LOBBY_PAGE_SIZE) -> dict:
+    """returns one lobby page, cached for LOBBY_TTL seconds"""
+    key = f'lobby:{limit}:{cursor or ""}'
+    return cache.get_or_set(key, lambda: load_page(cursor, limit), LOBBY_TTL)
@@ -0,0 +1,46 @@
+import os
+from multiprocessing import Pool
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from main.bots import BOTS
+from main.simulation import time_decisions
+
+class Command(BaseCommand):
+    help = 'times bot bets and cards and reports decisions/sec per core'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--decisions', type=int, default=100000,
+                            help='decisions each worker makes')
+        parser.add_argument('--players', type=int, default=4)
+        parser.add_argument('--rounds', type=int, default=7,
+                            help='num_of_rounds, the cards dealt in the first round')
+        parser.add_argument('--bot', choices=sorted(BOTS),
+                            default=getattr(settings, 'BOT_POLICY', 'greedy'))
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='processes to time in, 1 times in this process')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, decisions, players, rounds, bot, workers, seed, **options):
+        if players < 2:
+            raise CommandError('a game needs at least 2 players')
+        if players * rounds + 1 > 52:
+            raise CommandError(f'{players} players cannot be dealt {rounds} cards each')
+        tasks = [(decisions, players, rounds, bot, None if seed is None else seed + idx)
+                 for idx in range(max(workers, 1))]
+        if workers > 1:
+            with Pool(workers) as pool:
+                results = pool.starmap(time_decisions, tasks)
+        else:
+            results = [time_decisions(*task) for task in tasks]
+
+        made = sum(result['decisions'] for result in results)
+        seconds = sum(result['seconds'] for result in results)
+        slowest = max(result['slowest'] for result in results)
+        budget = getattr(settings, 'BOT_MOVE_BUDGET', 0.25)
+        self.stdout.write(f'{made} decisions of {bot} bots, {players} players, '
+                          f'{rounds} rounds, {len(results)} worker(s)')
+        self.stdout.write(f'{made / seconds:,.0f} decisions/sec per core, '
+                          f'{seconds / made * 1e6:.1f}us each on average')
+        self.stdout.write(f'slowest decision: {slowest * 1e3:.2f}ms '
+                          f'of a {budget * 1e3:.0f}ms budget')
@@ -0,0 +1,22 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from cardMaker import SRCSET_FORMATS, SRCSET_WIDTHS, build_card_assets
+
+class Command(BaseCommand):
+    help = 'rebuilds the card images, srcset sizes and sprite sheet whose inputs changed'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        static_dir = os.path.join(settings.BASE_DIR, 'main', 'static')
+        parser.add_argument('--sheet', help='scanned sheet of the whole deck to slice')
+        parser.add_argument('--card-dir', default=os.path.join(static_dir, 'cards'))
+        parser.add_argument('--sprite-dir', default=os.path.join(static_dir, 'sprites'))
+        parser.add_argument('--widths', type=int, nargs='+', default=SRCSET_WIDTHS)
+        parser.add_argument('--formats', nargs='+', default=SRCSET_FORMATS)
+        parser.add_argument('--force', action='store_true',
+                            help='ignore the build manifest and rebuild everything')
+
+    def handle(self, *args, sheet, card_dir, sprite_dir, widths, formats, force, **options):
+        build_card_assets(card_dir, sprite_dir, sheet=sheet, widths=widths,
+                          formats=formats, force=force, log=self.stdout.write)
@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from main.compaction import ARCHIVE_AFTER, BATCH_SIZE, compact_finished_games
+
+class Command(BaseCommand):
+    help = 'archives finished games into one compressed row each and deletes their rounds and event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='games archived and deleted per transaction')
+        parser.add_argument('--older-than', type=int,
+                            default=int(ARCHIVE_AFTER.total_seconds() // 60),
+                            help='minutes since a game finished before it is archived')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='stop after this many batches, to bound one run')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='seconds to sleep between batches')
+
+    def handle(self, *args, batch_size, older_than, max_batches, pause, **options):
+        start = time.perf_counter()
+        archived = compact_finished_games(batch_size, timedelta(minutes=older_than),
+                                          max_batches, pause)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'archived {archived} games in {elapsed:.2f}s')
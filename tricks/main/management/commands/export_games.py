@@ -0,0 +1,56 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from main.export import WRITERS, export_rows, pyarrow
+
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None and (day := parse_date(value)) is not None:
+        since = datetime.combine(day, datetime.min.time())
+    if since is None:
+        raise CommandError(f'--since takes a date or an ISO datetime, not {value!r}')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+class Command(BaseCommand):
+    help = 'streams every bet and trick of finished games from the event log to a file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='file to write, e.g. games.jsonl.gz')
+        parser.add_argument('--format', choices=sorted(WRITERS), default=None,
+                            help='defaults to parquet for .parquet files, jsonl otherwise')
+        parser.add_argument('--since', default=None,
+                            help='only games finished after this date or ISO datetime')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='games read from the database at a time')
+
+    def handle(self, *args, output, format, since, chunk_size, **options):
+        if format is None:
+            format = 'parquet' if output.endswith('.parquet') else 'jsonl'
+        if format == 'parquet' and pyarrow is None:
+            raise CommandError('writing Parquet needs pyarrow, pip install pyarrow')
+        since = since and parse_since(since)
+
+        start = time.perf_counter()
+        stats = {}
+        rows = 0
+        def counted(rows_in):
+            nonlocal rows
+            for row in rows_in:
+                rows += 1
+                yield row
+        writer = WRITERS[format](output)
+        try:
+            writer.write(counted(export_rows(since, chunk_size, stats)))
+        finally:
+            writer.close()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f'{stats["games"]} games, {rows} rows to {output} in {elapsed:.2f}s')
+        if stats['skipped']:
+            self.stdout.write(f'skipped {stats["skipped"]} games finished before the event log')
+        if stats['last_finished']:
+            self.stdout.write(f'next time, use --since {stats["last_finished"].isoformat()}')
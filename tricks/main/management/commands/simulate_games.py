@@ -0,0 +1,69 @@
+import argparse
+import os
+import time
+from collections import Counter
+from multiprocessing import Pool
+from django.core.management.base import BaseCommand, CommandError
+from main.bots import BOTS
+from main.simulation import simulate
+
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value!r} is not a whole number')
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive number')
+    return number
+
+class Command(BaseCommand):
+    help = 'plays games between bots on the rules engine and reports games/sec'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=positive_int, default=10000)
+        parser.add_argument('--players', type=int, default=4)
+        parser.add_argument('--rounds', type=int, default=7,
+                            help='num_of_rounds, the cards dealt in the first round')
+        parser.add_argument('--bot', choices=sorted(BOTS), default='random')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='processes to play in, 1 plays in this process')
+        parser.add_argument('--chunk-size', type=positive_int, default=1000,
+                            help='games each worker plays per task')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, games, players, rounds, bot, workers, chunk_size, seed, **options):
+        # options passed to call_command by name skip the argparse types
+        if games < 1 or chunk_size < 1:
+            raise CommandError('--games and --chunk-size must be positive')
+        if players < 2:
+            raise CommandError('a game needs at least 2 players')
+        if players * rounds + 1 > 52:
+            raise CommandError(f'{players} players cannot be dealt {rounds} cards each')
+        chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+        tasks = [(size, players, rounds, bot, None if seed is None else seed + idx)
+                 for idx, size in enumerate(chunks)]
+
+        start = time.perf_counter()
+        totals = Counter()
+        if workers > 1:
+            with Pool(workers) as pool:
+                for result in pool.starmap(simulate, tasks):
+                    totals.update(result)
+        else:
+            for task in tasks:
+                totals.update(simulate(*task))
+        elapsed = time.perf_counter() - start
+
+        played = totals['games']
+        if not played:
+            return
+        moves = totals['bets'] + totals['cards']
+        self.stdout.write(f'{played} games of {players} players, {rounds} rounds, '
+                          f'{bot} bots, {workers} worker(s)')
+        self.stdout.write(f'{elapsed:.2f}s: {played / elapsed:,.0f} games/sec, '
+                          f'{moves / elapsed:,.0f} moves/sec')
+        self.stdout.write(f'moves per game: {moves / played:.1f}')
+        self.stdout.write(f'mean score: {totals["total_score"] / (played * players):.2f}, '
+                          f'mean winning score: {totals["winning_score"] / played:.2f}')
+        self.stdout.write(f'tied games: {totals["ties"] / played:.1%}')
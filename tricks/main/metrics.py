@@ -0,0 +1,228 @@
+"""In-process request and game metrics, served as Prometheus text at /metrics.
+
+``MetricsMiddleware`` times every request to the views named in the
+``METRICS_VIEWS`` setting and counts the database queries it ran and their
+time. ``submit_move`` counts every move, and every move that was outraced on
+each of its attempts. Each thread records into its own shard, so recording
+never takes a lock; a lock is only taken the first time a thread records
+anything, and when the endpoint merges the shards. Figures are per process,
+like the in-process event broker: with several workers, scrape each one.
+
+The scraper authenticates with the ``METRICS_TOKEN`` setting as a bearer
+token; staff can read the endpoint when logged in.
+
+Exposed:
+
+- ``tricks_request_seconds``: latency histogram per url name
+- ``tricks_db_queries`` and ``tricks_db_seconds``: queries per request and
+  their total time, as histograms per url name
+- ``tricks_active_games``: unfinished games with a round dealt, counted when
+  scraped
+- ``tricks_moves_total`` and ``tricks_moves_per_second``, the latter over
+  the last MOVE_WINDOW whole seconds
+- ``tricks_move_conflicts_total``: moves given up after MAX_ATTEMPTS
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.db import connection
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+# seconds moves_per_second averages over
+MOVE_WINDOW = 60
+
+class Histogram:
+    """observation counts per bucket, plus their sum
+
+    counts[i] holds the observations no bigger than buckets[i] and above
+    the bucket before, and the last count everything above the top bucket.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, other:'Histogram'):
+        for idx, count in enumerate(other.counts):
+            self.counts[idx] += count
+        self.sum += other.sum
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+class ViewStats:
+    """what a view's requests cost, from one thread or merged"""
+    __slots__ = ('latency', 'queries', 'db_seconds')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = Histogram(LATENCY_BUCKETS)
+
+    def merge(self, other:'ViewStats'):
+        self.latency.merge(other.latency)
+        self.queries.merge(other.queries)
+        self.db_seconds.merge(other.db_seconds)
+
+class Shard:
+    """one thread's figures, only ever written by that thread"""
+    def __init__(self):
+        self.views = {}
+        self.moves = 0
+        self.conflicts = 0
+        # moves made in each of the last seconds, as a ring indexed by second
+        self.move_seconds = [0] * (MOVE_WINDOW + 1)
+        self.move_counts = [0] * (MOVE_WINDOW + 1)
+
+class Metrics:
+    """the figures of every thread in this process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+
+    def shard(self) -> Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe_request(self, view:str, seconds:float, queries:int, db_seconds:float):
+        views = self.shard().views
+        stats = views.get(view)
+        if stats is None:
+            stats = views[view] = ViewStats()
+        stats.latency.observe(seconds)
+        stats.queries.observe(queries)
+        stats.db_seconds.observe(db_seconds)
+
+    def record_move(self, now:float=None):
+        shard = self.shard()
+        second = int(now or time.time())
+        slot = second % len(shard.move_counts)
+        if shard.move_seconds[slot] != second:
+            shard.move_seconds[slot] = second
+            shard.move_counts[slot] = 0
+        shard.move_counts[slot] += 1
+        shard.moves += 1
+
+    def record_conflict(self):
+        self.shard().conflicts += 1
+
+    def shards(self) -> list[Shard]:
+        with self._lock:
+            return list(self._shards)
+
+    def views(self) -> dict[str, ViewStats]:
+        """returns every view's stats, merged over the threads"""
+        merged = {}
+        for shard in self.shards():
+            for view, stats in list(shard.views.items()):
+                merged.setdefault(view, ViewStats()).merge(stats)
+        return merged
+
+    def moves(self) -> int:
+        return sum(shard.moves for shard in self.shards())
+
+    def conflicts(self) -> int:
+        return sum(shard.conflicts for shard in self.shards())
+
+    def moves_per_second(self, now:float=None) -> float:
+        """returns the moves per second over the last MOVE_WINDOW whole seconds"""
+        now = int(now or time.time())
+        moves = sum(count for shard in self.shards()
+                    for second, count in zip(list(shard.move_seconds), list(shard.move_counts))
+                    if now - MOVE_WINDOW <= second < now)
+        return moves / MOVE_WINDOW
+
+metrics = Metrics()
+
+class QueryTimer:
+    """a database execute wrapper counting queries and their time"""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+class MetricsMiddleware:
+    """records the latency and database use of requests to METRICS_VIEWS"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = frozenset(settings.METRICS_VIEWS)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.url_name in self.views:
+            metrics.observe_request(match.url_name, time.perf_counter() - start,
+                                    timer.count, timer.seconds)
+        return response
+
+def scraper_authorized(request) -> bool:
+    """checks the request carries the METRICS_TOKEN bearer token, if one is set"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                               f'Bearer {token}'.encode())
+
+def histogram_lines(name:str, labels:str, histogram:Histogram) -> list[str]:
+    lines = []
+    total = 0
+    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+        total += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {total}')
+    return lines
+
+def render_metrics(active_games:int) -> str:
+    """returns every metric in the Prometheus text format"""
+    views = sorted(metrics.views().items())
+    lines = []
+    for name, kind, text, attr in (
+            ('tricks_request_seconds', 'histogram', 'Request latency by url name.', 'latency'),
+            ('tricks_db_queries', 'histogram', 'Database queries per request.', 'queries'),
+            ('tricks_db_seconds', 'histogram', 'Database time per request.', 'db_seconds')):
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for view, stats in views:
+            lines += histogram_lines(name, f'view="{view}"', getattr(stats, attr))
+    lines += ['# HELP tricks_active_games Unfinished games with a round dealt.',
+              '# TYPE tricks_active_games gauge',
+              f'tricks_active_games {active_games}',
+              '# HELP tricks_moves_total Bets and cards played.',
+              '# TYPE tricks_moves_total counter',
+              f'tricks_moves_total {metrics.moves()}',
+              f'# HELP tricks_moves_per_second Moves per second over the last {MOVE_WINDOW}s.',
+              '# TYPE tricks_moves_per_second gauge',
+              f'tricks_moves_per_second {metrics.moves_per_second():.3f}',
+              '# HELP tricks_move_conflicts_total Moves outraced on every attempt.',
+              '# TYPE tricks_move_conflicts_total counter',
+              f'tricks_move_conflicts_total {metrics.conflicts()}']
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SUITS = ["h", "d", "c", "s"]
+RANKS = [str(rank) for rank in range(2, 15)]
+
+
+def repoint_through(through, owner_field, duplicates, card_id, db_alias):
+    """moves m2m rows from duplicate cards onto their catalog card"""
+    rows = through.objects.using(db_alias)
+    # an owner already holding the catalog card keeps just that row
+    holding = rows.filter(card_id=card_id).values(owner_field)
+    rows.filter(card_id__in=duplicates, **{f"{owner_field}__in": holding}).delete()
+    rows.filter(card_id__in=duplicates).update(card_id=card_id)
+
+
+def seed_catalog(apps, schema_editor):
+    """folds every per-deal copy onto the catalog card with the same face
+
+    Done face by face with UPDATE and DELETE statements over subqueries, so
+    no card or through-table rows are loaded, however many deals there were.
+    """
+    Card = apps.get_model("main", "Card")
+    Player = apps.get_model("main", "Player")
+    Round = apps.get_model("main", "Round")
+    db_alias = schema_editor.connection.alias
+    cards = Card.objects.using(db_alias)
+
+    faces = {
+        (face["suit"], face["rank"]): (face["first"], face["copies"])
+        for face in cards.values("suit", "rank").annotate(
+            first=models.Min("id"), copies=models.Count("id")
+        )
+    }
+    cards.bulk_create(
+        [
+            Card(suit=suit, rank=rank)
+            for suit in SUITS
+            for rank in RANKS
+            if (suit, rank) not in faces
+        ]
+    )
+
+    quote = schema_editor.quote_name
+    delete_copies = (
+        f"DELETE FROM {quote(Card._meta.db_table)} "
+        f"WHERE {quote('suit')} = %s AND {quote('rank')} = %s AND {quote('id')} <> %s"
+    )
+    for (suit, rank), (card_id, copies) in faces.items():
+        if copies == 1:
+            continue
+        duplicates = cards.filter(suit=suit, rank=rank).exclude(id=card_id).values("id")
+        players = Player.objects.using(db_alias)
+        players.filter(cur_card_id__in=duplicates).update(cur_card_id=card_id)
+        rounds = Round.objects.using(db_alias)
+        rounds.filter(trump_id__in=duplicates).update(trump_id=card_id)
+        rounds.filter(trick_id__in=duplicates).update(trick_id=card_id)
+        repoint_through(Player.hand.through, "player_id", duplicates, card_id, db_alias)
+        repoint_through(Round.deck.through, "round_id", duplicates, card_id, db_alias)
+        repoint_through(Round.table.through, "round_id", duplicates, card_id, db_alias)
+        # nothing points at the copies any more; a queryset delete would
+        # still load them all to look for related rows
+        schema_editor.execute(delete_copies, (suit, rank, card_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0027_game_finished"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="player",
+            name="cur_card",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="cur_card",
+                to="main.card",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="round",
+            name="trick",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="trick",
+                to="main.card",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="round",
+            name="trump",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="trump",
+                to="main.card",
+            ),
+        ),
+        migrations.RunPython(seed_catalog, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="card",
+            constraint=models.UniqueConstraint(
+                fields=("suit", "rank"), name="unique_card"
+            ),
+        ),
+    ]
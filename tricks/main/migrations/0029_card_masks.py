@@ -0,0 +1,79 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+SUITS = ["h", "d", "c", "s"]
+RANKS = [str(rank) for rank in range(2, 15)]
+
+
+def pack_masks(apps, schema_editor):
+    Card = apps.get_model("main", "Card")
+    Player = apps.get_model("main", "Player")
+    Round = apps.get_model("main", "Round")
+    db_alias = schema_editor.connection.alias
+    catalog_index = {
+        (suit, rank): idx
+        for idx, (suit, rank) in enumerate(
+            (suit, rank) for suit in SUITS for rank in RANKS
+        )
+    }
+    bits = {
+        card.id: 1 << catalog_index[(card.suit, card.rank)]
+        for card in Card.objects.using(db_alias)
+    }
+
+    for model, name, owner_field in [
+        (Player, "hand", "player_id"),
+        (Round, "deck", "round_id"),
+        (Round, "table", "round_id"),
+    ]:
+        masks = defaultdict(int)
+        through = model._meta.get_field(name).remote_field.through
+        for row in through.objects.using(db_alias):
+            masks[getattr(row, owner_field)] |= bits[row.card_id]
+        objs = list(model.objects.using(db_alias).filter(id__in=masks))
+        for obj in objs:
+            setattr(obj, f"{name}_mask", masks[obj.id])
+        model.objects.using(db_alias).bulk_update(
+            objs, [f"{name}_mask"], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0028_card_catalog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="player",
+            name="hand_mask",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="round",
+            name="deck_mask",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="round",
+            name="table_mask",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(pack_masks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="player",
+            name="hand",
+        ),
+        migrations.RemoveField(
+            model_name="round",
+            name="deck",
+        ),
+        migrations.RemoveField(
+            model_name="round",
+            name="table",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0029_card_masks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="round",
+            name="trick_ended",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0030_round_trick_ended"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
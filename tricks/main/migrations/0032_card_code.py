@@ -0,0 +1,56 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+SUITS = ["h", "d", "c", "s"]
+
+
+def fill_codes(apps, schema_editor):
+    Card = apps.get_model("main", "Card")
+    db_alias = schema_editor.connection.alias
+    cards = list(Card.objects.using(db_alias))
+    for card in cards:
+        card.code = SUITS.index(card.suit) * 13 + int(card.rank) - 2
+    Card.objects.using(db_alias).bulk_update(cards, ["code"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0031_game_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="card",
+            name="rank",
+            field=models.PositiveSmallIntegerField(
+                choices=[
+                    (2, "2"),
+                    (3, "3"),
+                    (4, "4"),
+                    (5, "5"),
+                    (6, "6"),
+                    (7, "7"),
+                    (8, "8"),
+                    (9, "9"),
+                    (10, "10"),
+                    (11, "Jack"),
+                    (12, "Queen"),
+                    (13, "King"),
+                    (14, "Ace"),
+                ]
+            ),
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="code",
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(fill_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="card",
+            name="code",
+            field=models.PositiveSmallIntegerField(unique=True),
+        ),
+    ]
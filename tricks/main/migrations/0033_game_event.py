@@ -0,0 +1,99 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0032_card_code"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GameEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("deal", "Deal"),
+                            ("bet", "Bet"),
+                            ("card", "Card played"),
+                            ("trick", "Trick won"),
+                            ("clear", "Trick cleared"),
+                        ],
+                        max_length=5,
+                    ),
+                ),
+                ("value", models.BigIntegerField(blank=True, null=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="main.game",
+                    ),
+                ),
+                (
+                    "player",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.player",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StateSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("state", models.JSONField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.gameevent",
+                    ),
+                ),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="main.game",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="gameevent",
+            index=models.Index(fields=["game", "id"], name="main_gameev_game_id_908a3f_idx"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0033_game_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedGame",
+            fields=[
+                (
+                    "game",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="archive",
+                        serialize=False,
+                        to="main.game",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
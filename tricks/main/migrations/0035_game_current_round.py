@@ -0,0 +1,36 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_current_round(apps, schema_editor):
+    Game = apps.get_model("main", "Game")
+    Round = apps.get_model("main", "Round")
+    db_alias = schema_editor.connection.alias
+    latest = Round.objects.using(db_alias).filter(game=models.OuterRef("pk")).order_by("-id")
+    Game.objects.using(db_alias).update(
+        current_round=models.Subquery(latest.values("id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0034_archived_game"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="current_round",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="main.round",
+            ),
+        ),
+        migrations.RunPython(fill_current_round, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0035_game_current_round"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                condition=models.Q(("current_round__isnull", True), ("finished", False)),
+                fields=["-created", "-id"],
+                name="open_games",
+            ),
+        ),
+    ]
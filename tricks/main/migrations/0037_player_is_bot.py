@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0036_open_games_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="player",
+            name="is_bot",
+            field=models.BooleanField(default=False),
+        ),
+    ]
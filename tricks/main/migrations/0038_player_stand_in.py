@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0037_player_is_bot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="player",
+            name="stand_in",
+            field=models.BooleanField(default=False),
+        ),
+    ]
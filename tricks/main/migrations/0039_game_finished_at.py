@@ -0,0 +1,37 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:10
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def fill_finished_at(apps, schema_editor):
+    # the best guess there is for games already finished
+    Game = apps.get_model("main", "Game")
+    db_alias = schema_editor.connection.alias
+    Game.objects.using(db_alias).filter(finished=True).update(
+        finished_at=Coalesce("updated", "created", Now())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0038_player_stand_in"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="finished_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_finished_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                condition=models.Q(("finished", True)),
+                fields=["finished_at", "id"],
+                name="finished_games",
+            ),
+        ),
+    ]
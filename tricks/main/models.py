@@ -1,7 +1,54 @@
-from django.db import models
+import json
+import zlib
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
 from collections import deque
-from random import shuffle
+from datetime import timedelta
+from itertools import count, product
+from random import getrandbits
+from . import engine
+
+# how long a finished trick stays on the table before it is cleared
+TRICK_REVEAL = timedelta(seconds=3)
+
+class CardManager(models.Manager):
+    _catalog = None
+    _by_id = None
+
+    def catalog(self):
+        """returns the 52 canonical cards, loaded once per process
+
+        Returns:
+            tuple[Card]: catalog cards ordered by suit, then rank
+        """
+        if CardManager._catalog is None:
+            cards = {card.code: card for card in self.all()}
+            missing = [Card(suit=suit, rank=rank, code=encode_card(suit, rank))
+                       for suit, rank in Card.CATALOG
+                       if encode_card(suit, rank) not in cards]
+            if missing:
+                self.bulk_create(missing, ignore_conflicts=True)
+                cards = {card.code: card for card in self.all()}
+            CardManager._catalog = tuple(cards[code] for code in range(engine.DECK_SIZE))
+            CardManager._by_id = {card.id: card for card in CardManager._catalog}
+        return CardManager._catalog
+
+    def lookup(self, card_id):
+        """returns the catalog card with the given id without a query"""
+        if card_id is None:
+            return None
+        self.catalog()
+        return CardManager._by_id[card_id]
+
+    def from_mask(self, mask):
+        catalog = self.catalog()
+        return [catalog[idx] for idx in engine.cards_in(mask)]
+
+    def clear_catalog(self):
+        CardManager._catalog = None
+        CardManager._by_id = None
 
 class Card(models.Model):
     SUIT_CHOICES = (
@@ -12,28 +59,57 @@ class Card(models.Model):
     )
 
     RANK_CHOICES = (
-        ('2', '2'),
-        ('3', '3'),
-        ('4', '4'),
-        ('5', '5'),
-        ('6', '6'),
-        ('7', '7'),
-        ('8', '8'),
-        ('9', '9'),
-        ('10', '10'),
-        ('11', 'Jack'),
-        ('12', 'Queen'),
-        ('13', 'King'),
-        ('14', 'Ace'),
+        (2, '2'),
+        (3, '3'),
+        (4, '4'),
+        (5, '5'),
+        (6, '6'),
+        (7, '7'),
+        (8, '8'),
+        (9, '9'),
+        (10, '10'),
+        (11, 'Jack'),
+        (12, 'Queen'),
+        (13, 'King'),
+        (14, 'Ace'),
     )
 
+    CATALOG = list(product([suit for suit, _ in SUIT_CHOICES],
+                           [rank for rank, _ in RANK_CHOICES]))
+
     suit = models.CharField(max_length=10, choices=SUIT_CHOICES)
-    rank = models.CharField(max_length=5, choices=RANK_CHOICES)
+    rank = models.PositiveSmallIntegerField(choices=RANK_CHOICES)
+    # catalog position, suit * 13 + rank - 2, the card's bit in card masks
+    code = models.PositiveSmallIntegerField(unique=True)
+
+    objects = CardManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['suit', 'rank'], name='unique_card'),
+        ]
     
     @property
     def image(self):
         return f'{self.rank}_of_{self.suit}.png'
+
+    @property
+    def sprite(self):
+        """css class drawing this card from the sprite sheet"""
+        return f'card-{self.rank}_of_{self.suit}'
+    
+    @property
+    def index(self):
+        return self.code
     
+    @property
+    def bit(self):
+        return 1 << self.index
+    
+    def save(self, *args, **kwargs):
+        self.code = encode_card(self.suit, int(self.rank))
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.rank} of {self.suit}"
     
@@ -41,23 +117,126 @@ class Card(models.Model):
         return f"{self.rank}_of_{self.suit}"
     
     def is_better(self, winning_card, trump_suit):
-        if self.suit == winning_card.suit:
-            return int(self.rank) > int(winning_card.rank)
-        elif self.suit == trump_suit:
-            return True
-        else:
-            return False
+        return engine.is_better(self.index, winning_card.index,
+                                SUIT_CODES[trump_suit])
+
+def encode_card(suit:str, rank:int) -> int:
+    """returns the card code for a suit letter and numeric rank"""
+    return SUIT_CODES[suit] * 13 + rank - 2
+
+def decode_card(code:int) -> tuple[str, int]:
+    """returns the suit letter and numeric rank of a card code"""
+    return engine.SUITS[code // 13], code % 13 + 2
+
+SUIT_CODES = {suit: idx for idx, suit in enumerate(engine.SUITS)}
+
+def card_index(card_id):
+    card = Card.objects.lookup(card_id)
+    return card.index if card else None
+
+def card_id(index):
+    if index is not None:
+        return Card.objects.catalog()[index].id
+
+def save_players(players, fields):
+    """writes fields of every player in one UPDATE, whatever the table size
+
+    The batch mutators below change a field on every seat at once; this is
+    their single write, an ``UPDATE ... CASE`` from bulk_update.
+    """
+    now = timezone.now()
+    for player in players:
+        player.updated = now
+    Player.objects.bulk_update(players, [*fields, 'updated'])
+
+def cards_to_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
+
+class CardSet:
+    """manager-like view over a card bitmask column
+
+    Bit n of the mask is set when catalog card n is in the set, so a whole
+    hand, deck or table is stored in one integer and read without a join.
+    Mutators persist the column immediately, like a related manager.
+    """
+    def __init__(self, instance, field):
+        self.instance = instance
+        self.field = field
+    
+    @property
+    def mask(self):
+        return getattr(self.instance, self.field)
+    
+    def _persist(self, mask):
+        setattr(self.instance, self.field, mask)
+        self.instance.save(update_fields=[self.field])
+    
+    def all(self):
+        return Card.objects.from_mask(self.mask)
+    
+    def count(self):
+        return self.mask.bit_count()
+    
+    def exists(self):
+        return self.mask != 0
+    
+    def first(self):
+        cards = self.all()
+        return cards[0] if cards else None
+    
+    def last(self):
+        cards = self.all()
+        return cards[-1] if cards else None
+    
+    def add(self, *cards):
+        self._persist(self.mask | cards_to_mask(cards))
+    
+    def remove(self, *cards):
+        self._persist(self.mask & ~cards_to_mask(cards))
+    
+    def set(self, cards, clear=False):
+        self._persist(cards_to_mask(cards))
+    
+    def clear(self):
+        self._persist(0)
+    
+    def __contains__(self, card):
+        return bool(self.mask & card.bit)
+    
+    def __iter__(self):
+        return iter(self.all())
+    
+    def __len__(self):
+        return self.count()
+
+class CardSetField:
+    """exposes a mask column as a CardSet, e.g. ``player.hand``"""
+    def __init__(self, field):
+        self.field = field
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return CardSet(instance, self.field)
         
 class Player(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    hand = models.ManyToManyField(Card, blank=True, related_name='hand')
+    hand_mask = models.BigIntegerField(default=0)
+    hand = CardSetField('hand_mask')
     bet_pos = models.SmallIntegerField(default=0, blank=True, null=True)
     play_pos = models.SmallIntegerField(default=0, blank=True, null=True)
     cur_card = models.ForeignKey(Card, blank=True, null=True,
-                                      related_name='cur_card', on_delete=models.CASCADE)
+                                      related_name='cur_card', on_delete=models.PROTECT)
     bet = models.IntegerField(blank=True, null=True)
     wins = models.IntegerField(default=0)
     score = models.IntegerField(default=0)
+    # played by main.botrunner instead of a person
+    is_bot = models.BooleanField(default=False)
+    # the bot only holds the seat while its person is away, see main.pubsub
+    stand_in = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated = models.DateTimeField(auto_now=True, blank=True, null=True)
     
@@ -68,64 +247,62 @@ class Player(models.Model):
         return f'{self.user}'
     
     def bet_range(self, cur_round):
-        players = cur_round.players.all().order_by('bet_pos')
-        bet_range = [num for num in range(cur_round.cards_dealt + 1)]
-        if self == players.last():
-            cant_bet = cur_round.num - cur_round.bet_sum
-            if cant_bet in bet_range:
-                bet_range.remove(cant_bet)
-                return bet_range
-        return bet_range
-        
+        state = cur_round.game.load_state(cur_round=cur_round)
+        return state.bet_range(state.player(self.id))
     
     def set_bet(self, bet:int, cur_round):
         self.bet = bet
         cur_round.bet_sum += bet
         cur_round.save()
         self.save()
+        GameEvent.objects.record(cur_round.game_id, GameEvent.BET, self.id, bet)
+        Game.bump_version(cur_round.game_id)
     
     def playable_cards(self, cur_round):
-        playable_cards = []
-        for card in self.hand.all():
-            if not cur_round.trick:
-                playable_cards.append(card)
-            elif card.suit == cur_round.trick.suit:
-                playable_cards.append(card)
-            elif card.suit == cur_round.trump.suit:
-                playable_cards.append(card)
-        if not playable_cards:
-            return self.hand.all()
-        return playable_cards
+        playable = engine.playable_cards(self.hand_mask, card_index(cur_round.trick_id),
+                                         card_index(cur_round.trump_id))
+        return Card.objects.from_mask(playable)
     
     def play_card(self, card, cur_round):
         self.cur_card = card
-        self.hand.remove(card)
-        self.save()
-        cur_round.table.add(card)
+        self.hand_mask &= ~card.bit
+        self.save(update_fields=['cur_card', 'hand_mask', 'updated'])
+        cur_round.table_mask |= card.bit
         if not cur_round.trick:
             cur_round.trick = card
-            cur_round.save()
+        cur_round.save(update_fields=['table_mask', 'trick', 'updated'])
+        GameEvent.objects.record(cur_round.game_id, GameEvent.CARD, self.id, card.index)
+        Game.bump_version(cur_round.game_id)
+    
+    def to_state(self):
+        return engine.PlayerState(self.id, self.hand_mask, self.bet, self.wins,
+                                  self.score, self.bet_pos, self.play_pos,
+                                  card_index(self.cur_card_id))
     
     def update_wins(self):
         self.wins += 1
-        self.save()
+        self.save(update_fields=['wins', 'updated'])
     
-    def calc_score(self):
+    def calc_score(self, save=True):
         if self.bet == self.wins:
             self.score += 10 + self.bet
-        self.save()
+        if save:
+            self.save(update_fields=['score', 'updated'])
 
 class Round(models.Model):
     num = models.IntegerField()
     game = models.ForeignKey('Game', on_delete=models.CASCADE)
     dealer = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='dealer')
-    deck = models.ManyToManyField(Card, blank=True, related_name='deck')
-    table = models.ManyToManyField(Card, blank=True, related_name='table')
-    trump = models.ForeignKey(Card, on_delete=models.CASCADE, blank=True, null=True,
+    deck_mask = models.BigIntegerField(default=0)
+    deck = CardSetField('deck_mask')
+    table_mask = models.BigIntegerField(default=0)
+    table = CardSetField('table_mask')
+    trump = models.ForeignKey(Card, on_delete=models.PROTECT, blank=True, null=True,
                               related_name='trump')
-    trick = models.ForeignKey(Card, blank=True, null=True, on_delete=models.CASCADE,
+    trick = models.ForeignKey(Card, blank=True, null=True, on_delete=models.PROTECT,
                                    related_name='trick')
     bet_sum = models.IntegerField(default=0)
+    trick_ended = models.DateTimeField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated = models.DateTimeField(auto_now=True, blank=True, null=True)
     
@@ -135,9 +312,7 @@ class Round(models.Model):
     
     @property
     def cards_dealt(self):
-        if self.deck.count() > 0:
-            return self.game.cur_round.num
-        return 0
+        return self.num if self.deck_mask else 0
     
     def __str__(self):
         return f'Round {self.num}'
@@ -145,55 +320,83 @@ class Round(models.Model):
     def __repr__(self):
         return f'Round {self.num}'
     
-    def deal_cards(self):
-        deck = [Card(suit=c_suit, rank=c_rank)
-                     for c_suit in ['s', 'h', 'c', 'd']
-                     for c_rank in range(2, 15)]
-        shuffle(deck)
-        deck = Card.objects.bulk_create(deck)
-        
-        players = self.players.all()
-        for player in players:
-            player.hand.set([deck.pop() for _ in range(self.num)], clear=True)
-        self.trump = deck.pop()
-        self.deck.set(deck, clear=True)
+    def to_state(self):
+        return engine.RoundState(self.num, self.dealer_id, id=self.id,
+                                 deck=self.deck_mask, table=self.table_mask,
+                                 trump=card_index(self.trump_id),
+                                 trick=card_index(self.trick_id),
+                                 bet_sum=self.bet_sum)
+    
+    def deal_cards(self, seed:int=None):
+        """deals the round from the shuffle the seed picks
+
+        Only the seed goes in the game's event log, the engine deals the same
+        hands from it again when the log is replayed.
+        """
+        if seed is None:
+            seed = getrandbits(32)
+        players = list(self.players.order_by('bet_pos'))
+        state = engine.GameState([player.to_state() for player in players],
+                                 round=engine.RoundState(self.num, self.dealer_id))
+        state.deal(engine.shuffled_deck(seed))
+        for player, player_state in zip(players, state.players):
+            player.hand_mask = player_state.hand
+        Player.objects.bulk_update(players, ['hand_mask'])
+        self.trump = Card.objects.catalog()[state.round.trump]
+        self.deck_mask = state.round.deck
         self.save()
+        GameEvent.objects.record(self.game_id, GameEvent.DEAL, value=seed)
+        Game.bump_version(self.game_id)
     
     def end_trick(self):
         winner = self.get_trick_winner()
-        winner.update_wins()
-        self.update_play_order(winner)
+        with transaction.atomic(savepoint=False):
+            winner.update_wins()
+            self.update_play_order(winner)
+            # the full table stays visible until Game.resolve_trick clears it
+            self.trick_ended = timezone.now()
+            self.save(update_fields=['trick_ended', 'updated'])
+            GameEvent.objects.record(self.game_id, GameEvent.TRICK, winner.id)
+            Game.bump_version(self.game_id)
+    
+    def reveal_remaining(self, now=None):
+        """returns how long the finished trick is still shown for
+
+        Returns:
+            timedelta: zero once the trick can be cleared, None if no trick is ending
+        """
+        if not self.trick_ended:
+            return None
+        now = now or timezone.now()
+        return max(self.trick_ended + TRICK_REVEAL - now, timedelta(0))
     
     def start_new_trick(self):
         # assumes trick is complete
-        self.reset_cur_cards()
-        self.reset_table()
-        self.reset_trick()
+        with transaction.atomic(savepoint=False):
+            self.reset_cur_cards()
+            self.table_mask = 0
+            self.trick = None
+            self.save(update_fields=['table_mask', 'trick', 'updated'])
+            Game.bump_version(self.game_id)
     
     def reset_cur_cards(self):
-        players = self.players.all()
-        for player in players:
-            player.cur_card = None
-            player.save()
+        self.players.update(cur_card=None, updated=timezone.now())
             
     def reset_table(self):
-        self.table.clear()
-        self.save()
+        self.table_mask = 0
+        self.save(update_fields=['table_mask', 'updated'])
     
     def reset_trick(self):
         self.trick = None
-        self.save()
+        self.save(update_fields=['trick', 'updated'])
     
     def update_play_order(self, starting_player):
-        players = self.players.all().order_by('play_pos')
-        players = deque(players)
-        start_idx = players.index(starting_player)
-        players.rotate(-start_idx)
-        play_pos = 0
-        for player in players:
+        players = deque(self.players.all().order_by('play_pos'))
+        players.rotate(-players.index(starting_player))
+        for play_pos, player in enumerate(players):
             player.play_pos = play_pos
-            player.save()
-            play_pos += 1
+        with transaction.atomic(savepoint=False):
+            save_players(players, ['play_pos'])
     
     def check_trick_complete(self):
         """checks if the trick is complete
@@ -201,7 +404,7 @@ class Round(models.Model):
         Returns:
             bool: True if trick is complete, False otherwise
         """
-        return len(self.table.all()) == len(self.players.all())
+        return self.game.load_state(cur_round=self).trick_complete()
     
     def get_trick_winner(self):
         """returns the player who won the trick
@@ -209,39 +412,69 @@ class Round(models.Model):
         Returns:
             Player: player who won the trick
         """
-        players = self.players.all().order_by('play_pos')
-        winner = players.first()
-        winning_card = winner.cur_card
-        for player in players:
-            if player.cur_card.is_better(winning_card, self.trump.suit):
-                winner = player
-                winning_card = player.cur_card
-        return winner
+        winner = self.game.load_state(cur_round=self).trick_winner()
+        return self.players.get(id=winner.id)
 
 class Game(models.Model):
     players = models.ManyToManyField(Player, blank=True)
     num_of_rounds = models.IntegerField(default=7)
     rounds = models.ManyToManyField(Round, blank=True, related_name='cur_rounds')
+    # the last round dealt, kept by start_new_round so finding it is one fetch
+    current_round = models.ForeignKey(Round, blank=True, null=True, on_delete=models.SET_NULL,
+                                      related_name='+')
     bet_turn = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated = models.DateTimeField(auto_now=True, blank=True, null=True)
     finished = models.BooleanField(default=False)
+    # set once by end_game, unlike updated, which any later save moves on
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # the lobby's games, see lobby.open_games
+            models.Index(fields=['-created', '-id'], name='open_games',
+                         condition=Q(current_round__isnull=True, finished=False)),
+            # pages of finished games, see export.finished_games
+            models.Index(fields=['finished_at', 'id'], name='finished_games',
+                         condition=Q(finished=True)),
+        ]
+
     @property
     def cur_round(self):
-        rounds = self.rounds.all()
-        if rounds.count() > 0:
-            return rounds.last()
+        return self.current_round
     
     @property
     def in_play(self):
-        if self.rounds.count() > 0:
-            return True
+        return self.current_round_id is not None
     
     def __str__(self):
         return f'Game {self.id}'
     
     def __repr__(self):
         return f'Game {self.id}'
+    
+    def save(self, *args, **kwargs):
+        # version only moves through bump_version, never from a stale copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'version']
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def bump_version(game_id):
+        """marks a game as changed, so clients holding an older version refetch"""
+        Game.objects.filter(id=game_id).update(version=F('version') + 1)
+    
+    @staticmethod
+    def is_current(game_id, version):
+        """checks a client's version against the game without loading it"""
+        return Game.objects.filter(id=game_id, version=version).exists()
+
+    @staticmethod
+    def current_version(game_id):
+        """returns a game's version without loading it, None if there is no such game"""
+        return Game.objects.filter(id=game_id).values_list('version', flat=True).first()
 
     def add_player(self, player:Player):
         if self.players.count() > 0:
@@ -251,18 +484,33 @@ class Game(models.Model):
             player.save()
         self.players.add(player)
         self.save()
+        Game.bump_version(self.id)
+    
+    def add_bot(self) -> Player:
+        """seats a bot player, as a user nobody can log in as
+
+        Bot usernames have a space in them, which the register form doesn't
+        allow, so a person can never sign up as a bot.
+        """
+        taken = set(self.players.values_list('user__username', flat=True))
+        name = next(f'Bot {num}' for num in count(1) if f'Bot {num}' not in taken)
+        user, created = User.objects.get_or_create(username=name)
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        player = Player.objects.create(user=user, is_bot=True)
+        self.add_player(player)
+        return player
     
     def rotate_dealer(self):
         players = deque(self.players.all().order_by('bet_pos'))
         players.rotate(-1)
-        pos = 0
-        for player in players:
+        for pos, player in enumerate(players):
             player.bet_pos = pos
             player.play_pos = pos
-            player.save()
-            pos += 1
-        players = self.players.all()
-        return players
+        with transaction.atomic(savepoint=False):
+            save_players(players, ['bet_pos', 'play_pos'])
+        return self.players.all()
     
     def check_round_complete(self):
         """checks if the round is complete
@@ -270,47 +518,45 @@ class Game(models.Model):
         Returns:
             bool: True if round is complete, False otherwise
         """
-        players = self.players.all()
-        hand_cards_left = 0
-        if self.cur_round.num == 1:
-            return True
-        for player in players:
-            hand_cards_left += player.hand.count()
-            if hand_cards_left > 0:
-                return False
-        return True
+        return self.load_state().round_complete()
     
     def reset_bets_and_wins(self):
-        players = self.players.all()
-        for player in players:
-            player.bet = None
-            player.wins = 0
-            player.save()
+        self.players.update(bet=None, wins=0, updated=timezone.now())
 
     def end_round(self):
-        cur_round = self.cur_round
-        players = self.players.all()
+        players = list(self.players.all())
+        last_round = self.cur_round.num == 1
         for player in players:
-            player.calc_score()
-        if cur_round.num != 1:
-            self.reset_bets_and_wins()
+            player.calc_score(save=False)
+            if not last_round:
+                player.bet = None
+                player.wins = 0
+        with transaction.atomic(savepoint=False):
+            save_players(players, ['score', 'bet', 'wins'])
+            Game.bump_version(self.id)
     
     def start_new_round(self):
         """_summary_
         """
-        if self.rounds.count() != 0:
-            cur_round = self.cur_round
-            players = self.rotate_dealer()
-            round_num = cur_round.num - 1
-        else:
-            players = self.players.all()
-            round_num = self.num_of_rounds
-        dealer = players.get(bet_pos=0)
-        cur_round = Round.objects.create(game = self,
-                                         num=round_num, dealer=dealer)
-        cur_round.deal_cards()
-        self.rounds.add(cur_round)
-        self.save()
+        with transaction.atomic(savepoint=False):
+            if self.current_round_id is not None:
+                cur_round = self.cur_round
+                players = self.rotate_dealer()
+                round_num = cur_round.num - 1
+            else:
+                players = self.players.all()
+                round_num = self.num_of_rounds
+                # the seating is the one part of a game the event log can't replay
+                state = engine.GameState([player.to_state() for player in players],
+                                         self.num_of_rounds)
+                StateSnapshot.take(self.id, state)
+            dealer = players.get(bet_pos=0)
+            cur_round = Round.objects.create(game = self,
+                                             num=round_num, dealer=dealer)
+            cur_round.deal_cards()
+            self.rounds.add(cur_round)
+            self.current_round = cur_round
+            self.save()
         return cur_round
           
     def get_winners(self):
@@ -329,4 +575,212 @@ class Game(models.Model):
     
     def end_game(self):
         self.finished = True
-        self.save()
\ No newline at end of file
+        self.finished_at = timezone.now()
+        self.save()
+        Game.bump_version(self.id)
+    
+    def resolve_trick(self, now=None, cur_round=None):
+        """clears a finished trick once it has been shown for TRICK_REVEAL
+
+        Called lazily whenever the game is read, instead of holding a request
+        open while the trick is on display. Moves on to the next trick, the
+        next round or the end of the game as appropriate.
+
+        Args:
+            now (datetime, optional): defaults to the current time
+            cur_round (Round, optional): the current round, if already loaded
+
+        Returns:
+            bool: True if the game moved on
+        """
+        cur_round = cur_round or self.cur_round
+        if not cur_round or cur_round.reveal_remaining(now) != timedelta(0):
+            return False
+        with transaction.atomic():
+            # only one reader gets to clear a given trick
+            claimed = Round.objects.filter(id=cur_round.id, trick_ended=cur_round.trick_ended)
+            if not claimed.update(trick_ended=None):
+                return False
+            # taking the game row first makes concurrent moves wait and retry
+            # rather than land on a half cleared trick or round
+            Game.bump_version(self.id)
+            state = self.load_state(cur_round=cur_round)
+            clear = GameEvent.objects.record(self.id, GameEvent.CLEAR)
+            cur_round.trick_ended = None
+            round_over = True
+            if cur_round.num == 1:
+                state.end_round()
+                state.end_game()
+            else:
+                state.start_new_trick()
+                round_over = state.round_complete()
+                if round_over:
+                    state.end_round()
+            # the rows catch up with the log here, and the snapshot means
+            # rebuilding the game never folds more than the current trick
+            self.save_state(state)
+            StateSnapshot.take(self.id, state, clear.id)
+            if round_over and not state.finished:
+                self.start_new_round()
+        return True
+    
+    def load_state(self, cur_round=None):
+        """returns the game's current engine state, for the rules to run on
+
+        Bets and cards only go to the event log, so a game with one is
+        rebuilt from it, see eventlog. Games from before the log, or not
+        dealt yet, are read from their rows.
+
+        Args:
+            cur_round (Round, optional): the current round, if already loaded
+
+        Returns:
+            engine.GameState: players and current round as plain integers
+        """
+        if self.current_round_id is not None:
+            # eventlog imports the models
+            from .eventlog import rebuild
+            state = rebuild(self.id)
+            if state is not None:
+                state.round.id = self.current_round_id
+                return state
+        return self.row_state(cur_round)
+
+    def row_state(self, cur_round=None):
+        """returns the game as its rows have it, which for a game with an
+        event log is as of its last transition
+
+        Args:
+            cur_round (Round, optional): the current round, if already loaded
+        """
+        players = [player.to_state() for player in self.players.all()]
+        if cur_round is None:
+            # fetched fresh, the cached current_round may predate later moves
+            cur_round = Round.objects.filter(id=self.current_round_id).first()
+        round_state = cur_round.to_state() if cur_round else None
+        return engine.GameState(players, self.num_of_rounds, round_state, self.finished)
+    
+    def save_state(self, state):
+        """writes an engine snapshot back to the game's rows
+
+        Args:
+            state (engine.GameState): snapshot from load_state, after any moves
+        """
+        players = {player.id: player for player in self.players.all()}
+        for player_state in state.players:
+            player = players[player_state.id]
+            player.hand_mask = player_state.hand
+            player.bet = player_state.bet
+            player.wins = player_state.wins
+            player.score = player_state.score
+            player.bet_pos = player_state.bet_pos
+            player.play_pos = player_state.play_pos
+            player.cur_card_id = card_id(player_state.cur_card)
+        Player.objects.bulk_update(players.values(),
+                                   ['hand_mask', 'bet', 'wins', 'score',
+                                    'bet_pos', 'play_pos', 'cur_card'])
+        round_state = state.round
+        if round_state:
+            fields = {'num': round_state.num,
+                      'dealer_id': round_state.dealer,
+                      'deck_mask': round_state.deck,
+                      'table_mask': round_state.table,
+                      'trump_id': card_id(round_state.trump),
+                      'trick_id': card_id(round_state.trick),
+                      'bet_sum': round_state.bet_sum,}
+            if round_state.id is None:
+                cur_round = Round.objects.create(game=self, **fields)
+                self.rounds.add(cur_round)
+                self.current_round = cur_round
+                round_state.id = cur_round.id
+            else:
+                Round.objects.filter(id=round_state.id).update(**fields)
+                if (self.current_round_id == round_state.id
+                        and Game.current_round.is_cached(self)):
+                    # keep the loaded round in step with its row
+                    for field, value in fields.items():
+                        setattr(self.current_round, field, value)
+        if state.finished and not self.finished:
+            self.finished_at = timezone.now()
+        self.finished = state.finished
+        self.save()
+        Game.bump_version(self.id)
+
+class GameEventManager(models.Manager):
+    def record(self, game_id:int, kind:str, player_id:int=None, value:int=None):
+        return self.create(game_id=game_id, kind=kind, player_id=player_id, value=value)
+
+class GameEvent(models.Model):
+    """one action in a game's append-only log
+
+    Events are never changed once written. Replaying them in id order from a
+    StateSnapshot with eventlog.fold gives the game's state after any event.
+    """
+    DEAL = 'deal'
+    BET = 'bet'
+    CARD = 'card'
+    TRICK = 'trick'
+    CLEAR = 'clear'
+    KIND_CHOICES = (
+        (DEAL, 'Deal'),
+        (BET, 'Bet'),
+        (CARD, 'Card played'),
+        (TRICK, 'Trick won'),
+        (CLEAR, 'Trick cleared'),
+    )
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    player = models.ForeignKey(Player, blank=True, null=True, on_delete=models.CASCADE,
+                               related_name='+')
+    # the deal's seed, the bet, or the card's engine index
+    value = models.BigIntegerField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = GameEventManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['game', 'id'])]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} in Game {self.game_id}'
+
+class StateSnapshot(models.Model):
+    """a game's engine state as of one of its events
+
+    event is the last event folded into state, or None for the seating taken
+    before the first deal.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='snapshots')
+    event = models.ForeignKey(GameEvent, blank=True, null=True, on_delete=models.CASCADE,
+                              related_name='+')
+    state = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def take(game_id:int, state:engine.GameState, event_id:int=None):
+        return StateSnapshot.objects.create(game_id=game_id, event_id=event_id,
+                                            state=state.to_dict())
+
+    def to_state(self):
+        return engine.GameState.from_dict(self.state)
+
+class ArchivedGame(models.Model):
+    """a finished game's whole history, compressed into one row
+
+    Once a game is archived its rounds and event log are deleted, see
+    compaction. The game and its players stay, so scores and who played in
+    it can still be queried.
+    """
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True,
+                                related_name='archive')
+    data = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def pack(history:dict) -> bytes:
+        return zlib.compress(json.dumps(history, separators=(',', ':')).encode(), 9)
+
+    @property
+    def history(self) -> dict:
+        return json.loads(zlib.decompress(self.data))
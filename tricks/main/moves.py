@@ -0,0 +1,191 @@
+"""Serialized moves on a game, with optimistic concurrency.
+
+Every bet and card goes through ``submit_move``. A move is checked against an
+engine snapshot of the game read at some ``Game.version``, and then applied in
+one transaction that starts with a compare-and-swap of that version. If
+another move committed in between, the swap matches no row, the transaction
+rolls back and the move is retried against the new state. Moves on one game
+are therefore applied one at a time and never from a stale read, while
+different games never wait on each other.
+
+Past the version swap, a move is one INSERT of its events into the game's
+log, see ``eventlog``. The player and round rows are left alone; the last
+card of a trick also stamps the round's ``trick_ended``, so the reveal can
+be timed. Only games from before the event log still have their rows
+written on every move.
+"""
+import random
+import time
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .metrics import metrics
+from .models import Card, Game, GameEvent, Player, Round, card_id
+from .botwake import wake_bots
+from .pubsub import publish_game
+from .snapshot import GameSnapshot
+
+BET = GameEvent.BET
+CARD = GameEvent.CARD
+
+MAX_ATTEMPTS = 8
+
+class MoveError(Exception):
+    """the move breaks the rules, or it is not the player's turn"""
+
+class Conflict(Exception):
+    """the game changed between reading it and applying the move"""
+
+def check_move(snapshot:GameSnapshot, player_id:int, kind:str, value:int):
+    """raises MoveError unless the player may make the move now
+
+    value is the bet, or the card's engine index for a card.
+    """
+    state = snapshot.state
+    if snapshot.game.finished or state.round is None:
+        raise MoveError('The game is not in play.')
+    try:
+        player = state.player(player_id)
+    except KeyError:
+        raise MoveError('You are not playing in this game.')
+    if kind == BET:
+        if state.betting_player is not player:
+            raise MoveError('It is not your turn to bet.')
+        if value not in state.bet_range(player):
+            raise MoveError(f'You cannot bet {value}.')
+    elif kind == CARD:
+        if (not state.card_play_ready or snapshot.cur_round.trick_ended
+                or state.playing_player is not player):
+            raise MoveError('It is not your turn to play.')
+        if not state.playable_cards(player) >> value & 1:
+            raise MoveError('You cannot play that card.')
+    else:
+        raise MoveError(f'Unknown move {kind}.')
+    return player
+
+def player_columns(player):
+    return {'hand_mask': player.hand_mask,
+            'bet': player.bet,
+            'wins': player.wins,
+            'play_pos': player.play_pos,
+            'cur_card_id': player.cur_card_id,}
+
+def save_changes(snapshot:GameSnapshot, before:dict, trick_ended=None):
+    """writes only the player and round columns a move changed, for games
+    kept in their rows"""
+    changed = {}
+    players = []
+    for player_state in snapshot.state.players:
+        player = snapshot.by_id[player_state.id]
+        old = before[player.id]
+        new = {'hand_mask': player_state.hand,
+               'bet': player_state.bet,
+               'wins': player_state.wins,
+               'play_pos': player_state.play_pos,
+               'cur_card_id': card_id(player_state.cur_card),}
+        fields = [field for field, value in new.items() if old[field] != value]
+        if fields:
+            for field in fields:
+                setattr(player, field, new[field])
+            changed.update(dict.fromkeys(fields))
+            players.append(player)
+    if players:
+        fields = [field.removesuffix('_id') for field in changed]
+        Player.objects.bulk_update(players, fields)
+
+    round_state = snapshot.state.round
+    fields = {'table_mask': round_state.table,
+              'trick_id': card_id(round_state.trick),
+              'bet_sum': round_state.bet_sum,}
+    if trick_ended:
+        fields['trick_ended'] = trick_ended
+    Round.objects.filter(id=round_state.id).update(updated=timezone.now(), **fields)
+
+def apply_move(game_id:int, player_id:int, kind:str, value:int,
+               expected_version:int=None) -> int:
+    """checks and applies one move, inside the caller's transaction
+
+    Raises:
+        MoveError: if the move is not allowed
+        Conflict: if the game is no longer at the version it was read at
+
+    Returns:
+        int: the game's version after the move
+    """
+    snapshot = GameSnapshot.load(game_id, None)
+    version = snapshot.game.version
+    if expected_version is not None and expected_version != version:
+        raise Conflict(f'Game {game_id} is at version {version}.')
+    player = check_move(snapshot, player_id, kind, value)
+
+    state = snapshot.state
+    before = {seat.id: player_columns(seat) for seat in snapshot.players}
+    trick_ended = None
+    game_fields = {}
+    events = [GameEvent(game_id=game_id, kind=kind, player_id=player_id, value=value)]
+    if kind == BET:
+        state.set_bet(player, value)
+        game_fields['bet_turn'] = (snapshot.game.bet_turn + 1) % len(state.players)
+    else:
+        state.play_card(player, value)
+        if state.trick_complete():
+            # the full table stays visible until Game.resolve_trick clears it
+            winner = state.end_trick()
+            trick_ended = timezone.now()
+            events.append(GameEvent(game_id=game_id, kind=GameEvent.TRICK,
+                                    player_id=winner.id))
+
+    swapped = Game.objects.filter(id=game_id, version=version)
+    if not swapped.update(version=F('version') + 1, **game_fields):
+        raise Conflict(f'Game {game_id} moved past version {version}.')
+    # after the swap, so the log gets the moves in the order they won it
+    GameEvent.objects.bulk_create(events)
+    if not snapshot.from_log:
+        save_changes(snapshot, before, trick_ended)
+    elif trick_ended:
+        Round.objects.filter(id=state.round.id).update(trick_ended=trick_ended,
+                                                       updated=trick_ended)
+    if any(seat.is_bot for seat in snapshot.players):
+        wake_bots(game_id)
+    return version + 1
+
+def submit_move(game_id:int, player_id:int, kind:str, value:int,
+                expected_version:int=None, attempts:int=MAX_ATTEMPTS) -> int:
+    """applies a move atomically, retrying it on conflicting writes
+
+    Args:
+        expected_version (int, optional): only apply the move to this version
+            of the game, raising Conflict instead of retrying otherwise
+
+    Raises:
+        MoveError: if the move is not allowed in the current state
+        Conflict: if the game kept changing for every attempt
+
+    Returns:
+        int: the game's version after the move
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                version = apply_move(game_id, player_id, kind, value, expected_version)
+        except (Conflict, OperationalError):
+            # OperationalError covers lock timeouts and deadlocks, which are
+            # just conflicts the database noticed first
+            if expected_version is not None:
+                raise
+            if attempt == attempts - 1:
+                metrics.record_conflict()
+                raise
+            time.sleep(random.uniform(0, 0.001 * 2 ** attempt))
+            continue
+        publish_game(game_id, kind)
+        metrics.record_move()
+        return version
+
+def play_card_id(game_id:int, player_id:int, card_pk, **kwargs) -> int:
+    """submit_move for a card given by its primary key, as forms send it"""
+    try:
+        card = Card.objects.lookup(int(card_pk))
+    except (KeyError, TypeError, ValueError):
+        raise MoveError('There is no such card.')
+    return submit_move(game_id, player_id, CARD, card.index, **kwargs)
@@ -0,0 +1,245 @@
+"""Game change notifications pushed to browsers over server-sent events.
+
+Views publish a short event on a game's channel after every change, and the
+``/game/<id>/events`` stream (served straight from ``tricks/asgi.py``) fans
+it out to every open tab of the game's players, which then fetch their own
+view of the new state.
+Idle games send nothing but a keepalive comment.
+
+The streams also tell who is still at the table. When a player in a game in
+play has had no stream open for ``BOT_DISCONNECT_GRACE`` seconds, a bot
+stands in for them (``Player.stand_in``), and their seat is handed back as
+soon as one of their tabs reconnects. Like the in-process broker, open
+streams are only known per process.
+
+The broker is chosen with the ``GAME_EVENTS_BROKER`` setting, so the default
+in-process broker can be swapped for another implementation with the same
+``publish``/``subscribe`` interface.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.utils.module_loading import import_string
+from .botwake import wake_bots
+from .models import Game, Player
+
+KEEPALIVE_SECONDS = 15
+
+class Subscription:
+    """a single listener on a channel, read from the event loop"""
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, message):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class InProcessBroker:
+    """fans messages out to subscribers living in this process
+
+    publish() is safe to call from any thread, including the sync views
+    running in the ASGI thread pool.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put(message)
+            except RuntimeError:
+                # the subscriber's event loop is gone
+                self.unsubscribe(subscription)
+
+class Presence:
+    """counts each player's open streams, and stands a bot in for players
+    who have had none open for the grace period"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = defaultdict(int)
+        self._timers = {}
+
+    def opened(self, player_id):
+        with self._lock:
+            self._streams[player_id] += 1
+            timer = self._timers.pop(player_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def closed(self, game_id, player_id):
+        grace = getattr(settings, 'BOT_DISCONNECT_GRACE', 60)
+        with self._lock:
+            self._streams[player_id] -= 1
+            if self._streams[player_id] > 0:
+                return
+            del self._streams[player_id]
+            if grace is None:
+                return
+            timer = self._timers[player_id] = threading.Timer(
+                grace, self.away, args=(game_id, player_id))
+        timer.daemon = True
+        timer.start()
+
+    def is_open(self, player_id) -> bool:
+        with self._lock:
+            return player_id in self._streams
+
+    def away(self, game_id, player_id):
+        """hands a player's seat to a bot if they have not come back"""
+        with self._lock:
+            self._timers.pop(player_id, None)
+        if self.is_open(player_id):
+            return
+        try:
+            stood_in = (Player.objects
+                        .filter(id=player_id, is_bot=False, game__finished=False,
+                                game__current_round__isnull=False)
+                        .update(is_bot=True, stand_in=True))
+            if stood_in:
+                seat_changed(game_id)
+                wake_bots(game_id)
+        finally:
+            # a timer thread, nothing else closes it
+            close_old_connections()
+
+presence = Presence()
+
+def seat_changed(game_id):
+    Game.bump_version(game_id)
+    publish_game(game_id, 'autoplay')
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        broker_path = getattr(settings, 'GAME_EVENTS_BROKER', 'main.pubsub.InProcessBroker')
+        _broker = import_string(broker_path)()
+    return _broker
+
+def game_channel(game_id):
+    return f'game:{game_id}'
+
+def publish_game(game_id, event):
+    """tells every viewer of a game that its state changed
+
+    Sent once the current transaction commits, so listeners never fetch
+    state that is not visible yet.
+    """
+    transaction.on_commit(lambda: get_broker().publish(game_channel(game_id), event))
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+def seated_player(scope, game_id) -> Player|None:
+    """returns the session user's player in the game of an ASGI scope
+
+    The stream is served outside Django's middleware, so this does what the
+    session and auth middleware and views.get_player do for the game views.
+    """
+    headers = dict(scope.get('headers', ()))
+    request = HttpRequest()
+    request.COOKIES = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+    request.session = session_store(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    user = get_user(request)
+    if not user.is_authenticated:
+        return None
+    return Player.objects.filter(game=game_id, user=user.id).first()
+
+def _check_seat(scope, game_id) -> int|None:
+    """returns the id of the player opening a stream, if they are seated"""
+    try:
+        player = seated_player(scope, game_id)
+        if player is None:
+            return None
+        presence.opened(player.id)
+        if player.stand_in and Player.objects.filter(id=player.id, stand_in=True).update(
+                is_bot=False, stand_in=False):
+            seat_changed(game_id)
+        if Player.objects.filter(game=game_id, is_bot=True).exists():
+            # a tab reconnecting after a restart, when no wake-up survived
+            wake_bots(game_id)
+        return player.id
+    finally:
+        # no request_finished signal out here to let the connection go
+        close_old_connections()
+
+async def game_events(scope, receive, send, game_id):
+    """ASGI app streaming a game's events as text/event-stream
+
+    Refused with a 403 unless the session user plays in the game.
+    """
+    player_id = await sync_to_async(_check_seat)(scope, game_id)
+    if player_id is None:
+        await send({'type': 'http.response.start', 'status': 403,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'You are not playing in this game.'})
+        return
+    await send({'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'),
+                            (b'cache-control', b'no-cache'),
+                            (b'x-accel-buffering', b'no')]})
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    with get_broker().subscribe(game_channel(game_id)) as subscription:
+        try:
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n',
+                        'more_body': True})
+            while not disconnect.done():
+                message = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({message, disconnect},
+                                             timeout=KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if message in done:
+                    body = f'event: game\ndata: {message.result()}\n\n'
+                else:
+                    message.cancel()
+                    body = ': keepalive\n\n'
+                if not disconnect.done():
+                    await send({'type': 'http.response.body', 'body': body.encode(),
+                                'more_body': True})
+        finally:
+            disconnect.cancel()
+            presence.closed(game_id, player_id)
@@ -0,0 +1,111 @@
+"""Headless playouts of whole games on the engine, with no database.
+
+``play_game`` runs one game between bots on an in-memory ``GameState``.
+``simulate`` plays a batch and sums up the results, and is what the
+``simulate_games`` command fans out over a process pool. ``time_decisions``
+times a bot policy alone on positions recorded from playouts, for the
+``bench_bots`` command.
+"""
+import time
+from collections import Counter
+from itertools import cycle
+from random import Random
+from . import engine
+from .bots import BOTS
+
+def play_game(num_players:int, num_of_rounds:int, bots:list, rng:Random,
+              on_move=None) -> engine.GameState:
+    """plays a game to the end, with bots[n] sitting in seat n
+
+    on_move, if given, is called as on_move(kind, player, value) for every
+    bet and card, which is enough to replay the game move by move.
+    """
+    players = [engine.PlayerState(idx, bet_pos=idx, play_pos=idx)
+               for idx in range(num_players)]
+    state = engine.GameState(players, num_of_rounds)
+    deck = list(range(engine.DECK_SIZE))
+    while True:
+        rng.shuffle(deck)
+        cur_round = state.start_new_round(deck)
+        while (player := state.betting_player) is not None:
+            bet = bots[player.id].choose_bet(state, player)
+            state.set_bet(player, bet)
+            if on_move:
+                on_move('bet', player, bet)
+        for _ in range(cur_round.num):
+            while not state.trick_complete():
+                player = state.playing_player
+                card = bots[player.id].choose_card(state, player)
+                state.play_card(player, card)
+                if on_move:
+                    on_move('card', player, card)
+            state.end_trick()
+            state.start_new_trick()
+        state.end_round()
+        if cur_round.num == 1:
+            break
+    state.end_game()
+    return state
+
+def simulate(games:int, num_players:int, num_of_rounds:int,
+             bot:str='random', seed:int=None) -> Counter:
+    """plays a batch of games and returns their summed statistics"""
+    rng = Random(seed)
+    bots = [BOTS[bot](rng) for _ in range(num_players)]
+    totals = Counter()
+    def count_move(kind, player, value):
+        totals[f'{kind}s'] += 1
+    for _ in range(games):
+        state = play_game(num_players, num_of_rounds, bots, rng, count_move)
+        winners = state.winners()
+        totals['games'] += 1
+        totals['winning_score'] += winners[0].score
+        totals['total_score'] += sum(player.score for player in state.players)
+        totals['ties'] += len(winners) > 1
+    return totals
+
+class Recorder:
+    """a bot that copies down every position it is asked about"""
+    def __init__(self, bot, positions:list):
+        self.bot = bot
+        self.positions = positions
+
+    def record(self, state, player, kind):
+        self.positions.append((engine.GameState.from_dict(state.to_dict()), player.id, kind))
+
+    def choose_bet(self, state, player):
+        self.record(state, player, 'bet')
+        return self.bot.choose_bet(state, player)
+
+    def choose_card(self, state, player):
+        self.record(state, player, 'card')
+        return self.bot.choose_card(state, player)
+
+def time_decisions(decisions:int, num_players:int, num_of_rounds:int,
+                   bot:str='greedy', seed:int=None, positions:int=10000) -> dict:
+    """times a bot policy's decisions, without the moves around them
+
+    Positions are recorded from playouts first, then the policy is asked
+    about them in turn until it has made the given number of decisions.
+
+    Returns:
+        dict: decisions, seconds spent deciding and the slowest decision
+    """
+    rng = Random(seed)
+    recorded = []
+    bots = [Recorder(BOTS[bot](rng), recorded) for _ in range(num_players)]
+    while len(recorded) < min(decisions, positions):
+        play_game(num_players, num_of_rounds, bots, rng)
+    policy = BOTS[bot](rng)
+    choices = {'bet': policy.choose_bet, 'card': policy.choose_card}
+    moves = [(choices[kind], state, state.player(player_id))
+             for state, player_id, kind in recorded]
+    total = slowest = 0
+    clock = time.perf_counter
+    for _, (choice, state, player) in zip(range(decisions), cycle(moves)):
+        start = clock()
+        choice(state, player)
+        elapsed = clock() - start
+        total += elapsed
+        slowest = max(slowest, elapsed)
+    return {'decisions': decisions, 'seconds': total, 'slowest': slowest}
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from . import engine
+from .eventlog import rebuild
+from .models import Card, Game, card_id
+
+class GameSnapshot:
+    """everything the game views render, loaded in four queries
+
+    One query for the game joined to its current round, and one for its
+    players with their users. Bets and cards are only written to the event
+    log, so once a game is dealt its state is rebuilt from its latest
+    snapshot and the events after it, two more queries, and copied onto the
+    player and round objects for the templates. Cards come from the
+    in-process catalog, and orders, bet ranges and playable cards are worked
+    out by the engine in Python.
+    """
+    def __init__(self, game, players, cur_round, user_id, state=None):
+        self.game = game
+        self.players = players
+        self.cur_round = cur_round
+        self.by_id = {player.id: player for player in players}
+        # the requesting user's seat, None for anyone not in the game
+        self.player = next((player for player in players if player.user_id == user_id), None)
+        # whether the state came from the event log, rather than the rows
+        self.from_log = state is not None
+        if state is not None:
+            state.round.id = cur_round.id
+            self.copy_state(state)
+        for player in players:
+            # fill the related object caches so templates never query
+            player.cur_card = Card.objects.lookup(player.cur_card_id)
+        if cur_round:
+            cur_round.trump = Card.objects.lookup(cur_round.trump_id)
+            cur_round.trick = Card.objects.lookup(cur_round.trick_id)
+            cur_round.game = game
+            if cur_round.dealer_id in self.by_id:
+                cur_round.dealer = self.by_id[cur_round.dealer_id]
+        if state is None:
+            state = engine.GameState([player.to_state() for player in players],
+                                     game.num_of_rounds,
+                                     cur_round.to_state() if cur_round else None,
+                                     game.finished)
+        self.state = state
+
+    @classmethod
+    def load(cls, game_id, user_id):
+        game = Game.objects.select_related('current_round').get(id=game_id)
+        players = list(game.players.select_related('user'))
+        state = rebuild(game_id) if game.current_round_id is not None else None
+        return cls(game, players, game.current_round, user_id, state)
+
+    def copy_state(self, state:engine.GameState):
+        """sets the player and round fields to the state's, without saving"""
+        for player_state in state.players:
+            player = self.by_id[player_state.id]
+            player.hand_mask = player_state.hand
+            player.bet = player_state.bet
+            player.wins = player_state.wins
+            player.score = player_state.score
+            player.bet_pos = player_state.bet_pos
+            player.play_pos = player_state.play_pos
+            player.cur_card_id = card_id(player_state.cur_card)
+        cur_round = self.cur_round
+        round_state = state.round
+        cur_round.deck_mask = round_state.deck
+        cur_round.table_mask = round_state.table
+        cur_round.trump_id = card_id(round_state.trump)
+        cur_round.trick_id = card_id(round_state.trick)
+        cur_round.bet_sum = round_state.bet_sum
+
+    def _player(self, player_state):
+        return self.by_id[player_state.id] if player_state else None
+
+    def _players(self, player_states):
+        return [self.by_id[player_state.id] for player_state in player_states]
+
+    @property
+    def player_state(self):
+        return self.state.player(self.player.id)
+
+    @property
+    def in_play(self):
+        return self.cur_round is not None
+
+    def game_play_data(self):
+        player = self.player
+        return {'game': self.game,
+                'game_id': self.game.id,
+                'in_play': self.in_play,
+                'players': sorted(self.players, key=lambda player: player.score),
+                'player': player,
+                'betting_order': self._players(self.state.betting_order),
+                'betting_player': self._player(self.state.betting_player),
+                'hand': player.hand.all(),
+                'bet': player.bet,
+                'wins': player.wins,
+                'score': player.score,}
+
+    def cur_round_data(self):
+        cur_round = self.cur_round
+        reveal_remaining = cur_round.reveal_remaining()
+        playable = self.state.playable_cards(self.player_state)
+        return {'cur_round': cur_round,
+                'playing_order': self._players(self.state.playing_order),
+                'playing_player': self._player(self.state.playing_player),
+                'bet_range': self.state.bet_range(self.player_state),
+                'dealer': cur_round.dealer,
+                'trump': cur_round.trump,
+                'trick': cur_round.trick,
+                'table': cur_round.table.all(),
+                'card_play_ready': self.state.card_play_ready,
+                'playable_cards': Card.objects.from_mask(playable),
+                'trick_revealing': reveal_remaining is not None,
+                'trick_reveal_ms': (reveal_remaining // timedelta(milliseconds=1)
+                                    if reveal_remaining is not None else None),}
+
+    def last_round_data(self):
+        other_players = [player for player in self.players if player != self.player]
+        return {'others_cards': [player.hand.first() for player in other_players],
+                'last_card': self.player.hand.last(),}
+
+    def finished_data(self):
+        return {'game_id': self.game.id,
+                'players': sorted(self.players, key=lambda player: player.score),
+                'winners': self._players(self.state.winners()),}
+
+    def context(self):
+        """returns the template context for the whole game page"""
+        context = self.game_play_data()
+        if self.cur_round:
+            context.update(self.cur_round_data())
+            if self.cur_round.num == 1:
+                context.update(self.last_round_data())
+        return context
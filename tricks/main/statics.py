@@ -0,0 +1,62 @@
+"""Collected static files, served from ``STATIC_ROOT`` by ``tricks/asgi.py``.
+
+Build outputs name their files after a hash of the contents (the sprite
+sheet, its css and the card srcset sizes, see ``cardMaker``), so a name
+always means the same bytes and those files are sent with far-future,
+immutable cache headers. Anything else has to be revalidated. A file with a
+precompressed ``.gz`` copy next to it is sent compressed to clients that
+accept gzip.
+"""
+import asyncio
+import mimetypes
+import os
+import re
+from django.conf import settings
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[a-z0-9]+$')
+IMMUTABLE = b'public, max-age=31536000, immutable'
+REVALIDATE = b'no-cache'
+
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+def static_path(path:str) -> str|None:
+    """returns the file under STATIC_ROOT a url path names, if there is one"""
+    root = os.path.realpath(settings.STATIC_ROOT)
+    name = path.removeprefix(settings.STATIC_URL)
+    full_path = os.path.realpath(os.path.join(root, name))
+    if not full_path.startswith(root + os.sep) or not os.path.isfile(full_path):
+        return None
+    return full_path
+
+def accepts_gzip(scope) -> bool:
+    for name, value in scope.get('headers', []):
+        if name == b'accept-encoding':
+            return b'gzip' in value
+    return False
+
+def read(path:str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+async def serve_static(scope, receive, send, path:str):
+    """ASGI app sending one collected static file"""
+    full_path = static_path(path)
+    if full_path is None:
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not found.'})
+        return
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    cache_control = IMMUTABLE if HASHED_NAME.search(full_path) else REVALIDATE
+    headers = [(b'content-type', content_type.encode()), (b'cache-control', cache_control)]
+    if os.path.isfile(f'{full_path}.gz'):
+        headers.append((b'vary', b'accept-encoding'))
+        if accepts_gzip(scope):
+            full_path = f'{full_path}.gz'
+            headers.append((b'content-encoding', b'gzip'))
+    body = await asyncio.to_thread(read, full_path)
+    headers.append((b'content-length', str(len(body)).encode()))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    await send({'type': 'http.response.body',
+                'body': b'' if scope.get('method') == 'HEAD' else body})
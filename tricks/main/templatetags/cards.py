@@ -0,0 +1,64 @@
+import json
+import os
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+SPRITE_DIR = 'sprites'
+SPRITE_MANIFEST = f'{SPRITE_DIR}/cards.json'
+CARD_DIR = 'cards'
+BUILD_MANIFEST = f'{CARD_DIR}/build.json'
+
+_manifests = {}
+
+def read_manifest(name:str) -> dict:
+    """returns a json manifest from the static files, read once"""
+    if name not in _manifests:
+        path = finders.find(name)
+        if path:
+            with open(path) as file:
+                _manifests[name] = json.load(file)
+        else:
+            with staticfiles_storage.open(name) as file:
+                _manifests[name] = json.load(file)
+    return _manifests[name]
+
+def sprite_manifest():
+    """returns the manifest written by cardMaker.build_sprite_sheet"""
+    return read_manifest(SPRITE_MANIFEST)
+
+def card_srcset(name:str, ext:str) -> str:
+    """returns a card's srcset from the manifest of cardMaker.build_card_assets"""
+    entries = read_manifest(BUILD_MANIFEST)['srcset'][name][ext].split(', ')
+    return ', '.join(f'{static(f"{CARD_DIR}/{path}")} {width}'
+                     for path, width in (entry.split(' ') for entry in entries))
+
+@register.simple_tag
+def card_sprites():
+    """links the stylesheet that draws cards from the sprite sheet
+
+    Its name and the sheet's carry a content hash, so ``statics`` serves
+    them with far-future, immutable cache headers.
+    """
+    css = sprite_manifest()['files']['css']
+    return format_html('<link rel="stylesheet" href="{}">', static(f'{SPRITE_DIR}/{css}'))
+
+@register.simple_tag
+def card_image(card, width:int=66):
+    """draws one card as an <img> shown width css pixels wide, letting the
+    browser pick the srcset size and format that suits the screen"""
+    if card is None:
+        return ''
+    name = os.path.splitext(card.image)[0]
+    sizes = f'{width}px'
+    sprites = sprite_manifest()
+    height = round(width * sprites['height'] / sprites['width'])
+    return format_html('<picture><source type="image/webp" srcset="{}" sizes="{}">'
+                       '<img class="card-image" src="{}" srcset="{}" sizes="{}" '
+                       'width="{}" height="{}" alt="{}" loading="lazy"></picture>',
+                       card_srcset(name, 'webp'), sizes, static(f'{CARD_DIR}/{card.image}'),
+                       card_srcset(name, 'png'), sizes, width, height, str(card))
@@ -0,0 +1,157 @@
+"""Drives whole games through the test client and records what each view costs.
+
+``GameDriver`` logs a client in per player, creates and joins a game, deals,
+and then bets and plays every trick of every round through the real URLs.
+After each move every player refreshes the sidebar and table fragments the
+way an htmx tab does on a push event. Each request's query count, wall time
+and response size is recorded against the view that served it.
+
+``test_query_budget`` uses it to hold every game view to a query budget. It
+can also be run as a benchmark, printing the per-view report, with::
+
+    TRICKS_BENCHMARK=1 python manage.py test main.tests.test_query_budget
+"""
+import time
+from datetime import timedelta
+from random import Random
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Card, Game, Player
+
+HTMX = {'HTTP_HX_REQUEST': 'true'}
+
+class ViewStats:
+    """query counts, timings and sizes of every request served by one view"""
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+        self.seconds = []
+        self.sizes = []
+
+    def record(self, queries, seconds, size):
+        self.queries.append(queries)
+        self.seconds.append(seconds)
+        self.sizes.append(size)
+
+    @property
+    def requests(self):
+        return len(self.queries)
+
+    @property
+    def max_queries(self):
+        return max(self.queries)
+
+    @property
+    def mean_ms(self):
+        return sum(self.seconds) / len(self.seconds) * 1000
+
+    @property
+    def max_ms(self):
+        return max(self.seconds) * 1000
+
+    @property
+    def mean_bytes(self):
+        return sum(self.sizes) // len(self.sizes)
+
+    def __str__(self):
+        return (f'{self.name:<18} {self.requests:>6} {self.max_queries:>8} '
+                f'{self.mean_ms:>9.2f} {self.max_ms:>9.2f} {self.mean_bytes:>10}')
+
+class GameDriver:
+    """plays a full game with num_players clients, recording every request"""
+    def __init__(self, num_players=3, num_of_rounds=7, seed=0):
+        self.num_players = num_players
+        self.num_of_rounds = num_of_rounds
+        self.rng = Random(seed)
+        self.stats = {}
+        self.clients = {}
+        self.host = None
+        self.game = None
+
+    def request(self, view, client, method, url, data=None, **extra):
+        """sends one request and records it against view"""
+        send = getattr(client, method)
+        # the log is a bounded deque; a full one would hide new queries
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = send(url, data, **extra)
+            seconds = time.perf_counter() - start
+        self.stats.setdefault(view, ViewStats(view)).record(len(queries), seconds,
+                                                           len(response.content))
+        return response
+
+    def setup(self):
+        clients = []
+        users = []
+        for idx in range(self.num_players):
+            user = User.objects.create_user(username=f'bench{self.num_players}_{idx}', password='bench')
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+            users.append(user)
+        self.host = host = clients[0]
+        self.request('CreateGame', host, 'get', reverse('create_game'))
+        self.game = Game.objects.latest('id')
+        Game.objects.filter(id=self.game.id).update(num_of_rounds=self.num_of_rounds)
+        for client in clients[1:]:
+            self.request('JoinGame', client, 'post', reverse('join_game'),
+                         {'game_id': self.game.id})
+        for user, client in zip(users, clients):
+            self.clients[Player.objects.get(game=self.game, user=user).id] = client
+        self.request('StartGame', host, 'get', self.url('start_game'),
+                     {'start_game': 'deal'})
+        self.refresh()
+
+    def url(self, name):
+        return reverse(name, args=(self.game.id,))
+
+    def refresh(self):
+        """every player redraws the fragments a push event asks for"""
+        for client in self.clients.values():
+            self.request('SidebarUpdate', client, 'get', self.url('sidebar_update'), **HTMX)
+            self.request('GamePlayUpdate', client, 'get', self.url('game_play_update'), **HTMX)
+
+    def move(self):
+        """makes the next bet or card play, returning False once the game ends"""
+        game = Game.objects.get(id=self.game.id)
+        if game.finished:
+            return False
+        state = game.load_state()
+        player = state.betting_player
+        if player is not None:
+            bet = self.rng.choice(state.bet_range(player))
+            self.request('Bet', self.clients[player.id], 'post', self.url('bet'),
+                         {'bet': bet})
+        else:
+            player = state.playing_player
+            # a finished trick is cleared by the refresh below
+            if player is not None:
+                card = self.rng.choice(Card.objects.from_mask(state.playable_cards(player)))
+                key = 'play_last_card' if state.round.num == 1 else 'play_card'
+                self.request('PlayCard', self.clients[player.id], 'post',
+                             self.url('play_card'), {key: card.id})
+        # the mover follows the redirect back to the game page
+        client = self.clients[player.id] if player else self.host
+        self.request('CurGame', client, 'get', self.url('game'))
+        self.refresh()
+        return True
+
+    def play(self):
+        """plays the game to the end, without waiting out trick reveals"""
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            self.setup()
+            while self.move():
+                pass
+        return self.stats
+
+    def report(self):
+        lines = [f'{self.num_players} players, {self.num_of_rounds} rounds',
+                 f'{"view":<18} {"reqs":>6} {"queries":>8} {"mean ms":>9} '
+                 f'{"max ms":>9} {"mean bytes":>10}']
+        lines += [str(stats) for stats in self.stats.values()]
+        return '\n'.join(lines)
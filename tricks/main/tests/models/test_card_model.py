@@ -1,41 +1,55 @@
 from django.test import TestCase
-from ...models import Card
+from ...models import Card, encode_card, decode_card
 
 class CardTest(TestCase):
 
     @classmethod
     def setUpTestData(cls):
-        card1 = Card.objects.create(suit='s', rank='2')
-        card2 = Card.objects.create(suit='s', rank='3')
-        card3 = Card.objects.create(suit='c', rank='2')
-        card4 = Card.objects.create(suit='d', rank='2')
+        cls.card_ids = [Card.objects.get(suit=suit, rank=rank).id
+                        for suit, rank in [('s', 2), ('s', 3), ('c', 2), ('d', 2)]]
     
     def test_card_str(self):
-        card = Card.objects.get(id=1)
+        card = Card.objects.get(id=self.card_ids[0])
         self.assertEqual(str(card), '2 of s')
     
+    def test_catalog(self):
+        catalog = Card.objects.catalog()
+        self.assertEqual(len(catalog), 52)
+        self.assertEqual(len({(card.suit, card.rank) for card in catalog}), 52)
+        self.assertEqual(Card.objects.count(), 52)
+        self.assertEqual([card.code for card in catalog], list(range(52)))
+
+    def test_card_code(self):
+        self.assertEqual(encode_card('h', 2), 0)
+        self.assertEqual(encode_card('s', 14), 51)
+        self.assertEqual(decode_card(encode_card('c', 10)), ('c', 10))
+        card = Card.objects.get(code=encode_card('d', 12))
+        self.assertEqual((card.suit, card.rank, card.image), ('d', 12, '12_of_d.png'))
+        ranks = Card.objects.filter(suit='h').order_by('rank').values_list('rank', flat=True)
+        self.assertEqual(list(ranks), list(range(2, 15)))
+    
     def test_card_compare_diff_suit_notrump_false(self):
-        card1 = Card.objects.get(id=1) # 2 of spades
-        card3 = Card.objects.get(id=3) # 2 of clubs
-        self.assertFalse(card1.compare_rank(card3, 'h'))
+        card1 = Card.objects.get(id=self.card_ids[0]) # 2 of spades
+        card3 = Card.objects.get(id=self.card_ids[2]) # 2 of clubs
+        self.assertFalse(card1.is_better(card3, 'h'))
     
     def test_card_compare_same_suit_notrump_true(self):
-        card1 = Card.objects.get(id=1) # 2 of spades
-        card2 = Card.objects.get(id=2) # 3 of spades
-        self.assertTrue(card2.compare_rank(card1, 'h'))
+        card1 = Card.objects.get(id=self.card_ids[0]) # 2 of spades
+        card2 = Card.objects.get(id=self.card_ids[1]) # 3 of spades
+        self.assertTrue(card2.is_better(card1, 'h'))
     
     def test_card_compare_same_suit_notrump_false(self):
-        card1 = Card.objects.get(id=1) # 2 of spades
-        card2 = Card.objects.get(id=2) # 3 of spades
-        self.assertFalse(card1.compare_rank(card2, 'h'))
+        card1 = Card.objects.get(id=self.card_ids[0]) # 2 of spades
+        card2 = Card.objects.get(id=self.card_ids[1]) # 3 of spades
+        self.assertFalse(card1.is_better(card2, 'h'))
         
     def test_card_compare_both_trump_true(self):
-        card1 = Card.objects.get(id=1) # 2 of spades
-        card2 = Card.objects.get(id=2) # 3 of spades
-        self.assertTrue(card2.compare_rank(card1, 's'))
+        card1 = Card.objects.get(id=self.card_ids[0]) # 2 of spades
+        card2 = Card.objects.get(id=self.card_ids[1]) # 3 of spades
+        self.assertTrue(card2.is_better(card1, 's'))
     
     def test_card_compare_both_trump_false(self):
-        card1 = Card.objects.get(id=1) # 2 of spades
-        card2 = Card.objects.get(id=2) # 3 of spades
-        self.assertFalse(card1.compare_rank(card2, 's'))
+        card1 = Card.objects.get(id=self.card_ids[0]) # 2 of spades
+        card2 = Card.objects.get(id=self.card_ids[1]) # 3 of spades
+        self.assertFalse(card1.is_better(card2, 's'))
         
\ No newline at end of file
@@ -1,7 +1,11 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from ...models import Player, Round, Game
+from ...models import Player, Round, Game, Card
+from django.utils import timezone
 from collections import deque
+from ...models import TRICK_REVEAL
 
 # create test cases for player model
 class GameTest(TestCase):
@@ -37,10 +41,12 @@ class GameTest(TestCase):
         cur_round = Round.objects.create(id=1, game=game, num=3, dealer=players[0], bet_sum=0)
         game.players.add(*players)
         game.rounds.add(cur_round)
+        game.current_round = cur_round
         game.save()
         
         cur_round.deal_cards()
         self.assertFalse(game.check_round_complete())
+        self.assertEqual(Card.objects.count(), 52)
         
         for player in cur_round.players.all():
             player.hand.clear()
@@ -92,4 +98,67 @@ class GameTest(TestCase):
         self.assertEqual(players[2].play_pos, 1)
         self.assertEqual(players[0].bet_pos, 2)
         self.assertEqual(players[0].play_pos, 2)
-        
\ No newline at end of file
+        
+
+    def test_resolve_trick(self):
+        game = Game.objects.get(id=1)
+        for user in User.objects.all():
+            game.add_player(Player.objects.create(user=user))
+        cur_round = game.start_new_round()
+        for player in game.players.order_by('play_pos'):
+            player.play_card(player.playable_cards(cur_round)[0], cur_round)
+        self.assertTrue(cur_round.check_trick_complete())
+        cur_round.end_trick()
+        
+        # the trick stays on the table until the reveal is over
+        self.assertFalse(game.resolve_trick())
+        self.assertEqual(game.cur_round.table.count(), 3)
+        
+        later = timezone.now() + TRICK_REVEAL
+        self.assertTrue(game.resolve_trick(now=later))
+        self.assertFalse(game.resolve_trick(now=later))
+        cur_round = game.cur_round
+        self.assertEqual(cur_round.table.count(), 0)
+        self.assertIsNone(cur_round.trick_ended)
+        self.assertEqual(game.players.filter(cur_card__isnull=False).count(), 0)
+
+class BatchWriteTest(TestCase):
+    def seat(self, num_players):
+        game = Game.objects.create(num_of_rounds=3)
+        for idx in range(num_players):
+            user = User.objects.create(username=f'batch{num_players}_{idx}')
+            game.add_player(Player.objects.create(user=user))
+        cur_round = game.start_new_round()
+        for player in game.players.order_by('bet_pos'):
+            player.set_bet(0, cur_round)
+        for player in game.players.order_by('play_pos'):
+            player.play_card(player.playable_cards(cur_round)[0], cur_round)
+        return game, cur_round
+
+    def writes(self, step):
+        with CaptureQueriesContext(connection) as queries:
+            step()
+        return sum(1 for query in queries
+                   if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE')))
+
+    def test_fixed_write_cost(self):
+        costs = []
+        for num_players in (3, 6):
+            game, cur_round = self.seat(num_players)
+            costs.append([self.writes(cur_round.end_trick),
+                          self.writes(cur_round.start_new_trick),
+                          self.writes(game.end_round),
+                          self.writes(game.rotate_dealer),
+                          self.writes(game.reset_bets_and_wins)])
+        self.assertEqual(costs[0], costs[1])
+        self.assertEqual(costs[0], [5, 3, 2, 1, 1])
+
+    def test_end_round(self):
+        game, cur_round = self.seat(3)
+        cur_round.end_trick()
+        winner = game.players.get(wins=1)
+        game.end_round()
+        for player in game.players.all():
+            self.assertIsNone(player.bet)
+            self.assertEqual(player.wins, 0)
+            self.assertEqual(player.score, 0 if player == winner else 10)
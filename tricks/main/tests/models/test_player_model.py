@@ -7,12 +7,12 @@ from random import shuffle
 class PlayerTest(TestCase):
     @classmethod
     def setUpTestData(cls):
-        deck = [Card.objects.create(suit=suit, rank=rank) for suit in ['s', 'c', 'd', 'h']
-                for rank in ['2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14']]
+        deck = list(Card.objects.catalog())
         shuffle(deck)
         
         users = [User.objects.create(username=f'user{idx}') for idx in range(1, 6)]
-        players = [Player.objects.create(user=user) for user in users]
+        players = [Player.objects.create(user=user, bet_pos=idx, play_pos=idx)
+                   for idx, user in enumerate(users)]
         for player in players:
             player.hand.add(*deck[:4])
             deck = deck[4:]
@@ -21,9 +21,11 @@ class PlayerTest(TestCase):
         game = Game.objects.create(num_of_rounds=7)
         game.players.add(*players)
         
-        cur_round = Round.objects.create(id=1, game=game, num=3, dealer=players[0], cards_dealt=3, bet_sum=1)
+        cur_round = Round.objects.create(id=1, game=game, num=3, dealer=players[0], bet_sum=1)
+        cur_round.deck.set(deck)
         
         game.rounds.add(cur_round)
+        game.current_round = cur_round
         game.save()
 
     def test_calc_score(self):
@@ -50,6 +52,7 @@ class PlayerTest(TestCase):
         player = cur_round.players.first()
         player.play_card(card, cur_round)
         self.assertTrue(card not in player.hand.all())
+        self.assertEqual(Player.objects.get(id=player.id).hand.count(), 3)
         self.assertTrue(card in cur_round.table.all())
         self.assertEqual(cur_round.trick, card)
 
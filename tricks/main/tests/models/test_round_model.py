@@ -17,25 +17,26 @@ class RoundTest(TestCase):
         cur_round = Round.objects.create(id=1, game=game, num=3, dealer=players[0],
                                          bet_sum=0)
         game.rounds.add(cur_round)
+        game.current_round = cur_round
         game.save()
 
     def test_trick_winner(self):
         game = Game.objects.get(id=1)
         cur_round = game.cur_round
-        cur_round.trump = Card.objects.create(rank=3, suit='s')
-        cur_round.trick = Card.objects.create(rank=10,suit='c')
+        cur_round.trump = Card.objects.get(rank=3, suit='s')
+        cur_round.trick = Card.objects.get(rank=10, suit='c')
         game.save()
         
         player1 = game.players.get(play_pos=0)
-        player1.cur_card = Card.objects.create(rank=10, suit='c')
+        player1.cur_card = Card.objects.get(rank=10, suit='c')
         player1.save()
         
         player2 = game.players.get(play_pos=1)
-        player2.cur_card = Card.objects.create(rank=8, suit='c')
+        player2.cur_card = Card.objects.get(rank=8, suit='c')
         player2.save()
         
         player3 = game.players.get(play_pos=2)
-        player3.cur_card = Card.objects.create(rank=8, suit='h')
+        player3.cur_card = Card.objects.get(rank=8, suit='h')
         player3.save()
         game.players.set([player1, player2, player3], clear=True)
         
@@ -44,11 +45,11 @@ class RoundTest(TestCase):
         self.assertEqual(winner.user.username, 'user1')
         
         # second player wins (trick suit)
-        player1.cur_card = Card.objects.create(rank=10, suit='c')
+        player1.cur_card = Card.objects.get(rank=10, suit='c')
         player1.save()
-        player2.cur_card = Card.objects.create(rank=12, suit='c')
+        player2.cur_card = Card.objects.get(rank=12, suit='c')
         player2.save()
-        player3.cur_card = Card.objects.create(rank=8, suit='h')
+        player3.cur_card = Card.objects.get(rank=8, suit='h')
         player3.save()
         
         game.players.set([player1, player2, player3], clear=True)
@@ -56,11 +57,11 @@ class RoundTest(TestCase):
         self.assertEqual(winner.user.username, 'user2')
         
         # third player wins (trump suit)
-        player1.cur_card = Card.objects.create(rank=10, suit='c')
+        player1.cur_card = Card.objects.get(rank=10, suit='c')
         player1.save()
-        player2.cur_card = Card.objects.create(rank=12, suit='c')
+        player2.cur_card = Card.objects.get(rank=12, suit='c')
         player2.save()
-        player3.cur_card = Card.objects.create(rank=2, suit='s')
+        player3.cur_card = Card.objects.get(rank=2, suit='s')
         player3.save()
         
         game.players.set([player1, player2, player3], clear=True)
@@ -0,0 +1,189 @@
+import threading
+import time
+from datetime import timedelta
+from random import Random
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+from .. import botwake, engine
+from ..botrunner import BotRunner, on_turn
+from ..bots import GreedyBot
+from ..models import Game, GameEvent, Player
+from ..moves import BET, CARD, submit_move
+from ..snapshot import GameSnapshot
+
+class SlowBot(GreedyBot):
+    def choose_bet(self, state, player):
+        time.sleep(0.2)
+        return super().choose_bet(state, player)
+
+class StuckOnceBot(GreedyBot):
+    def __init__(self, rng):
+        super().__init__(rng)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def choose_bet(self, state, player):
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(5)
+        return super().choose_bet(state, player)
+
+class BotRunnerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.game = Game.objects.create(num_of_rounds=2)
+        self.game.add_player(Player.objects.create(user=self.user))
+        self.game.add_bot()
+        self.game.add_bot()
+        self.runner = BotRunner(workers=1, budget=5)
+
+    def waiting_on(self):
+        snapshot = GameSnapshot.load(self.game.id, None)
+        player = on_turn(snapshot)
+        return player and snapshot.by_id[player.id]
+
+    def test_add_bot(self):
+        bots = list(self.game.players.filter(is_bot=True).select_related('user'))
+        self.assertEqual([bot.user.username for bot in bots], ['Bot 1', 'Bot 2'])
+        self.assertFalse(bots[0].user.has_usable_password())
+        other = Game.objects.create(num_of_rounds=2)
+        self.assertEqual(other.add_bot().user, bots[0].user)
+
+    def test_bots_play_until_a_person_is_on_turn(self):
+        rng = Random(0)
+        self.game.start_new_round()
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            self.runner.play_bots(self.game.id)
+            while not Game.objects.get(id=self.game.id).finished:
+                player = self.waiting_on()
+                self.assertEqual(player.user, self.user)
+                state = GameSnapshot.load(self.game.id, None).state
+                seat = state.player(player.id)
+                if state.betting_player is seat:
+                    submit_move(self.game.id, seat.id, BET, rng.choice(state.bet_range(seat)))
+                else:
+                    submit_move(self.game.id, seat.id, CARD,
+                                engine.cards_in(state.playable_cards(seat))[0])
+                self.runner.play_bots(self.game.id)
+        bot_moves = GameEvent.objects.filter(game=self.game, kind__in=[BET, CARD],
+                                             player__is_bot=True)
+        # 2 bets and 3 cards for each bot
+        self.assertEqual(bot_moves.count(), 10)
+
+    def test_trick_reveal_is_waited_out(self):
+        self.game.start_new_round()
+        Player.objects.update(is_bot=True)
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(seconds=30)):
+            delay = self.runner.play_bots(self.game.id)
+        self.assertGreater(delay, 25)
+        self.assertIsNotNone(Game.objects.get(id=self.game.id).cur_round.trick_ended)
+
+    def test_slow_decision_falls_back(self):
+        runner = BotRunner(workers=1, budget=0.01)
+        runner.bot = SlowBot(Random(0))
+        Player.objects.filter(user=self.user).update(is_bot=True)
+        self.game.start_new_round()
+        first = GameSnapshot.load(self.game.id, None).state.betting_player
+        with mock.patch('main.botrunner.MAX_BOT_MOVES', 1), \
+                self.assertLogs('main.botrunner', 'WARNING'):
+            runner.play_bots(self.game.id)
+        event = GameEvent.objects.filter(game=self.game, kind=BET).get()
+        self.assertEqual((event.player_id, event.value), (first.id, 0))
+
+    def test_stuck_decisions_get_a_new_pool(self):
+        runner = BotRunner(workers=1, budget=0.05)
+        runner.bot = StuckOnceBot(Random(0))
+        self.addCleanup(runner.bot.release.set)
+        self.game.start_new_round()
+        state = GameSnapshot.load(self.game.id, None).state
+        player = state.betting_player
+        with self.assertLogs('main.botrunner', 'WARNING'):
+            runner.decide(state, player)
+        # the stuck thread would otherwise keep this one waiting past its budget
+        with mock.patch('main.botrunner.fallback') as fallback:
+            runner.decide(state, player)
+        fallback.assert_not_called()
+        self.assertEqual(runner.bot.calls, 2)
+
+    def test_failed_runs_back_off(self):
+        self.runner.later = mock.Mock()
+        with mock.patch.object(self.runner, 'play_bots', side_effect=RuntimeError), \
+                self.assertLogs('main.botrunner', 'ERROR'):
+            for _ in range(8):
+                self.runner.run(self.game.id)
+        delays = [call.args[0] for call in self.runner.later.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 8, 16, 32, 60, 60])
+        with mock.patch.object(self.runner, 'play_bots', return_value=None):
+            self.runner.run(self.game.id)
+        self.assertNotIn(self.game.id, self.runner._failures)
+
+    def test_nudge_runs_a_game_once(self):
+        self.runner.games = mock.Mock()
+        self.runner.nudge(self.game.id)
+        self.runner.nudge(self.game.id)
+        self.runner.games.submit.assert_called_once_with(self.runner.run, self.game.id)
+
+    def test_moves_wake_the_runner(self):
+        self.game.start_new_round()
+        Player.objects.update(is_bot=True)
+        with mock.patch('main.botwake.get_bot_runner') as get_runner:
+            with self.captureOnCommitCallbacks(execute=True):
+                with mock.patch('main.botrunner.MAX_BOT_MOVES', 1):
+                    self.runner.play_bots(self.game.id)
+        get_runner.return_value.nudge.assert_called_with(self.game.id)
+
+    def test_one_runner_per_process(self):
+        created = []
+
+        class SlowRunner:
+            def __init__(self):
+                time.sleep(0.05)
+                created.append(self)
+
+        with mock.patch('main.botwake._bot_runner', None), \
+                mock.patch('main.botwake.import_string', return_value=SlowRunner):
+            threads = [threading.Thread(target=botwake.get_bot_runner) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(created), 1)
+            self.assertIs(botwake.get_bot_runner(), created[0])
+
+class BotViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def test_add_bot(self):
+        response = self.client.post(reverse('add_bot', args=(self.game.id,)))
+        self.assertRedirects(response, reverse('game', args=(self.game.id,)))
+        self.assertEqual(self.game.players.filter(is_bot=True).count(), 1)
+
+    def test_page_load_wakes_a_bot_on_turn(self):
+        self.client.post(reverse('add_bot', args=(self.game.id,)))
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+        with mock.patch('main.botwake.get_bot_runner') as get_runner:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse('game', args=(self.game.id,)))
+            get_runner.return_value.nudge.assert_not_called()
+            Player.objects.update(is_bot=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse('game', args=(self.game.id,)))
+        get_runner.return_value.nudge.assert_called_once_with(self.game.id)
+
+    def test_autoplay(self):
+        self.client.post(reverse('add_bot', args=(self.game.id,)))
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+        with mock.patch('main.botwake.get_bot_runner') as get_runner:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('autoplay', args=(self.game.id,)))
+        get_runner.return_value.nudge.assert_called_with(self.game.id)
+        self.assertTrue(Player.objects.get(user__username='test').is_bot)
+        self.client.post(reverse('autoplay', args=(self.game.id,)))
+        self.assertFalse(Player.objects.get(user__username='test').is_bot)
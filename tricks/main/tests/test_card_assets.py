@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from django.test import SimpleTestCase
+import cardMaker
+from ..models import Card
+from ..templatetags.cards import card_image
+
+CARDS = os.path.join(settings.BASE_DIR, 'main', 'static', 'cards')
+
+def removed_regions(pixels, left, top, right, bottom, starting_pts):
+    """remove_regions worked out a pixel at a time, as the reference"""
+    height, width = pixels.shape[:2]
+    result = np.zeros_like(pixels)
+    for y in range(height):
+        for x in range(width):
+            if any(start_x <= x < start_x + right - left and start_y <= y < start_y + bottom - top
+                   for start_x, start_y in starting_pts):
+                continue
+            if x >= left and y >= top:
+                result[y - top, x - left] = pixels[y, x]
+    return result
+
+class CardMakerTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.rng = np.random.default_rng(0)
+
+    def test_remove_regions(self):
+        pixels = self.rng.integers(0, 255, (5, 7, 4), dtype=np.uint8)
+        path = os.path.join(self.root, 'card.png')
+        Image.fromarray(pixels).save(path)
+        saved = os.path.join(self.root, 'removed.png')
+        # one region over the edge, and two overlapping
+        starting_pts = [(0, 0), (4, 3), (-1, 2), (5, 2)]
+        cardMaker.remove_regions(path, 1, 2, 3, 4, starting_pts, saved)
+        expected = removed_regions(pixels[..., :3], 1, 2, 3, 4, starting_pts)
+        result = np.asarray(Image.open(saved))
+        self.assertEqual(result.shape, (5, 7, 3))
+        self.assertTrue((result == expected).all())
+
+        # saved over the original without a save path
+        cardMaker.remove_regions(path, 0, 0, 1, 1, [(2, 2)])
+        expected = removed_regions(pixels[..., :3], 0, 0, 1, 1, [(2, 2)])
+        self.assertTrue((np.asarray(Image.open(path)) == expected).all())
+
+    def test_batch_slice(self):
+        # 2 rows of 3 cards, 4 by 3 pixels, with 2 pixels between columns and 1 between rows
+        self.assertEqual(cardMaker.grid_boxes(16, 7, 4, 3, 2, 3),
+                         [(0, 0, 0, 0), (0, 1, 6, 0), (0, 2, 12, 0),
+                          (1, 0, 0, 4), (1, 1, 6, 4), (1, 2, 12, 4)])
+        pixels = self.rng.integers(0, 255, (7, 16, 3), dtype=np.uint8)
+        sheet = os.path.join(self.root, 'sheet.png')
+        Image.fromarray(pixels).save(sheet)
+        # run twice, the output folder being there already is fine
+        for _ in range(2):
+            with redirect_stdout(io.StringIO()):
+                outputs = cardMaker.batch_slice(sheet, 4, 3, ['h', 'c'], ['2', '3', '4'],
+                                                f'{self.root}/', return_outputs=True)
+        output_dir = os.path.join(self.root, 'slice_output')
+        self.assertEqual(sorted(os.listdir(output_dir)),
+                         sorted(f'{col}_of_{row}.png' for row in 'hc' for col in '234'))
+        self.assertEqual(len(outputs), 6)
+        for row, row_name in enumerate(['h', 'c']):
+            for col, col_name in enumerate(['2', '3', '4']):
+                path = os.path.join(output_dir, f'{col_name}_of_{row_name}.png')
+                card = np.asarray(Image.open(path))
+                top, left = row * 4, col * 6
+                self.assertTrue((card == pixels[top:top + 3, left:left + 4]).all())
+
+class BuildCardAssetsTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.card_dir = os.path.join(self.root, 'cards')
+        self.sprite_dir = os.path.join(self.root, 'sprites')
+        os.makedirs(self.card_dir)
+        for name in ['2_of_h', '3_of_h', 'back']:
+            shutil.copy(os.path.join(CARDS, f'{name}.png'), self.card_dir)
+
+    def build(self, **kwargs):
+        return cardMaker.build_card_assets(self.card_dir, self.sprite_dir, widths=[33, 66],
+                                           formats=['png'], log=lambda message: None,
+                                           **kwargs)
+
+    def test_only_changed_inputs_rebuild(self):
+        self.assertEqual(self.build(), {'sliced': 0, 'encoded': 6, 'sprites': True})
+        with open(os.path.join(self.card_dir, 'build.json')) as file:
+            manifest = json.load(file)
+        self.assertEqual(manifest['srcset']['2_of_h']['png'].count('w,'), 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.card_dir, 'srcset'))), 6)
+
+        self.assertEqual(self.build(), {'sliced': 0, 'encoded': 0, 'sprites': False})
+
+        Image.new('RGBA', (132, 180), 'red').save(os.path.join(self.card_dir, '3_of_h.png'))
+        self.assertEqual(self.build(), {'sliced': 0, 'encoded': 2, 'sprites': True})
+        # the old 3 of hearts variants are gone
+        self.assertEqual(len(os.listdir(os.path.join(self.card_dir, 'srcset'))), 6)
+        self.assertEqual(self.build(force=True)['encoded'], 6)
+
+    def test_slice_sheet(self):
+        rows, cols = len(cardMaker.ROW_NAMES), len(cardMaker.COL_NAMES)
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 255, (rows * 180 + (rows - 1) * 4,
+                                       cols * 132 + (cols - 1) * 2, 3), dtype=np.uint8)
+        sheet = os.path.join(self.root, 'sheet.png')
+        Image.fromarray(pixels).save(sheet)
+        summary = self.build(sheet=sheet)
+        self.assertEqual(summary['sliced'], 52)
+        ace = np.asarray(Image.open(os.path.join(self.card_dir, '14_of_c.png')))
+        self.assertTrue((ace == pixels[184:364, 10 * 134:10 * 134 + 132]).all())
+        self.assertEqual(self.build(sheet=sheet), {'sliced': 0, 'encoded': 0, 'sprites': False})
+
+        pixels[0:10, 0:10] = 0  # only the extras column changes
+        Image.fromarray(pixels).save(sheet)
+        self.assertEqual(self.build(sheet=sheet), {'sliced': 0, 'encoded': 0, 'sprites': False})
+
+class CardImageTest(SimpleTestCase):
+    def test_srcset(self):
+        html = card_image(Card(rank=3, suit='h'), 66)
+        with open(os.path.join(CARDS, 'build.json')) as file:
+            srcset = json.load(file)['srcset']['3_of_h']
+        for ext in ['png', 'webp']:
+            for entry in srcset[ext].split(', '):
+                self.assertIn(f'/static/cards/{entry}', html)
+        self.assertIn('src="/static/cards/3_of_h.png"', html)
+        self.assertIn('width="66" height="90"', html)
+        self.assertEqual(card_image(None), '')
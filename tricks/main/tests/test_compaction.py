@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from ..compaction import build_history, compact_finished_games, game_history
+from ..export import export_rows
+from ..models import ArchivedGame, Game, GameEvent, Round, StateSnapshot
+from .test_moves import create_game, next_move
+
+class CompactionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = Random(0)
+        cls.games = [create_game(3, 2, prefix=f'compact{idx}_') for idx in range(2)]
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            for game in cls.games:
+                while next_move(game.id, rng):
+                    pass
+        cls.playing = create_game(3, 2, prefix='playing')
+
+    def age(self, **kwargs):
+        Game.objects.update(finished_at=timezone.now() - timedelta(**kwargs))
+
+    def test_compact(self):
+        self.age(hours=2)
+        histories = [build_history(Game.objects.get(id=game.id)) for game in self.games]
+        self.assertEqual(compact_finished_games(batch_size=1), 2)
+        ids = [game.id for game in self.games]
+        self.assertEqual(ArchivedGame.objects.count(), 2)
+        for model in (Round, GameEvent, StateSnapshot):
+            self.assertFalse(model.objects.filter(game__in=ids).exists())
+            self.assertTrue(model.objects.filter(game=self.playing).exists())
+        for game, history in zip(self.games, histories):
+            game = Game.objects.get(id=game.id)
+            self.assertEqual(game_history(game), history)
+            self.assertEqual([len(cur_round['tricks']) for cur_round in history['rounds']],
+                             [2, 1])
+            self.assertEqual(sorted(player['score'] for player in history['players']),
+                             sorted(game.players.values_list('score', flat=True)))
+        self.assertEqual(compact_finished_games(), 0)
+
+    def test_export_archived(self):
+        self.age(hours=2)
+        rows = list(export_rows())
+        compact_finished_games()
+        self.assertEqual(list(export_rows()), rows)
+
+    def test_recent_games_wait(self):
+        self.assertEqual(compact_finished_games(), 0)
+        self.age(minutes=30)
+        self.assertEqual(compact_finished_games(older_than=timedelta(hours=1)), 0)
+        self.assertEqual(compact_finished_games(older_than=timedelta(minutes=10)), 2)
+
+    def test_command(self):
+        self.age(hours=2)
+        out = StringIO()
+        call_command('compact_finished_games', '--batch-size', '1', '--max-batches', '1',
+                     stdout=out)
+        self.assertIn('archived 1 games', out.getvalue())
+        self.assertEqual(ArchivedGame.objects.count(), 1)
+
+    def test_history_page(self):
+        self.age(hours=2)
+        compact_finished_games()
+        game = self.games[0]
+        player = game.players.select_related('user').first()
+        self.client.force_login(player.user)
+        response = self.client.get(reverse('game', args=(game.id,)))
+        self.assertRedirects(response, reverse('game_history', args=(game.id,)))
+        response = self.client.get(reverse('game_history', args=(game.id,)))
+        self.assertContains(response, 'Round 2')
+        self.assertContains(response, player.user.username)
+        self.client.force_login(User.objects.get(username='playing0'))
+        response = self.client.get(reverse('game_history', args=(game.id,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_game_is_kept(self):
+        # finished before the event log: no seating snapshot and no events
+        legacy = self.games[0]
+        StateSnapshot.objects.filter(game=legacy).delete()
+        GameEvent.objects.filter(game=legacy).delete()
+        self.age(hours=2)
+        self.assertEqual(compact_finished_games(), 1)
+        self.assertFalse(ArchivedGame.objects.filter(game=legacy).exists())
+        self.assertEqual(Round.objects.filter(game=legacy).count(), 2)
+        history = game_history(Game.objects.get(id=legacy.id))
+        self.assertEqual([cur_round['num'] for cur_round in history['rounds']], [2, 1])
+        player = legacy.players.select_related('user').first()
+        self.client.force_login(player.user)
+        response = self.client.get(reverse('game_history', args=(legacy.id,)))
+        self.assertContains(response, 'Round 2')
+        self.assertContains(response, 'Round 1')
@@ -0,0 +1,113 @@
+from random import Random
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth.models import User
+from .. import engine
+from ..models import Card, Player, Game
+
+HEARTS, DIAMONDS, CLUBS, SPADES = range(4)
+
+class EngineRulesTest(SimpleTestCase):
+    def test_card_code(self):
+        self.assertEqual(engine.card_code(HEARTS, 2), 0)
+        self.assertEqual(engine.card_code(SPADES, 14), 51)
+        card = engine.card_code(CLUBS, 11)
+        self.assertEqual((engine.suit_of(card), engine.rank_of(card)), (CLUBS, 11))
+
+    def test_is_better(self):
+        two_spades = engine.card_code(SPADES, 2)
+        three_spades = engine.card_code(SPADES, 3)
+        two_clubs = engine.card_code(CLUBS, 2)
+        self.assertFalse(engine.is_better(two_clubs, two_spades, HEARTS))
+        self.assertTrue(engine.is_better(three_spades, two_spades, HEARTS))
+        self.assertFalse(engine.is_better(two_spades, three_spades, HEARTS))
+        self.assertTrue(engine.is_better(two_clubs, three_spades, CLUBS))
+
+    def test_playable_cards(self):
+        hand = engine.mask_of([engine.card_code(HEARTS, 5),
+                               engine.card_code(CLUBS, 9),
+                               engine.card_code(SPADES, 12)])
+        trick = engine.card_code(CLUBS, 2)
+        trump = engine.card_code(SPADES, 7)
+        # leading: anything goes
+        self.assertEqual(engine.playable_cards(hand, None, trump), hand)
+        # follow the trick suit, or trump
+        self.assertEqual(engine.cards_in(engine.playable_cards(hand, trick, trump)),
+                         [engine.card_code(CLUBS, 9), engine.card_code(SPADES, 12)])
+        # holding neither suit frees the whole hand
+        trick = engine.card_code(DIAMONDS, 2)
+        trump = engine.card_code(DIAMONDS, 7)
+        self.assertEqual(engine.playable_cards(hand, trick, trump), hand)
+
+    def test_bet_range(self):
+        self.assertEqual(engine.bet_range(3, 3, 1, False), [0, 1, 2, 3])
+        self.assertEqual(engine.bet_range(3, 3, 1, True), [0, 1, 3])
+        self.assertEqual(engine.bet_range(0, 3, 1, True), [0])
+
+    def test_trick_winner(self):
+        trump_suit = SPADES
+        cards = [engine.card_code(CLUBS, 10), engine.card_code(CLUBS, 8),
+                 engine.card_code(HEARTS, 8)]
+        self.assertEqual(engine.trick_winner(cards, trump_suit), 0)
+        cards[1] = engine.card_code(CLUBS, 12)
+        self.assertEqual(engine.trick_winner(cards, trump_suit), 1)
+        cards[2] = engine.card_code(SPADES, 2)
+        self.assertEqual(engine.trick_winner(cards, trump_suit), 2)
+
+    def test_full_game(self):
+        rng = Random(7)
+        players = [engine.PlayerState(idx, bet_pos=idx, play_pos=idx) for idx in range(4)]
+        state = engine.GameState(players, num_of_rounds=5)
+        while True:
+            deck = list(range(engine.DECK_SIZE))
+            rng.shuffle(deck)
+            cur_round = state.start_new_round(deck)
+            self.assertEqual(cur_round.deck.bit_count(), 52 - 4 * cur_round.num - 1)
+            while state.betting_player:
+                player = state.betting_player
+                state.set_bet(player, rng.choice(state.bet_range(player)))
+            self.assertNotEqual(cur_round.bet_sum, cur_round.num)
+            for _ in range(cur_round.num):
+                while not state.trick_complete():
+                    player = state.playing_player
+                    playable = engine.cards_in(state.playable_cards(player))
+                    state.play_card(player, rng.choice(playable))
+                state.end_trick()
+                state.start_new_trick()
+            self.assertTrue(state.round_complete())
+            self.assertEqual(sum(player.wins for player in players), cur_round.num)
+            state.end_round()
+            if cur_round.num == 1:
+                break
+        state.end_game()
+        self.assertTrue(state.finished)
+        self.assertTrue(state.winners())
+
+class GameStateTest(TestCase):
+    def test_load_and_save_state(self):
+        game = Game.objects.create(num_of_rounds=3)
+        for idx in range(3):
+            user = User.objects.create(username=f'user{idx}')
+            game.add_player(Player.objects.create(user=user))
+
+        state = game.load_state()
+        self.assertIsNone(state.round)
+        state.start_new_round()
+        game.save_state(state)
+
+        cur_round = game.cur_round
+        self.assertEqual(cur_round.num, 3)
+        self.assertEqual(cur_round.trump.index, state.round.trump)
+        for player in game.players.all():
+            self.assertEqual(player.hand.count(), 3)
+
+        player = state.betting_order[0]
+        state.set_bet(player, 1)
+        card = engine.cards_in(player.hand)[0]
+        state.play_card(player, card)
+        game.save_state(state)
+
+        saved = Player.objects.get(id=player.id)
+        self.assertEqual(saved.bet, 1)
+        self.assertEqual(saved.cur_card, Card.objects.catalog()[card])
+        self.assertNotIn(saved.cur_card, saved.hand)
+        self.assertEqual(game.load_state().round.trick, card)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from random import Random
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from .. import eventlog
+from ..models import Game, GameEvent, StateSnapshot
+from ..moves import BET, submit_move
+from .test_moves import create_game, next_move
+
+def plain(state):
+    """state as a dict, without the round ids the log doesn't know"""
+    data = state.to_dict()
+    if data['round']:
+        data['round'][0] = None
+    return data
+
+class EventLogTest(TestCase):
+    def setUp(self):
+        self.game = create_game(3, 2)
+        self.rng = Random(0)
+
+    def move(self):
+        return next_move(self.game.id, self.rng)
+
+    def test_rows_catch_up_at_transitions(self):
+        checked = 0
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            while self.move():
+                rebuilt = eventlog.rebuild(self.game.id, snapshot_every=0)
+                if GameEvent.objects.latest('id').kind in (GameEvent.DEAL, GameEvent.CLEAR):
+                    game = Game.objects.get(id=self.game.id)
+                    self.assertEqual(plain(rebuilt), plain(game.row_state()))
+                    checked += 1
+        self.assertTrue(rebuilt.finished)
+        self.assertEqual(checked, 3)
+        kinds = GameEvent.objects.filter(game=self.game).values_list('kind', flat=True)
+        self.assertEqual(list(kinds).count(GameEvent.DEAL), 2)
+        self.assertEqual(list(kinds).count(GameEvent.TRICK), 3)
+
+    def test_move_queries(self):
+        player = self.game.load_state().betting_player
+        with CaptureQueriesContext(connection) as queries:
+            submit_move(self.game.id, player.id, BET, 0)
+        # leaving out the savepoints of the test's own transaction
+        statements = [query['sql'].split()[0] for query in queries
+                      if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # the game and its players, the snapshot and the events after it, the
+        # version swap, then the event, and no player or round rows
+        self.assertEqual(statements, ['SELECT'] * 4 + ['UPDATE', 'INSERT'])
+        event = GameEvent.objects.latest('id')
+        self.assertEqual((event.kind, event.player_id, event.value), (BET, player.id, 0))
+
+    def test_snapshots(self):
+        for _ in range(4):
+            self.move()
+        self.assertEqual(StateSnapshot.objects.filter(game=self.game).count(), 1)
+        state = eventlog.rebuild(self.game.id, snapshot_every=4)
+        snapshot = eventlog.latest_snapshot(self.game.id)
+        self.assertEqual(snapshot.event, GameEvent.objects.latest('id'))
+        self.assertEqual(plain(snapshot.to_state()), plain(state))
+        self.assertFalse(eventlog.tail(self.game.id, snapshot).exists())
+        self.move()
+        self.assertEqual(plain(eventlog.rebuild(self.game.id, snapshot_every=4)),
+                         plain(Game.objects.get(id=self.game.id).load_state()))
+        self.assertEqual(StateSnapshot.objects.filter(game=self.game).count(), 2)
+
+    def test_history(self):
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            while self.move():
+                pass
+        replay = [(event.kind, state.finished)
+                  for event, state in eventlog.history(self.game.id)]
+        self.assertEqual(replay[0], (GameEvent.DEAL, False))
+        self.assertEqual(replay[-1], (GameEvent.CLEAR, True))
+        self.assertEqual(len(replay), GameEvent.objects.filter(game=self.game).count())
+
+    def test_cleared_tricks_take_snapshots(self):
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            while self.move():
+                pass
+        snapshots = StateSnapshot.objects.filter(game=self.game, event__isnull=False)
+        self.assertEqual([snapshot.event.kind for snapshot in snapshots],
+                         [GameEvent.CLEAR] * 3)
+        seating = StateSnapshot.objects.get(game=self.game, event=None)
+        for snapshot in snapshots:
+            events = GameEvent.objects.filter(game=self.game, id__lte=snapshot.event_id)
+            folded = eventlog.fold(seating.to_state(), events.order_by('id'))
+            self.assertEqual(plain(folded), plain(snapshot.to_state()))
+
+    def test_corrupt_log(self):
+        state = eventlog.rebuild(self.game.id)
+        with self.assertRaises(eventlog.CorruptLog):
+            eventlog.fold(state, [('shuffle', None, None)])
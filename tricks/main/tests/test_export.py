@@ -0,0 +1,84 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from ..export import export_rows, pyarrow
+from ..models import Game
+from .test_moves import create_game, next_move
+
+class ExportGamesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = Random(0)
+        cls.games = [create_game(3, 2, prefix=f'export{idx}_') for idx in range(2)]
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            for game in cls.games:
+                while next_move(game.id, rng):
+                    pass
+        # still being played, and finished before there was an event log
+        create_game(3, 2, prefix='playing')
+        Game.objects.create(finished=True, finished_at=timezone.now())
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def export(self, *args, name='games.jsonl.gz'):
+        path = os.path.join(self.dir.name, name)
+        out = StringIO()
+        call_command('export_games', path, *args, stdout=out)
+        return path, out.getvalue()
+
+    def read(self, path):
+        with gzip.open(path, 'rt') as file:
+            return [json.loads(line) for line in file]
+
+    def test_rows(self):
+        path, out = self.export()
+        rows = self.read(path)
+        self.assertIn('2 games', out)
+        self.assertIn('skipped 1', out)
+        self.assertEqual({row['game'] for row in rows}, {game.id for game in self.games})
+        for game in self.games:
+            bets = [row for row in rows if row['game'] == game.id and row['kind'] == 'bet']
+            tricks = [row for row in rows if row['game'] == game.id and row['kind'] == 'trick']
+            self.assertEqual([row['round'] for row in bets], [2] * 3 + [1] * 3)
+            self.assertEqual([(row['round'], row['trick']) for row in tricks],
+                             [(2, 0), (2, 1), (1, 0)])
+            for row in tricks:
+                self.assertEqual(len(set(row['players'])), 3)
+                self.assertEqual(len(set(row['cards'])), 3)
+                self.assertIn(row['player'], row['players'])
+            # bets and wins are only kept from the last round
+            players = {player.id: player for player in game.players.all()}
+            for row in bets[3:]:
+                self.assertEqual(players[row['player']].bet, row['bet'])
+            self.assertEqual(players[tricks[-1]['player']].wins, 1)
+
+    def test_pages_and_since(self):
+        rows = list(export_rows(chunk_size=1))
+        path, out = self.export('--chunk-size', '1')
+        self.assertEqual(self.read(path), rows)
+        since = out.split('--since ')[1].strip()
+        path, out = self.export('--since', since)
+        self.assertEqual(self.read(path), [])
+        # saving a finished game again does not make it new
+        Game.objects.get(id=self.games[0].id).save()
+        path, out = self.export('--since', since)
+        self.assertEqual(self.read(path), [])
+        path, out = self.export('--since', '2000-01-01')
+        self.assertEqual(self.read(path), rows)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        path, out = self.export(name='games.parquet')
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.to_pylist(), list(export_rows()))
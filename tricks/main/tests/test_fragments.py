@@ -0,0 +1,94 @@
+import pickle
+import re
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from ..cache import ByteBudgetCache
+from ..fragments import fragment_cache
+from ..models import Game, Player, Round
+
+def unmasked(html):
+    return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', html)
+
+class ByteBudgetCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.value = 'x' * 100
+        size = len(pickle.dumps(self.value, pickle.HIGHEST_PROTOCOL))
+        self.cache = ByteBudgetCache('test-budget', {'OPTIONS': {'MAX_BYTES': size * 3}})
+        self.cache.clear()
+
+    def test_evicts_least_recently_used(self):
+        for key in 'abc':
+            self.cache.set(key, self.value)
+        self.cache.get('a')
+        self.cache.set('d', self.value)
+        self.assertIsNone(self.cache.get('b'))
+        for key in 'acd':
+            self.assertEqual(self.cache.get(key), self.value)
+        self.assertLessEqual(self.cache.size, self.cache.max_bytes)
+
+    def test_size_tracks_deletes(self):
+        self.cache.set('a', self.value)
+        self.cache.set('a', 'y')
+        self.cache.delete('a')
+        self.assertEqual(self.cache.size, 0)
+        self.cache.set('n', 1)
+        self.cache.incr('n', 10**30)
+        self.assertEqual(self.cache.size, len(self.cache._cache[self.cache.make_key('n')]))
+
+    def test_too_big_is_not_kept(self):
+        self.cache.set('a', self.value)
+        self.cache.set('big', self.value * 10)
+        self.assertIsNone(self.cache.get('big'))
+        self.assertEqual(self.cache.get('a'), self.value)
+
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        fragment_cache().clear()
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+        other = User.objects.create_user(username='other', password='other')
+        self.game.add_player(Player.objects.create(user=other))
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+
+    def poll(self, name, client=None):
+        return (client or self.client).get(reverse(name, args=(self.game.id,)),
+                                           HTTP_HX_REQUEST='true', HTTP_X_GAME_VERSION='0')
+
+    def test_repeat_poll_is_a_cache_hit(self):
+        for name in ['sidebar_update', 'game_play_update']:
+            first = self.poll(name)
+            # the game's version and the user, nothing else
+            with self.assertNumQueries(2):
+                second = self.poll(name)
+            self.assertEqual(second.status_code, 200)
+            # csrf tokens are masked afresh for every response
+            self.assertEqual(unmasked(second.content), unmasked(first.content))
+            self.assertNotIn(b'__fragment_csrf_token__', second.content)
+        # the autoplay form needs one
+        self.assertIn(b'csrfmiddlewaretoken', self.poll('sidebar_update').content)
+
+    def test_keyed_by_viewer_and_version(self):
+        self.poll('sidebar_update')
+        other = Client()
+        other.login(username='other', password='other')
+        with self.assertNumQueries(6):
+            self.poll('sidebar_update', other)
+        Game.bump_version(self.game.id)
+        with self.assertNumQueries(6):
+            self.poll('sidebar_update')
+
+    def test_revealing_trick_is_not_cached(self):
+        Round.objects.filter(id=Game.objects.get().current_round_id).update(
+            trick_ended=timezone.now())
+        Game.bump_version(self.game.id)
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(days=1)):
+            self.poll('game_play_update')
+            with self.assertNumQueries(6):
+                self.poll('game_play_update')
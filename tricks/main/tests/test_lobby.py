@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from ..lobby import load_page, lobby_page
+from ..models import Game, Player
+
+class LobbyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='lobby', password='lobby')
+        now = timezone.now()
+        cls.open = []
+        for idx in range(5):
+            game = Game.objects.create()
+            for seat in range(idx % 3 + 1):
+                game.players.add(Player.objects.create(user=cls.user))
+            # two games share a created time, the id breaks the tie
+            Game.objects.filter(id=game.id).update(created=now - timedelta(minutes=min(idx, 3)))
+            cls.open.append(game)
+        started = Game.objects.create(num_of_rounds=2)
+        for _ in range(2):
+            started.add_player(Player.objects.create(user=cls.user))
+        started.start_new_round()
+        Game.objects.create(finished=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages(self):
+        expected = list(Game.objects.filter(id__in=[game.id for game in self.open])
+                        .order_by('-created', '-id').values_list('id', flat=True))
+        seen = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(2):
+                page = load_page(cursor, limit=2)
+            seen += [game['id'] for game in page['games']]
+            for game in page['games']:
+                self.assertEqual(game['seats'], Game.objects.get(id=game['id']).players.count())
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_cached(self):
+        first = lobby_page()
+        Game.objects.create()
+        with self.assertNumQueries(0):
+            self.assertEqual(lobby_page(), first)
+        cache.clear()
+        self.assertEqual(len(lobby_page()['games']), len(first['games']) + 1)
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('lobby'))
+        self.assertTemplateUsed(response, 'lobby.html')
+        for game in self.open:
+            self.assertContains(response, f'Game {game.id}<')
+        response = self.client.get(reverse('lobby'), HTTP_HX_REQUEST='true')
+        self.assertTemplateNotUsed(response, 'lobby.html')
+        self.assertTemplateUsed(response, 'blocks/lobby_games.html')
+        for cursor in ('nope', '1.x', '9' * 30 + '.1'):
+            response = self.client.get(reverse('lobby'), {'before': cursor})
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from ..metrics import Histogram, Metrics, metrics
+from ..models import Game
+from ..moves import BET, submit_move
+from .test_moves import create_game
+
+class HistogramTest(SimpleTestCase):
+    def test_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in [0.5, 1, 3, 5, 9]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual((histogram.count, histogram.sum), (5, 18.5))
+
+    def test_moves_per_second(self):
+        figures = Metrics()
+        for second in [99, 130, 130, 159, 160]:
+            figures.record_move(now=second)
+        self.assertEqual(figures.moves(), 5)
+        # 160 is still under way, 99 is past the window
+        self.assertEqual(figures.moves_per_second(now=160.5) * 60, 3)
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def requests(self, view):
+        stats = metrics.views().get(view)
+        return stats.latency.count if stats else 0
+
+    def test_timed_views(self):
+        before = {view: self.requests(view) for view in ['game', 'sidebar_update', 'lobby']}
+        self.client.get(reverse('game', args=(self.game.id,)))
+        self.client.get(reverse('sidebar_update', args=(self.game.id,)), HTTP_HX_REQUEST='true')
+        self.client.get(reverse('lobby'))
+        self.assertEqual(self.requests('game'), before['game'] + 1)
+        self.assertEqual(self.requests('sidebar_update'), before['sidebar_update'] + 1)
+        self.assertEqual(self.requests('lobby'), 0)
+        self.assertGreater(metrics.views()['game'].queries.sum, 0)
+
+    def test_endpoint(self):
+        game = create_game(3, 2)
+        moves = metrics.moves()
+        player = game.load_state().betting_player
+        submit_move(game.id, player.id, BET, 0)
+        self.assertEqual(metrics.moves(), moves + 1)
+        self.client.get(reverse('game', args=(self.game.id,)))
+        with self.settings(METRICS_TOKEN='scrape'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('tricks_active_games 1\n', text)
+        self.assertIn(f'tricks_moves_total {moves + 1}\n', text)
+        self.assertIn(f'tricks_move_conflicts_total {metrics.conflicts()}\n', text)
+        self.assertIn('tricks_request_seconds_bucket{view="game",le="+Inf"}', text)
+        self.assertIn('tricks_db_queries_count{view="game"}', text)
+
+    def test_endpoint_is_private(self):
+        # being on the host proves nothing behind a proxy
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+        with self.settings(METRICS_TOKEN='scrape'):
+            for header in ['', 'Bearer other', 'Bearer scrape2']:
+                with self.subTest(header=header):
+                    response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=header)
+                    self.assertEqual(response.status_code, 404)
+        with self.settings(METRICS_TOKEN=None):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer None')
+            self.assertEqual(response.status_code, 404)
+        User.objects.filter(username='test').update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from .. import engine
+from ..models import Game, Player
+from ..moves import BET, CARD, Conflict, MoveError, submit_move
+
+def create_game(num_players, num_of_rounds, prefix='user'):
+    game = Game.objects.create(num_of_rounds=num_of_rounds)
+    for idx in range(num_players):
+        user = User.objects.create(username=f'{prefix}{idx}')
+        game.add_player(Player.objects.create(user=user))
+    game.start_new_round()
+    return game
+
+def next_move(game_id, rng):
+    """makes a random legal move, or clears the trick, returning False at the end"""
+    game = Game.objects.get(id=game_id)
+    if game.finished:
+        return False
+    state = game.load_state()
+    if (player := state.betting_player) is not None:
+        submit_move(game_id, player.id, BET, rng.choice(state.bet_range(player)))
+    elif (player := state.playing_player) is not None and not game.cur_round.trick_ended:
+        submit_move(game_id, player.id, CARD,
+                    rng.choice(engine.cards_in(state.playable_cards(player))))
+    else:
+        game.resolve_trick()
+    return True
+
+class MovesTest(TestCase):
+    def setUp(self):
+        self.game = create_game(3, 2)
+        self.players = list(self.game.players.order_by('bet_pos'))
+
+    def bet_all(self, bet=0):
+        for player in self.players:
+            submit_move(self.game.id, player.id, BET, bet)
+
+    def test_bets_in_turn(self):
+        first, second, last = self.players
+        version = Game.objects.get().version
+        with self.assertRaises(MoveError):
+            submit_move(self.game.id, second.id, BET, 1)
+        self.assertEqual(submit_move(self.game.id, first.id, BET, 1), version + 1)
+        submit_move(self.game.id, second.id, BET, 0)
+        # the last bet may not make the bets add up to the tricks
+        with self.assertRaises(MoveError):
+            submit_move(self.game.id, last.id, BET, 1)
+        submit_move(self.game.id, last.id, BET, 2)
+        state = Game.objects.get().load_state()
+        self.assertEqual(state.round.bet_sum, 3)
+        self.assertEqual([player.bet for player in state.betting_order], [1, 0, 2])
+
+    def test_cards_follow_the_rules(self):
+        first = self.players[0]
+        with self.assertRaises(MoveError):
+            submit_move(self.game.id, first.id, CARD, first.hand.first().index)
+        self.bet_all()
+        with self.assertRaises(MoveError):
+            submit_move(self.game.id, self.players[1].id, CARD,
+                        self.players[1].hand.first().index)
+        card = first.hand.first()
+        submit_move(self.game.id, first.id, CARD, card.index)
+        seat = Game.objects.get().load_state().player(first.id)
+        self.assertEqual(seat.cur_card, card.index)
+        self.assertFalse(seat.hand >> card.index & 1)
+        with self.assertRaises(MoveError):
+            submit_move(self.game.id, first.id, CARD, engine.cards_in(seat.hand)[0])
+
+    def test_last_card_ends_trick(self):
+        self.bet_all()
+        for player in self.game.players.order_by('play_pos'):
+            state = Game.objects.get().load_state()
+            card = engine.cards_in(state.playable_cards(state.player(player.id)))[0]
+            submit_move(self.game.id, player.id, CARD, card)
+        game = Game.objects.get()
+        self.assertIsNotNone(game.cur_round.trick_ended)
+        state = game.load_state()
+        self.assertEqual(sum(player.wins for player in state.players), 1)
+        winner = next(player for player in state.players if player.wins)
+        self.assertEqual(winner.play_pos, 0)
+
+    def test_moves_leave_the_rows(self):
+        self.bet_all(1)
+        # only the event log has the bets until the trick is cleared
+        self.assertEqual(list(self.game.players.values_list('bet', flat=True)), [None] * 3)
+        self.assertEqual([player.bet for player in Game.objects.get().load_state().players],
+                         [1] * 3)
+
+    def test_expected_version(self):
+        version = Game.objects.get().version
+        with self.assertRaises(Conflict):
+            submit_move(self.game.id, self.players[0].id, BET, 0, expected_version=version - 1)
+        submit_move(self.game.id, self.players[0].id, BET, 0, expected_version=version)
+
+class MoveStressTest(TransactionTestCase):
+    """every seat hammers one game from its own thread"""
+    def test_concurrent_moves(self):
+        num_players = 4
+        game = create_game(num_players, 5)
+        players = list(game.players.values_list('id', flat=True))
+        counts = {'moves': 0, 'rejected': 0, 'conflicts': 0}
+        lock = threading.Lock()
+        errors = []
+
+        deadline = time.monotonic() + 60
+
+        def seat(player_id):
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        game_ = Game.objects.get(id=game.id)
+                        if game_.finished:
+                            break
+                        game_.resolve_trick()
+                        state = game_.load_state()
+                    except OperationalError:
+                        # the shared in-memory test database locks whole
+                        # tables, so plain reads can collide here too
+                        continue
+                    if state.round is None:
+                        continue
+                    player = state.player(player_id)
+                    # move from this read even when it is not our turn, so
+                    # stale and out of turn moves race the real ones
+                    if not state.card_play_ready:
+                        kind, value = BET, state.bet_range(player)[0]
+                    else:
+                        playable = engine.cards_in(state.playable_cards(player))
+                        if not playable:
+                            continue
+                        kind, value = CARD, playable[0]
+                    try:
+                        submit_move(game.id, player_id, kind, value)
+                        result = 'moves'
+                    except MoveError:
+                        result = 'rejected'
+                    except (Conflict, OperationalError):
+                        result = 'conflicts'
+                    with lock:
+                        counts[result] += 1
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with mock.patch('main.models.TRICK_REVEAL', timedelta(0)):
+            threads = [threading.Thread(target=seat, args=(player_id,))
+                       for player_id in players]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        if os.environ.get('TRICKS_BENCHMARK'):
+            print(f'\n{counts["moves"]} moves in {elapsed:.2f}s, '
+                  f'{counts["moves"] / elapsed:.0f} moves/sec, '
+                  f'{counts["rejected"]} rejected, {counts["conflicts"]} gave up')
+
+        self.assertEqual(errors, [])
+        game = Game.objects.get(id=game.id)
+        self.assertTrue(game.finished)
+        # each round is one bet per player and one card per player per trick
+        rounds = range(1, 6)
+        self.assertEqual(counts['moves'], sum(num_players * (1 + num) for num in rounds))
+        self.assertEqual(game.rounds.count(), 5)
+        # the last round's single trick was won exactly once
+        self.assertEqual(sum(player.wins for player in game.players.all()), 1)
+        for cur_round in game.rounds.all():
+            self.assertEqual(cur_round.deck_mask.bit_count(), 52 - num_players * cur_round.num - 1)
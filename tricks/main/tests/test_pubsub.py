@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from ..models import Game, Player
+from ..pubsub import (InProcessBroker, Presence, _check_seat, game_channel, game_events,
+                      seated_player)
+from .. import pubsub
+
+class BrokerTest(SimpleTestCase):
+    def test_publish_from_thread(self):
+        broker = InProcessBroker()
+
+        async def listen():
+            with broker.subscribe('game:1') as subscription:
+                thread = threading.Thread(target=broker.publish, args=('game:1', 'bet'))
+                thread.start()
+                message = await asyncio.wait_for(subscription.get(), 1)
+                thread.join()
+            return message
+
+        self.assertEqual(asyncio.run(listen()), 'bet')
+        self.assertEqual(broker._subscriptions, {})
+
+    def test_other_games_not_notified(self):
+        broker = InProcessBroker()
+
+        async def listen():
+            with broker.subscribe('game:1') as subscription:
+                broker.publish('game:2', 'bet')
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(subscription.get(), 0.05)
+
+        asyncio.run(listen())
+
+class GameEventsTest(SimpleTestCase):
+    def setUp(self):
+        self.broker = InProcessBroker()
+        pubsub._broker = self.broker
+        presence = mock.patch('main.pubsub.presence')
+        self.presence = presence.start()
+        self.addCleanup(presence.stop)
+
+    def tearDown(self):
+        pubsub._broker = None
+
+    def test_stream(self):
+        sent = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b'event:'):
+                    disconnect.set()
+
+            with mock.patch('main.pubsub._check_seat', return_value=7):
+                stream = asyncio.ensure_future(game_events({}, receive, send, 5))
+                while not self.broker._subscriptions.get(game_channel(5)):
+                    await asyncio.sleep(0)
+            self.broker.publish(game_channel(5), 'card')
+            await asyncio.wait_for(stream, 1)
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertEqual(sent[-1]['body'], b'event: game\ndata: card\n\n')
+        self.assertEqual(self.broker._subscriptions, {})
+        self.presence.closed.assert_called_once_with(5, 7)
+
+    def test_refused(self):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        with mock.patch('main.pubsub._check_seat', return_value=None):
+            asyncio.run(game_events({}, receive, send, 5))
+        self.assertEqual(sent[0]['status'], 403)
+        self.assertEqual(self.broker._subscriptions, {})
+        self.presence.closed.assert_not_called()
+
+class SeatCheckTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='test', password='test')
+        User.objects.create_user(username='other', password='other')
+        self.client = Client()
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def scope(self, client):
+        cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+        headers = [(b'cookie', f'{cookie.key}={cookie.value}'.encode())] if cookie else []
+        return {'type': 'http', 'headers': headers}
+
+    def test_seated_player(self):
+        other = Client()
+        other.login(username='other', password='other')
+        self.assertEqual(seated_player(self.scope(self.client), self.game.id), Player.objects.get())
+        self.assertIsNone(seated_player(self.scope(other), self.game.id))
+        self.assertIsNone(seated_player(self.scope(Client()), self.game.id))
+        self.assertIsNone(seated_player(self.scope(self.client), self.game.id + 1))
+
+class PresenceTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='test', password='test')
+        self.client = Client()
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+        self.player = Player.objects.get()
+        patch = mock.patch('main.pubsub.presence', Presence())
+        self.presence = patch.start()
+        self.addCleanup(patch.stop)
+
+    def scope(self):
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME]
+        return {'type': 'http', 'headers': [(b'cookie', f'{cookie.key}={cookie.value}'.encode())]}
+
+    def leave(self):
+        with mock.patch('main.pubsub.threading.Timer') as timer:
+            self.presence.closed(self.game.id, self.player.id)
+        return timer
+
+    @override_settings(BOT_DISCONNECT_GRACE=30)
+    def test_bot_stands_in_for_a_player_away(self):
+        self.assertEqual(_check_seat(self.scope(), self.game.id), self.player.id)
+        timer = self.leave()
+        timer.assert_called_once_with(30, self.presence.away, args=(self.game.id, self.player.id))
+        version = Game.objects.get().version
+        self.presence.away(self.game.id, self.player.id)
+        self.player.refresh_from_db()
+        self.assertTrue(self.player.is_bot and self.player.stand_in)
+        self.assertEqual(Game.objects.get().version, version + 1)
+
+        # and gets up when they're back
+        self.assertEqual(_check_seat(self.scope(), self.game.id), self.player.id)
+        self.player.refresh_from_db()
+        self.assertFalse(self.player.is_bot or self.player.stand_in)
+        self.assertTrue(self.presence.is_open(self.player.id))
+
+    def test_coming_back_in_time(self):
+        _check_seat(self.scope(), self.game.id)
+        timer = self.leave()
+        _check_seat(self.scope(), self.game.id)
+        timer.return_value.cancel.assert_called_once_with()
+        self.presence.away(self.game.id, self.player.id)
+        self.assertFalse(Player.objects.get().is_bot)
+
+    def test_other_tab_still_open(self):
+        _check_seat(self.scope(), self.game.id)
+        _check_seat(self.scope(), self.game.id)
+        self.leave().assert_not_called()
+
+    def test_chosen_autoplay_is_kept(self):
+        self.client.post(reverse('autoplay', args=(self.game.id,)))
+        _check_seat(self.scope(), self.game.id)
+        self.assertTrue(Player.objects.get().is_bot)
+
+    @override_settings(BOT_DISCONNECT_GRACE=None)
+    def test_grace_off(self):
+        _check_seat(self.scope(), self.game.id)
+        self.leave().assert_not_called()
@@ -0,0 +1,49 @@
+import os
+from django.test import TestCase
+from ..models import Card, Game
+from .benchmark import GameDriver
+
+# most queries any one request to a view may run, as
+# (fixed, per player in the game)
+QUERY_BUDGETS = {
+    'CreateGame': (4, 0),
+    'JoinGame': (10, 0),
+    # dealing also records the seating and the deal in the event log
+    'StartGame': (14, 0),
+    # reading the game rebuilds it from its latest snapshot and the events
+    # after it, then the version swap and the event
+    'Bet': (10, 0),
+    # moving on from a finished trick saves the state to the rows and takes
+    # a snapshot, and a finished round also deals the next one, at a fixed
+    # cost however many players there are
+    'CurGame': (33, 0),
+    # the last card of a trick also stamps the round
+    'PlayCard': (11, 0),
+    'SidebarUpdate': (5, 0),
+    'GamePlayUpdate': (5, 0),
+}
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        # loaded once per process, by whichever request needs it first
+        Card.objects.catalog()
+
+    def play(self, num_players):
+        driver = GameDriver(num_players)
+        stats = driver.play()
+        if os.environ.get('TRICKS_BENCHMARK'):
+            print(f'\n{driver.report()}')
+        self.assertTrue(Game.objects.get(id=driver.game.id).finished)
+        self.assertEqual(stats.keys(), QUERY_BUDGETS.keys())
+        for view, (fixed, per_player) in QUERY_BUDGETS.items():
+            budget = fixed + per_player * num_players
+            with self.subTest(view=view, players=num_players):
+                self.assertLessEqual(stats[view].max_queries, budget,
+                                     f'{view} ran {stats[view].max_queries} queries '
+                                     f'with {num_players} players, budget is {budget}')
+
+    def test_three_players(self):
+        self.play(3)
+
+    def test_five_players(self):
+        self.play(5)
@@ -0,0 +1,54 @@
+from io import StringIO
+from random import Random
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from .. import engine
+from ..bots import BOTS
+from ..simulation import play_game, simulate, time_decisions
+
+class SimulationTest(SimpleTestCase):
+    def test_play_game(self):
+        for name, bot in BOTS.items():
+            rng = Random(3)
+            moves = []
+            state = play_game(4, 5, [bot(rng) for _ in range(4)], rng,
+                              lambda kind, player, value: moves.append((kind, value)))
+            with self.subTest(bot=name):
+                self.assertTrue(state.finished)
+                # every round bets once per player and plays its cards
+                self.assertEqual(len(moves), sum(4 + 4 * num for num in range(1, 6)))
+                cards = [value for kind, value in moves if kind == 'card']
+                self.assertTrue(all(0 <= card < engine.DECK_SIZE for card in cards))
+
+    def test_simulate_is_repeatable(self):
+        totals = simulate(20, 3, 4, 'greedy', seed=5)
+        self.assertEqual(totals['games'], 20)
+        self.assertEqual(totals, simulate(20, 3, 4, 'greedy', seed=5))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('simulate_games', games=30, players=3, rounds=3, workers=1,
+                     chunk_size=7, seed=1, stdout=out)
+        self.assertIn('30 games of 3 players', out.getvalue())
+        self.assertIn('games/sec', out.getvalue())
+
+    def test_command_needs_positive_counts(self):
+        for args in [['--games', '0'], ['--chunk-size', '0'], ['--games', 'x'],
+                     ['--chunk-size', '-5']]:
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                call_command('simulate_games', *args, workers=1, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('simulate_games', chunk_size=0, workers=1, stdout=StringIO())
+
+    def test_time_decisions(self):
+        result = time_decisions(500, 3, 3, 'greedy', seed=2, positions=100)
+        self.assertEqual(result['decisions'], 500)
+        self.assertGreater(result['seconds'], 0)
+        self.assertLessEqual(result['slowest'], result['seconds'])
+
+    def test_bench_command(self):
+        out = StringIO()
+        call_command('bench_bots', decisions=200, players=3, rounds=3, workers=1,
+                     seed=1, stdout=out)
+        self.assertIn('200 decisions of', out.getvalue())
+        self.assertIn('decisions/sec per core', out.getvalue())
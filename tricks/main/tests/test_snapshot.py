@@ -0,0 +1,43 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from ..models import Player, Game
+from ..snapshot import GameSnapshot
+
+class GameSnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = Game.objects.create(num_of_rounds=3)
+        for idx in range(4):
+            user = User.objects.create(username=f'user{idx}')
+            cls.game.add_player(Player.objects.create(user=user))
+        cls.player = cls.game.players.get(bet_pos=0)
+
+    def test_queries_before_start(self):
+        with self.assertNumQueries(2):
+            snapshot = GameSnapshot.load(self.game.id, self.player.user_id)
+            context = snapshot.context()
+        self.assertFalse(context['in_play'])
+        self.assertEqual(context['player'], self.player)
+
+    def test_queries_in_play(self):
+        cur_round = self.game.start_new_round()
+        first = self.game.players.get(bet_pos=0)
+        first.set_bet(1, cur_round)
+        first.play_card(first.hand.first(), cur_round)
+        # and the latest snapshot with the events after it
+        with self.assertNumQueries(4):
+            snapshot = GameSnapshot.load(self.game.id, self.player.user_id)
+            context = snapshot.context()
+            for player in context['playing_order']:
+                str(player.user)
+                player.cur_card and player.cur_card.image
+            context['trump'].image
+        self.assertTrue(context['in_play'])
+        self.assertEqual(context['cur_round'], cur_round)
+        self.assertEqual(context['betting_player'], self.game.players.get(bet_pos=1))
+        self.assertEqual(context['playing_player'], self.game.players.get(play_pos=1))
+        self.assertEqual(context['table'], [first.cur_card])
+        player = Player.objects.get(id=self.player.id)
+        self.assertEqual(context['playable_cards'], player.playable_cards(cur_round))
+        self.assertEqual(context['bet_range'], player.bet_range(cur_round))
+        self.assertFalse(context['card_play_ready'])
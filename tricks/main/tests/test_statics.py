@@ -0,0 +1,58 @@
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase, override_settings
+from ..statics import serve_static
+
+class ServeStaticTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'sprites'))
+        self.css = b'.card{display:inline-block}'
+        with open(os.path.join(self.root, 'sprites', 'cards.0123456789ab.css'), 'wb') as file:
+            file.write(self.css)
+        with open(os.path.join(self.root, 'sprites', 'cards.0123456789ab.css.gz'), 'wb') as file:
+            file.write(gzip.compress(self.css))
+        with open(os.path.join(self.root, 'app.js'), 'wb') as file:
+            file.write(b'let x;')
+        settings = override_settings(STATIC_ROOT=self.root, STATIC_URL='/static/')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, path, headers=()):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+        asyncio.run(serve_static(scope, receive, send, path))
+        return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+    def test_hashed_files_are_immutable(self):
+        status, headers, body = self.get('/static/sprites/cards.0123456789ab.css')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.css)
+        self.assertEqual(headers[b'content-type'], b'text/css')
+        self.assertIn(b'immutable', headers[b'cache-control'])
+        self.assertEqual(headers[b'vary'], b'accept-encoding')
+
+        status, headers, body = self.get('/static/app.js')
+        self.assertEqual(headers[b'cache-control'], b'no-cache')
+
+    def test_precompressed(self):
+        status, headers, body = self.get('/static/sprites/cards.0123456789ab.css',
+                                         [(b'accept-encoding', b'gzip, br')])
+        self.assertEqual(headers[b'content-encoding'], b'gzip')
+        self.assertEqual(gzip.decompress(body), self.css)
+
+    def test_not_found(self):
+        for path in ['/static/missing.css', '/static/../../etc/passwd', '/static/sprites']:
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)[0], 404)
@@ -0,0 +1,30 @@
+import numpy as np
+from django.test import SimpleTestCase
+from .. import engine
+from ..vectorized import NO_TRUMP, trick_winners, trick_winners_from_cards
+
+class TrickWinnersTest(SimpleTestCase):
+    def test_matches_engine(self):
+        rng = np.random.default_rng(11)
+        for num_players in range(2, 8):
+            cards = np.array([rng.permutation(engine.DECK_SIZE)[:num_players]
+                              for _ in range(2000)])
+            trump_suits = rng.integers(NO_TRUMP, 4, size=len(cards))
+            winners = trick_winners_from_cards(cards, trump_suits)
+            expected = [engine.trick_winner(list(trick), trump)
+                        for trick, trump in zip(cards.tolist(), trump_suits.tolist())]
+            with self.subTest(num_players=num_players):
+                self.assertEqual(winners.tolist(), expected)
+
+    def test_suits_and_ranks(self):
+        suits = [[2, 2, 0], [2, 2, 0], [2, 3, 0]]
+        ranks = [[10, 8, 8], [10, 12, 8], [10, 14, 2]]
+        self.assertEqual(trick_winners(suits, ranks, 3).tolist(), [0, 1, 1])
+        self.assertEqual(trick_winners(suits, ranks, [0, 1, 0]).tolist(), [2, 1, 2])
+        # a given lead suit overrides the first card's
+        self.assertEqual(trick_winners(suits, ranks, NO_TRUMP, [0, 0, 3]).tolist(),
+                         [2, 2, 1])
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            trick_winners([[0, 1]], [[2, 3, 4]], 0)
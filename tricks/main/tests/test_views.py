@@ -1,21 +1,166 @@
+from unittest import mock
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.test.client import Client
 from django.urls import reverse
 from django.contrib.auth import authenticate
+from ..fragments import fragment_cache
+from ..metrics import metrics
 from ..models import Game, Player
+from ..moves import MAX_ATTEMPTS, Conflict
 from ..views import CreateGame
+from ..templatetags.cards import sprite_manifest
 
 class CreateGameTest(TestCase):
     def setUp(self):
         self.client = Client()
+        User.objects.create_user(username='test', password='test')
 
     def test_create_game(self):
         self.client.login(username='test', password='test')
         response = self.client.get(reverse('create_game'))
         self.assertEqual(response.status_code, 302)
-        self.assertEqual(response['Location'], 'http://testserver/game/1/')
+        self.assertEqual(response['Location'], reverse('game', args=(Game.objects.get().id,)))
         self.assertEqual(Game.objects.count(), 1)
         self.assertEqual(Player.objects.count(), 1)
         self.assertEqual(Game.objects.get().num_of_rounds, 7)
-        self.assertEqual(Game.objects.get().players.get().user.username, 'test')
\ No newline at end of file
+        self.assertEqual(Game.objects.get().players.get().user.username, 'test')
+
+    def test_join_game(self):
+        User.objects.create_user(username='other', password='other')
+        self.client.login(username='other', password='other')
+        self.client.get(reverse('create_game'))
+        game = Game.objects.get()
+        self.client.login(username='test', password='test')
+        response = self.client.post(reverse('join_game'), {'game_id': game.id})
+        self.assertRedirects(response, reverse('game', args=(game.id,)),
+                             fetch_redirect_response=False)
+        self.assertEqual(game.players.count(), 2)
+
+    def test_join_refuses_started_and_finished_games(self):
+        self.client.login(username='test', password='test')
+        started = Game.objects.create()
+        started.add_bot()
+        started.start_new_round()
+        finished = Game.objects.create(finished=True)
+        for game in [started, finished]:
+            with self.subTest(game=game.id):
+                response = self.client.post(reverse('join_game'), {'game_id': game.id},
+                                            follow=True)
+                self.assertRedirects(response, reverse('lobby'))
+                self.assertContains(response, 'That game has already started.')
+                self.assertFalse(game.players.filter(user__username='test').exists())
+
+class GameVersionTest(TestCase):
+    def setUp(self):
+        # ids repeat between tests, so fragments cached by others could match
+        fragment_cache().clear()
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def get_update(self, name, version):
+        return self.client.get(reverse(name, args=(self.game.id,)),
+                               HTTP_HX_REQUEST='true', HTTP_X_GAME_VERSION=str(version))
+
+    def test_current_client_gets_no_content(self):
+        version = Game.objects.get().version
+        for name in ['sidebar_update', 'game_play_update']:
+            with self.assertNumQueries(1):
+                response = self.get_update(name, version)
+            self.assertEqual(response.status_code, 204)
+            self.assertEqual(response.content, b'')
+
+    def test_stale_client_gets_new_state(self):
+        version = Game.objects.get().version
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+        self.assertGreater(Game.objects.get().version, version)
+        for name in ['sidebar_update', 'game_play_update']:
+            response = self.get_update(name, version)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, f'"X-Game-Version": "{Game.objects.get().version}"')
+
+class PlayerBindingTest(TestCase):
+    def setUp(self):
+        fragment_cache().clear()
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def test_polls_skip_session_table(self):
+        for name in ['sidebar_update', 'game_play_update']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name, args=(self.game.id,)),
+                                           HTTP_HX_REQUEST='true')
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+            self.assertEqual(response.context['player'], Player.objects.get())
+
+    def test_other_users_have_no_seat(self):
+        User.objects.create_user(username='other', password='other')
+        self.client.login(username='other', password='other')
+        response = self.client.get(reverse('game_play_update', args=(self.game.id,)),
+                                   HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('bet', args=(self.game.id,)), {'bet': 0})
+        self.assertEqual(response.status_code, 404)
+
+class ContentionTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+
+    def test_moves_outraced_every_retry_redirect(self):
+        card = Player.objects.get().hand.first()
+        posts = [('bet', {'bet': '0'}), ('play_card', {'play_card': str(card.id)})]
+        conflicts = metrics.conflicts()
+        # another move always commits first, until the retries run out
+        with mock.patch('main.moves.apply_move', side_effect=Conflict('moved')) as apply_move, \
+                mock.patch('main.moves.time.sleep'):
+            for name, data in posts:
+                with self.subTest(view=name), self.assertLogs('main.views', 'WARNING'):
+                    response = self.client.post(reverse(name, args=(self.game.id,)), data)
+                    self.assertRedirects(response, reverse('game', args=(self.game.id,)),
+                                         fetch_redirect_response=False)
+        self.assertEqual(apply_move.call_count, 2 * MAX_ATTEMPTS)
+        self.assertEqual(metrics.conflicts(), conflicts + 2)
+
+    def test_refused_moves_are_shown(self):
+        card = Player.objects.get().hand.first()
+        # it is the bet, not a card, that is due
+        response = self.client.post(reverse('play_card', args=(self.game.id,)),
+                                    {'play_card': str(card.id)}, follow=True)
+        self.assertContains(response, 'It is not your turn to play.')
+        response = self.client.post(reverse('bet', args=(self.game.id,)), {'bet': 'x'},
+                                    follow=True)
+        self.assertContains(response, 'A bet has to be a number.')
+
+class CardSpritesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='test', password='test')
+        self.client.login(username='test', password='test')
+        self.client.get(reverse('create_game'))
+        self.game = Game.objects.get()
+
+    def test_cards_drawn_from_sprite_sheet(self):
+        self.client.get(reverse('start_game', args=(self.game.id,)), {'start_game': 'deal'})
+        response = self.client.get(reverse('game', args=(self.game.id,)))
+        manifest = sprite_manifest()
+        self.assertContains(response, f'/static/sprites/{manifest["files"]["css"]}')
+        for card in Player.objects.get().hand:
+            self.assertIn(card.sprite.removeprefix('card-'), manifest['cards'])
+            self.assertContains(response, f'class="card {card.sprite}"')
+        # only the trump is a picture, sized by srcset
+        self.assertContains(response, '<img', count=1)
+        self.assertContains(response, 'alt="%s"' % Game.objects.get().current_round.trump)
@@ -1,17 +1,53 @@
+import logging
 # standard django libraries
+from django.conf import settings
+from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic.base import RedirectView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, Http404
 from django.urls import reverse
 from django.contrib.auth.forms import UserCreationForm
 # from django_htmx libraries
 from django_htmx.http import HttpResponseClientRedirect, HttpResponseStopPolling 
 # custom django imports
-from .models import Card, Player, Game
-# python libraries
-import time
+from .compaction import game_history, history_context
+from .fragments import cached_fragment, render_fragment
+from .lobby import decode_cursor, lobby_page
+from .metrics import render_metrics, scraper_authorized
+from .models import Player, Game
+from .moves import BET, Conflict, MoveError, play_card_id, submit_move
+from .botrunner import bot_on_turn
+from .botwake import wake_bots
+from .pubsub import publish_game
+from .snapshot import GameSnapshot
+
+logger = logging.getLogger(__name__)
+
+def client_game_version(request, game_id):
+    """returns the game's version if the htmx client sent back the one it holds
+
+    Clients without a version get None and no query, they always rerender.
+    """
+    if request.headers.get('X-Game-Version', '').isdigit():
+        return Game.current_version(game_id)
+
+def client_is_current(request, version):
+    """checks the game version an htmx client sent back with its request"""
+    return version is not None and request.headers.get('X-Game-Version') == str(version)
+
+def get_player(game_id, user):
+    """returns the logged in user's player in a game
+
+    The seat is worked out from the game in the url and the authenticated
+    user on every request instead of being remembered in the session, so it
+    costs no session I/O and can't be pointed at someone else's player.
+    """
+    try:
+        return Player.objects.get(game=game_id, user=user.id)
+    except Player.DoesNotExist:
+        raise Http404('You are not playing in this game.')
 
 def home(request):
     return render(request, 'home.html')
@@ -31,90 +67,66 @@ class CreateGame(View, LoginRequiredMixin):
         player = Player.objects.create(user=request.user)
         game = Game.objects.create(num_of_rounds=7)
         game.players.add(player)
-        request.session['game_details'] = {'player_id': player.id,
-                                           'game_id': game.id,}
         return HttpResponseRedirect(reverse('game', args=(game.id,)))
 
+class Lobby(View):
+    def get(self, request):
+        cursor = request.GET.get('before') or None
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError:
+                raise Http404('There is no such lobby page.')
+        template = 'blocks/lobby_games.html' if request.htmx else 'lobby.html'
+        return render(request, template, lobby_page(cursor))
+
 class JoinGame(View, LoginRequiredMixin):
     def post(self, request):
         # take game id from input field
         game_id = request.POST.get('game_id')
         game = Game.objects.get(id=game_id)
-        if game.in_play:
-            HttpResponse('Game in progress. Try another game.')
         players = game.players.all()
         player_not_in_game =  players.filter(user=request.user).count() == 0
+        if player_not_in_game and (game.in_play or game.finished):
+            messages.error(request, 'That game has already started. Try another game.')
+            return HttpResponseRedirect(reverse('lobby'))
         if player_not_in_game:
             player = Player.objects.create(user=request.user,)
             game.add_player(player)
-        else:
-            player = players.get(user=request.user)
-        request.session['game_details'] = ({'player_id': player.id,
-                                            'game_id': game_id,})
+            publish_game(game.id, 'join')
         return HttpResponseRedirect(reverse('game', args=(game.id,)))
 
 class CurGame(View, LoginRequiredMixin):
-    def update_cur_round_data(self, game, context, cur_round, players, player):
-            play_order = game.players.order_by('play_pos')
-            remaining_plaing_players = game.players.filter(cur_card__isnull=True).order_by('play_pos')
-            playing_player = remaining_plaing_players.first()
-            bet_range = player.bet_range(cur_round)
-            card_play_ready = cur_round.players.filter(bet__isnull=True).count() == 0
-            playable_cards = player.playable_cards(cur_round)
-            context.update({
-                'cur_round': cur_round,
-                'playing_order': play_order,
-                'playing_player': playing_player,
-                'bet_range': bet_range,
-                'dealer': cur_round.dealer,
-                'trump': cur_round.trump,
-                'trick': cur_round.trick,
-                'table': cur_round.table.all(),
-                'card_play_ready': card_play_ready,
-                'playable_cards': playable_cards,
-                })
-            
-    def update_game_play_data(self, game, context, players, player):
-        bet_order = game.players.order_by('bet_pos')
-        remaining_betting_players = game.players.filter(bet__isnull=True).order_by('bet_pos')
-        betting_player = remaining_betting_players.first()
-        hand = player.hand.all().order_by('suit', 'rank')
-        context.update({'game': game,
-                        'players': players,
-                        'player': player,
-                        'betting_order': bet_order,
-                        'betting_player': betting_player,
-                        'hand': hand,
-                        'bet': player.bet,
-                        'wins': player.wins,
-                        'score': player.score,})
-        
-    def update_last_round_data(self, game, context, player):
-            other_players = game.players.exclude(id=player.id)
-            others_cards = [player.hand.first() for player in other_players]
-            last_card = player.hand.last()
-            context.update({'others_cards': others_cards,
-                            'last_card': last_card,})
+    def load_snapshot(self, request, game_id):
+        """loads the game for the requesting user, moving on from a
+        finished trick first if its reveal is over"""
+        snapshot = GameSnapshot.load(game_id, request.user.id)
+        if snapshot.player is None:
+            raise Http404('You are not playing in this game.')
+        if snapshot.game.resolve_trick(cur_round=snapshot.cur_round):
+            publish_game(game_id, 'finished' if snapshot.game.finished else 'trick')
+            snapshot = GameSnapshot.load(game_id, request.user.id)
+        if bot_on_turn(snapshot):
+            # wake-ups are lost on a restart, a bot left on turn waits for this
+            wake_bots(game_id)
+        return snapshot
     
     def get(self, request, game_id):
-        context = request.session['game_details'].copy()
-        if request.user.is_authenticated:
-            game = Game.objects.get(id=game_id)
-        else:
+        if not request.user.is_authenticated:
             return HttpResponseRedirect(reverse('home'))
-        player = Player.objects.get(id=context['player_id'])
-        players = game.players.all().order_by('score')
-        cur_round = game.cur_round
-        if cur_round:
-            self.update_cur_round_data(game, context, cur_round, players, player)
-        
-        self.update_game_play_data(game, context, players, player)
-        
-        last_round = cur_round and cur_round.num == 1
-        if last_round:
-            self.update_last_round_data(game, context, player)
+        snapshot = self.load_snapshot(request, game_id)
+        if snapshot.game.finished and not snapshot.in_play:
+            # archived, see compaction
+            return HttpResponseRedirect(reverse('game_history', args=(game_id,)))
+        return render(request, 'game.html', snapshot.context())
 
-        return render(request, 'game.html', context)
+class GameHistory(View):
+    def get(self, request, game_id):
+        get_player(game_id, request.user)
+        game = Game.objects.get(id=game_id)
+        if not game.finished:
+            return HttpResponseRedirect(reverse('game', args=(game_id,)))
+        return render(request, 'game_history.html', history_context(game_history(game)))
     
 class StartGame(View):
     def get(self, request, game_id):
@@ -124,101 +136,106 @@ class StartGame(View):
             return HttpResponseRedirect(reverse('home'))
         
         if 'start_game' in request.GET:
-            cur_round = game.start_new_round()
-            request.session['game_details']['round_id'] = cur_round.id
-            request.session.save()
+            game.start_new_round()
+            publish_game(game.id, 'round')
+            if game.players.filter(is_bot=True).exists():
+                wake_bots(game.id)
             return HttpResponseRedirect(reverse('game', args=(game.id,)))
 
+class AddBot(View):
+    def post(self, request, game_id):
+        get_player(game_id, request.user)
+        game = Game.objects.get(id=game_id)
+        if not game.in_play:
+            game.add_bot()
+            publish_game(game_id, 'join')
+        return HttpResponseRedirect(reverse('game', args=(game_id,)))
+
+class Autoplay(View):
+    def post(self, request, game_id):
+        """hands the requesting player's seat to a bot, or takes it back"""
+        player = get_player(game_id, request.user)
+        # chosen here, so a reconnecting stream must not undo it
+        Player.objects.filter(id=player.id).update(is_bot=not player.is_bot, stand_in=False)
+        Game.bump_version(game_id)
+        publish_game(game_id, 'autoplay')
+        if not player.is_bot:
+            wake_bots(game_id)
+        return HttpResponseRedirect(reverse('game', args=(game_id,)))
+
 class Bet(View):
     def post(self, request, game_id):
-        context = request.session['game_details']
-        
         if 'bet' in request.POST:
-            game = Game.objects.get(id=game_id)
-            cur_round = game.cur_round
-            player = Player.objects.get(id=context['player_id'])
-            bet = int(request.POST.get('bet'))
-            player.set_bet(bet, cur_round)
-            game.bet_turn += 1
-            game.bet_turn %= len(game.players.all())
-            game.save()
-            return HttpResponseRedirect(reverse('game', args=(game.id,)))
+            player = get_player(game_id, request.user)
+            try:
+                submit_move(game_id, player.id, BET, int(request.POST.get('bet')))
+            except ValueError:
+                messages.error(request, 'A bet has to be a number.')
+            except MoveError as error:
+                messages.error(request, str(error))
+            except Conflict:
+                # outraced on every retry, the redirect shows the current state
+                logger.warning('bet by player %s in game %s gave up after retries',
+                               player.id, game_id)
+            return HttpResponseRedirect(reverse('game', args=(game_id,)))
 
 
 class PlayCard(View):
     def post(self, request, game_id):
-        game = Game.objects.get(id=game_id)
-        cur_round = game.cur_round
-        context = request.session['game_details']
-        player = Player.objects.get(id=context['player_id'])
-        
-        if 'play_card' in request.POST:
-            card_id = request.POST.get('play_card')
-            card = Card.objects.get(id=card_id)
-            player.play_card(card, cur_round)
-            if cur_round.check_trick_complete():
-                cur_round.end_trick()
-                time.sleep(3)
-                cur_round.start_new_trick()
-                if cur_round.num != 1 and game.check_round_complete():
-                    game.end_round()
-                    game.start_new_round()
-            return HttpResponseRedirect(reverse('game', args=(game.id,)))
-        if 'play_last_card' in request.POST:
-            card_id = request.POST.get('play_last_card')
-            card = Card.objects.get(id=card_id)
-            player.play_card(card, cur_round)
-            return HttpResponseRedirect(reverse('game', args=(game.id,)))
+        player = get_player(game_id, request.user)
+        for field in ['play_card', 'play_last_card']:
+            if field in request.POST:
+                try:
+                    play_card_id(game_id, player.id, request.POST.get(field))
+                except MoveError as error:
+                    messages.error(request, str(error))
+                except Conflict:
+                    logger.warning('card by player %s in game %s gave up after retries',
+                                   player.id, game_id)
+                return HttpResponseRedirect(reverse('game', args=(game_id,)))
     
 class SidebarUpdate(CurGame):
     def get(self, request, game_id):
-        game = Game.objects.get(id=game_id)
-        context = request.session['game_details'].copy()
+        version = client_game_version(request, game_id)
+        if client_is_current(request, version):
+            return HttpResponse(status=204)
         if request.htmx:
-            status = 200
-            player = Player.objects.get(id=context['player_id'])
-            players = game.players.all().order_by('score')
-            cur_round = game.cur_round
-            if cur_round:
-                self.update_cur_round_data(game, context, cur_round, players, player)
-            
-            self.update_game_play_data(game, context, players, player)
-            
-            if 'last_round' in context and context['last_round']:
-                self.update_last_round_data(game, context, player)
-                if game.finished:
-                    status = 286
-            return render(request, 'blocks/sidebar.html', context, status=status)
+            cached = cached_fragment(request, game_id, version, 'sidebar')
+            if cached:
+                return cached
+            snapshot = self.load_snapshot(request, game_id)
+            status = 286 if snapshot.game.finished else 200
+            return render_fragment(request, snapshot.game, 'sidebar',
+                                   'blocks/sidebar_update.html', snapshot.context(), status)
 
 class GamePlayUpdate(CurGame):
-    def end_game(self, game, context):
-        cur_round = game.cur_round
-        if not game.finished:
-            cur_round.end_trick()
-            time.sleep(3)
-            game.end_round()
-            game.end_game()
-        winners = game.get_winners()
-        players = game.players.all().order_by('score')
-        context.update({'players': players,
-                        'winners': winners,})
-    
     def get(self, request, game_id):
-        game = Game.objects.get(id=game_id)
-        context = request.session['game_details'].copy()
+        version = client_game_version(request, game_id)
+        if client_is_current(request, version):
+            return HttpResponse(status=204)
         if request.htmx:
-            player = Player.objects.get(id=context['player_id'])
-            players = game.players.all().order_by('score')
-            cur_round = game.cur_round
-            if cur_round:
-                self.update_cur_round_data(game, context, cur_round, players, player)
-                
-            self.update_game_play_data(game, context, players, player)
-            
-            if cur_round and cur_round.num == 1:
-                self.update_last_round_data(game, context, player)
-                if cur_round.check_trick_complete():
-                    self.end_game(game, context)
-                    return render(request, 'blocks/table_game_finished.html',
-                                  context, status=286)
-            return render(request, 'blocks/table.html', context)
\ No newline at end of file
+            cached = cached_fragment(request, game_id, version, 'table')
+            if cached:
+                return cached
+            snapshot = self.load_snapshot(request, game_id)
+            if snapshot.game.finished:
+                return render_fragment(request, snapshot.game, 'table',
+                                       'blocks/table_game_finished.html',
+                                       snapshot.finished_data(), 286)
+            return render_fragment(request, snapshot.game, 'table',
+                                   'blocks/game_play_update.html', snapshot.context())
+
+class Metrics(View):
+    def get(self, request):
+        # for the scraper holding METRICS_TOKEN, or staff
+        if not (scraper_authorized(request) or request.user.is_staff):
+            raise Http404()
+        active_games = Game.objects.filter(finished=False, current_round__isnull=False).count()
+        return HttpResponse(render_metrics(active_games),
+                            content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class GameEvents(View):
+    def get(self, request, game_id):
+        # the event stream is served by tricks.asgi before Django sees the
+        # request; getting here means the site is not running under ASGI
+        return HttpResponse(status=204)
@@ -2,15 +2,36 @@
 ASGI config for tricks project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Game event streams (``/game/<id>/events``) are served here directly, so a
+long-lived connection never holds a Django request, and so are the collected
+static files, with the cache headers their names allow (see
+``main/statics.py``); everything else is handed to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+import re
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tricks.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from main.pubsub import game_events  # noqa: E402 (needs the app registry)
+from main.statics import serve_static  # noqa: E402
+
+GAME_EVENTS_PATH = re.compile(r"^/game/(?P<game_id>\d+)/events$")
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        match = GAME_EVENTS_PATH.match(scope["path"])
+        if match:
+            return await game_events(scope, receive, send, int(match["game_id"]))
+        if scope["path"].startswith(settings.STATIC_URL):
+            return await serve_static(scope, receive, send, scope["path"])
+    return await django_application(scope, receive, send)
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so it times everything below it (see main/metrics.py)
+    "main.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -128,7 +130,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # sessions configuration
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# sessions live in a signed cookie, so no request reads or writes a
+# session table; game views look the player up from the user instead
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
 SESSION_COOKIE_AGE = 86400
 
 # login/out redirect
@@ -136,4 +140,34 @@ LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
 # tailwind
-TAILWIND_APP_NAME = 'theme'
\ No newline at end of file
+TAILWIND_APP_NAME = 'theme'
+
+# caches, fragments holds rendered game html (see main/fragments.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'main.cache.ByteBudgetCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_BYTES': 32 * 2**20},
+    },
+}
+
+# views timed by main.metrics.MetricsMiddleware, by url name
+METRICS_VIEWS = ['game', 'sidebar_update', 'game_play_update', 'bet', 'play_card']
+# bearer token the scraper sends to /metrics, only staff can read it if unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# game event push (see main/pubsub.py)
+GAME_EVENTS_BROKER = 'main.pubsub.InProcessBroker'
+
+# bot players (see main/botrunner.py)
+BOT_RUNNER = 'main.botrunner.BotRunner'
+BOT_POLICY = 'greedy'
+BOT_WORKERS = 2
+# seconds a bot may think before it falls back to its cheapest legal move
+BOT_MOVE_BUDGET = 0.25
+# seconds a player in a game in play can have no event stream open before a
+# bot takes their seat until they are back, None to never take it
+BOT_DISCONNECT_GRACE = 60
@@ -7,7 +7,9 @@ from main.views import (home, register)
 # class based views
 from main.views import (CreateGame, JoinGame, CurGame,
                         StartGame, Bet, PlayCard,
-                        SidebarUpdate, GamePlayUpdate,)
+                        SidebarUpdate, GamePlayUpdate, GameEvents,
+                        GameHistory, Lobby, AddBot, Autoplay,
+                        Metrics,)
 
 
 urlpatterns = [
@@ -17,6 +19,7 @@ urlpatterns = [
     path("logout/", LogoutView.as_view(),
          name="logout"),
     path("register/", register, name="register"),
+    path("metrics", Metrics.as_view(), name="metrics"),
 ]
 
 # django debug toolbar
@@ -24,6 +27,7 @@ urlpatterns = [
 
 # game starting views
 urlpatterns += [path("", home, name="home"),
+                path("lobby/", Lobby.as_view(), name="lobby"),
                 path("create_game/", CreateGame.as_view(), name="create_game"),
                 path("join_game/", JoinGame.as_view(), name="join_game"),]
 
@@ -33,7 +37,12 @@ urlpatterns += [path("game/<int:game_id>/", CurGame.as_view(), name="game"),
                      name="start_game"),
                 path("game/<int:game_id>/bet", Bet.as_view(), name="bet"),
                 path("game/<int:game_id>/play_card", PlayCard.as_view(),
-                     name="play_card")]
+                     name="play_card"),
+                path("game/<int:game_id>/history", GameHistory.as_view(),
+                     name="game_history"),
+                path("game/<int:game_id>/add_bot", AddBot.as_view(), name="add_bot"),
+                path("game/<int:game_id>/autoplay", Autoplay.as_view(),
+                     name="autoplay")]
 
 # transition views
 urlpatterns += [path("game/<int:game_id>/next_trick", CurGame.as_view(),
@@ -51,4 +60,8 @@ htmx_patterns = [path("game/<int:game_id>/sidebar_update", SidebarUpdate.as_view
                  path("game/<int:game_id>/game_play_update", GamePlayUpdate.as_view(),
                       name="game_play_update"),]
 
+# server push, streamed by tricks.asgi
+htmx_patterns += [path("game/<int:game_id>/events", GameEvents.as_view(),
+                       name="game_events"),]
+
 urlpatterns += htmx_patterns
\ No newline at end of file